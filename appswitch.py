@@ -0,0 +1,41 @@
+"""Automatic profile selection from the host's focused application.
+
+The host agent sends ``APP <name>`` over the hostlink data port whenever the
+foreground application changes. Profiles claim applications with an "apps"
+list in keysfile.json:
+
+    "1": {"apps": ["code.exe", "code"], "1": {...}}
+
+Names are matched case-insensitively against a dict built once at load, so
+a focus change costs one lookup; the switch itself is left to `on_switch`.
+"""
+
+
+class AppSwitcher:
+    def __init__(self, profiles_config, profile_count, on_switch):
+        self.on_switch = on_switch
+        self.current_app = None
+        self.load(profiles_config, profile_count)
+
+    def load(self, profiles_config, profile_count):
+        """(Re)build the app lookup, e.g. after a config push."""
+        self.app_profiles = {}
+        for index in range(profile_count):
+            profile_cfg = profiles_config.get(str(index), {})
+            for app in profile_cfg.get("apps", ()):
+                self.app_profiles[str(app).lower()] = index
+
+    def profile_for(self, app):
+        """Profile index claiming `app`, or None."""
+        return self.app_profiles.get(app.lower())
+
+    def attach(self, link):
+        if self.app_profiles:
+            link.on("APP", self.handle_app)
+
+    def handle_app(self, payload):
+        app = payload.decode("utf-8")
+        self.current_app = app
+        index = self.profile_for(app)
+        if index is not None:
+            self.on_switch(index)
@@ -0,0 +1,15 @@
+import usb_cdc
+import usb_hid
+
+from hiddescriptors import custom_devices
+
+# The console stays on the first serial port; the second ("data") port carries
+# framed messages to the optional host agent (see hostlink.py).
+usb_cdc.enable(console=True, data=True)
+
+# Custom HID set (hiddescriptors.py): NKRO keyboard, consumer control and a
+# 64-byte raw HID endpoint for config pushes and telemetry. False keeps
+# CircuitPython's default devices (6-key boot keyboard, mouse, consumer control).
+CUSTOM_HID = True
+if CUSTOM_HID:
+    usb_hid.enable(custom_devices())
@@ -0,0 +1,57 @@
+"""Text pasted through the host agent's clipboard, without waiting in the main loop.
+
+`BulkPaste.start()` sends the text in a CLIP frame and returns. The agent's
+PASTE reply reaches `handle_paste()` through `host_link.poll()`, which sends
+the paste shortcut for the agent's OS. When no reply came within the
+timeout, `tick()` has the text typed key by key instead. A PASTE arriving
+after that is ignored, so the text never goes out twice.
+"""
+from ticks import ticks_add, ticks_less, ticks_ms
+
+
+class BulkPaste:
+    def __init__(self, host_link, paste_keys, type_parts, timeout_ms=1000):
+        self.host_link = host_link
+        # Sends the paste shortcut for the modifier named in a PASTE reply.
+        self.paste_keys = paste_keys
+        # Starts typing a list of text parts (the fallback, or what follows the paste).
+        self.type_parts = type_parts
+        self.timeout_ms = timeout_ms
+        self.fallback = None
+        self.after = ""
+        self.due = 0
+
+    @property
+    def running(self):
+        return self.fallback is not None
+
+    def start(self, text, after=""):
+        """Ask the agent to paste `text`, then type `after`; False when no agent is listening."""
+        self.cancel()
+        if not self.host_link.send("CLIP", text):
+            return False
+        self.fallback = text + after
+        self.after = after
+        self.due = ticks_add(ticks_ms(), self.timeout_ms)
+        return True
+
+    def cancel(self):
+        self.fallback = None
+
+    def handle_paste(self, payload):
+        """PASTE frame from the host agent: the text is on its clipboard."""
+        if self.fallback is None:
+            return
+        self.fallback = None
+        self.paste_keys(payload)
+        print("[TYPING] Pasted via host clipboard")
+        if self.after:
+            self.type_parts([self.after])
+
+    def tick(self):
+        if self.fallback is None or ticks_less(ticks_ms(), self.due):
+            return
+        print(f"[TYPING] No host PASTE within {self.timeout_ms} ms, typing instead")
+        parts = [self.fallback]
+        self.fallback = None
+        self.type_parts(parts)
@@ -0,0 +1,161 @@
+"""Chord and momentary-layer resolution for the 3x3 matrix.
+
+Every combination of the nine switches is a 9-bit mask, so each profile
+compiles its actions into a 512-entry table indexed by that mask:
+
+- single keys: the profile's "1".."9" entries
+- "chords": [{"keys": [1, 2], ...action}]   keys pressed together
+- "layers": {"9": {"1": {...action}}}       key 9 held shifts the others
+
+A layer key does nothing on its own; while it is held, the other keys are
+looked up together with its bit, falling back to their base action.
+`toggle_layer()` latches a layer on without holding its key. Keys that
+start a configured chord wait up to the chord window for the rest of it;
+every other key resolves in the scan it was pressed.
+"""
+import array
+
+from ticks import ticks_add, ticks_less
+
+TABLE_SIZE = 512
+
+
+def _mask(numbers, key_bits):
+    mask = 0
+    for number in numbers:
+        bit = key_bits.get(int(number))
+        if bit is None:
+            raise ValueError(f"no key {number}")
+        mask |= bit
+    return mask
+
+
+class ChordTable:
+    """One profile's actions indexed by switch mask.
+
+    `matrix_keys` maps keypad index (the bit number) to the key number used
+    in keysfile.json. `prepare(config, name)` is called once per action and
+    may return False to leave it out (e.g. an invalid macro).
+    """
+
+    def __init__(self, profile_cfg, matrix_keys, prepare=None):
+        self.actions = []
+        # Entry is an index into `actions` plus one; 0 means nothing mapped.
+        self.lookup = array.array("H", [0] * TABLE_SIZE)
+        # Non-zero for masks that are a strict part of a configured chord.
+        self.extendable = bytearray(TABLE_SIZE)
+        self.layer_keys = 0
+        self.prepare = prepare
+        key_bits = {number: 1 << index for index, number in enumerate(matrix_keys)}
+
+        for number, bit in key_bits.items():
+            self._set(bit, profile_cfg.get(str(number)), f"Key {number}")
+
+        for chord in profile_cfg.get("chords", []):
+            try:
+                mask = _mask(chord.get("keys", ()), key_bits)
+            except (AttributeError, TypeError, ValueError) as e:
+                print(f"[CHORD] Skipping chord {chord}: {e}")
+                continue
+            if bin(mask).count("1") < 2:
+                print(f"[CHORD] Skipping chord with fewer than 2 keys: {chord}")
+                continue
+            if self._set(mask, chord, chord.get("name", "Chord")):
+                self._mark_prefixes(mask)
+
+        for layer_number, layer_cfg in profile_cfg.get("layers", {}).items():
+            layer_bit = key_bits.get(int(layer_number))
+            if layer_bit is None or not isinstance(layer_cfg, dict):
+                print(f"[CHORD] Skipping layer on key {layer_number}")
+                continue
+            self.layer_keys |= layer_bit
+            self.lookup[layer_bit] = 0
+            for number, action in layer_cfg.items():
+                bit = key_bits.get(int(number))
+                if bit is not None and bit != layer_bit:
+                    self._set(layer_bit | bit, action, f"Layer {layer_number} key {number}")
+
+    def _set(self, mask, action, name):
+        if not isinstance(action, dict):
+            return False
+        if self.prepare is not None and not self.prepare(action, action.get("name", name)):
+            return False
+        self.actions.append(action)
+        self.lookup[mask] = len(self.actions)
+        return True
+
+    def _mark_prefixes(self, mask):
+        sub = (mask - 1) & mask
+        while sub:
+            self.extendable[sub] = 1
+            sub = (sub - 1) & mask
+
+    def action(self, mask):
+        entry = self.lookup[mask]
+        return self.actions[entry - 1] if entry else None
+
+
+class ChordEngine:
+    """Collects matrix presses into masks and resolves them through a ChordTable.
+
+    Feed it press()/release() for every matrix event, then call poll() once
+    per loop after the event queue is drained; release() and poll() return
+    the action config to run, or None.
+    """
+
+    def __init__(self, table, window_ms=30):
+        self.table = table
+        self.window_ms = window_ms
+        self.down = 0
+        self.pending = 0
+        self.layers = 0
+        # Layer bits latched on by toggle_layer().
+        self.locked_layers = 0
+        self.deadline = 0
+
+    def press(self, index, timestamp):
+        bit = 1 << index
+        if not self.pending:
+            self.deadline = ticks_add(timestamp, self.window_ms)
+        self.down |= bit
+        self.pending |= bit
+
+    def release(self, index):
+        bit = 1 << index
+        # A key let go inside the window ends the chord early.
+        action = self._resolve() if self.pending & bit else None
+        self.down &= ~bit
+        self.layers &= ~bit
+        return action
+
+    def poll(self, now):
+        pending = self.pending
+        if not pending:
+            return None
+        if self.table.extendable[pending] and ticks_less(now, self.deadline):
+            return None
+        return self._resolve()
+
+    def toggle_layer(self, index):
+        """Latch or unlatch the layer of the key at keypad `index`."""
+        self.locked_layers ^= 1 << index
+
+    @property
+    def waiting(self):
+        return self.pending != 0
+
+    def _resolve(self):
+        table = self.table
+        pending = self.pending
+        self.pending = 0
+        layer_bits = pending & table.layer_keys
+        self.layers |= layer_bits
+        if layer_bits == pending:
+            return None
+        layers = self.layers | self.locked_layers
+        if layers:
+            entry = table.lookup[pending | layers]
+            if entry:
+                return table.actions[entry - 1]
+            pending &= ~table.layer_keys
+        return table.action(pending)
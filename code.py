@@ -1,466 +1,649 @@
-import time
-import json
 import digitalio
-import board
-import busio
-import usb_hid
-import displayio
-from adafruit_displayio_sh1106 import SH1106
-from rotaryio import IncrementalEncoder
-import terminalio
-from adafruit_display_text import label
+import alarm
+import gc
 from digitalio import Direction, Pull
-from adafruit_hid.consumer_control import ConsumerControl
-from adafruit_hid.consumer_control_code import ConsumerControlCode
-from adafruit_hid.keyboard import Keyboard
-from adafruit_hid.keycode import Keycode
-from keyout import execute_action
-
-cc = ConsumerControl(usb_hid.devices)
-
-encoder1 = IncrementalEncoder(board.GP14, board.GP15)
-last_position_encoder1 = None
-
-class SoftwareEncoder:
-    def __init__(self, pinA, pinB):
-        self.a = digitalio.DigitalInOut(pinA)
-        self.b = digitalio.DigitalInOut(pinB)
-        self.a.direction = digitalio.Direction.INPUT
-        self.a.pull = digitalio.Pull.UP
-        self.b.direction = digitalio.Direction.INPUT
-        self.b.pull = digitalio.Pull.UP
-        self.position = 0
-        self._state = (int(self.a.value) << 1) | int(self.b.value)
-        self._transition_accum = 0
-        # Valid Gray-code transitions: +1/-1 quarter-steps, 0 for invalid/bounce.
-        self._transition_table = (
-            0, -1, 1, 0,
-            1, 0, 0, -1,
-            -1, 0, 0, 1,
-            0, 1, -1, 0,
-        )
+from ticks import ticks_ms, ticks_add, ticks_diff, ticks_less
+from loopstats import BootTimer, LoopStats
+from pinmap import load_pinmap
+
+# Staged startup: the input scan goes live first (keypad and PIO queue
+# timestamped events in the background from then on), then HID and the
+# action engine. The display and the other profiles' chord tables are set up
+# in idle loop passes afterwards. BootTimer prints the stage times at the
+# first key press.
+boot = BootTimer()
+
+from inputcapture import (
+    EventRing,
+    InputEvent,
+    make_producer,
+    KEY_PRESSED,
+    KEY_RELEASED,
+    BUTTON_PRESSED,
+    BUTTON_RELEASED,
+    ENCODER_MOVED,
+)
+
+# Pins, matrix layout and input backends come from hardware.json.
+pins = load_pinmap()
+
+# Encoder acceleration: (detents per second, steps per detent) points.
+# Slow turns send one step per detent for precise changes; faster spins
+# scale up so a full sweep takes only a flick. Use () for a flat 1:1 map.
+VOLUME_ACCELERATION = ((0, 1), (5, 2), (12, 4), (25, 8))
+PROFILE_ACCELERATION = ((0, 1), (20, 2))
+
+# Indices used by the input producer for buttons and encoders (pinmap roles).
+VOLUME_BUTTON = 0
+DISPLAY_BUTTON = 1
+MIC_BUTTON = 2
+VOLUME_ENCODER = 0
+DISPLAY_ENCODER = 1
+# Button whose press stops text that is still being typed (encoder 2 click);
+# while no text is typed it keeps its normal action. None disables cancelling.
+TEXT_CANCEL_BUTTON = DISPLAY_BUTTON
+
+# Matrix and buttons are scanned by keypad in the background and the encoders
+# are decoded by PIO; the loop below only drains timestamped events.
+input_ring = EventRing(64)
+input_event = InputEvent()
+producer = None
+held_inputs = 0
+
+
+def setup_inputs(positions=None):
+    """Claim all input pins; also used to restore them after light sleep."""
+    global producer
+    producer = make_producer(
+        input_ring, pins, (VOLUME_ACCELERATION, PROFILE_ACCELERATION), positions
+    )
+
+
+def release_inputs():
+    """Free the input pins and return PinAlarms that fire when any of them changes."""
+    global sleep_positions, sleep_rows, encoder_loss_base
+    sleep_positions = producer.positions()
+    encoder_loss_base += producer.step_loss()
+    producer.deinit()
+
+    pin_alarms = []
+    for pin_a, pin_b in pins.encoders:
+        pin_alarms.append(encoder_alarm(pin_a))
+        pin_alarms.append(encoder_alarm(pin_b))
+    for pin in pins.buttons:
+        pin_alarms.append(alarm.pin.PinAlarm(pin, value=False, pull=True))
+    # Any pressed key pulls its column to the row level while every row is
+    # driven (high for cathode columns, low for anode columns).
+    level = not pins.columns_to_anodes
+    sleep_rows = []
+    for pin in pins.rows:
+        row = digitalio.DigitalInOut(pin)
+        row.switch_to_output(value=level)
+        sleep_rows.append(row)
+    for pin in pins.columns:
+        pin_alarms.append(alarm.pin.PinAlarm(pin, value=level, pull=True))
+    return pin_alarms
+
+
+def encoder_alarm(pin):
+    # Encoders rest on either level; sample them once released.
+    with digitalio.DigitalInOut(pin) as probe:
+        probe.pull = digitalio.Pull.UP
+        level = probe.value
+    # Wake on the opposite level, with the pull holding the current one.
+    return alarm.pin.PinAlarm(pin, value=not level, pull=True)
+
+
+def restore_inputs():
+    for row in sleep_rows:
+        row.deinit()
+    setup_inputs(sleep_positions)
+    stats.mark_wake()
+
+
+sleep_positions = None
+sleep_rows = []
+# Encoder step loss of producers replaced after light sleep.
+encoder_loss_base = 0
+setup_inputs()
+boot.mark("inputs")
+
+# Input/HID trace kept in RAM for host/trace_tool.py (hidtrace.py); records
+# take 16 bytes each, 0 turns tracing off. Dump with a "trace_dump" action.
+TRACE_RECORDS = 0
+
+import hidtrace
+
+if TRACE_RECORDS:
+    hidtrace.trace = hidtrace.TraceBuffer(TRACE_RECORDS)
+trace = hidtrace.trace
 
-    def update(self):
-        current_state = (int(self.a.value) << 1) | int(self.b.value)
-        if current_state != self._state:
-            transition = (self._state << 2) | current_state
-            quarter_step = self._transition_table[transition]
-            if quarter_step:
-                self._transition_accum += quarter_step
-                if self._transition_accum >= 4:
-                    self.position += 1
-                    self._transition_accum = 0
-                elif self._transition_accum <= -4:
-                    self.position -= 1
-                    self._transition_accum = 0
-            self._state = current_state
-
-softEncoder2 = SoftwareEncoder(board.GP18, board.GP19)
-last_softPos2 = None
-
-encoder1_button = digitalio.DigitalInOut(board.GP17)
-encoder1_button.direction = Direction.INPUT
-encoder1_button.pull = Pull.UP
-
-encoder2_button = digitalio.DigitalInOut(board.GP20)
-encoder2_button.direction = digitalio.Direction.INPUT
-encoder2_button.pull = digitalio.Pull.UP
+from adafruit_hid.consumer_control import ConsumerControl
+from keyout import (
+    apply_config,
+    bulk_paste,
+    chord_window_ms,
+    execute_config,
+    handle_calibration,
+    handle_rate,
+    keyboard_device,
+    launcher,
+    macro_player,
+    prepare_action,
+    profiles_config,
+    report_format,
+    request_typing_rate,
+    text_stream,
+)
+from specialactions import (
+    DISPLAY_ENCODER_CLICK,
+    DISPLAY_ENCODER_HOLD,
+    DISPLAY_ENCODER_LEFT,
+    DISPLAY_ENCODER_RIGHT,
+    MIC_KEY,
+    VOLUME_ENCODER_CLICK,
+    VOLUME_ENCODER_HOLD,
+    VOLUME_ENCODER_LEFT,
+    VOLUME_ENCODER_RIGHT,
+    compile_special_actions,
+    load_special_actions,
+    merge_special_actions,
+)
+from chords import ChordEngine, ChordTable
+from appswitch import AppSwitcher
+from hiddescriptors import raw_device
+from hostlink import HostLink, link as host_link
+from rawhid import RawHidPort
+from statestore import StateStore
+from governor import LoopGovernor
+from profilemeta import profile_metadata
+
+cc = ConsumerControl(hidtrace.hid_devices())
+
+# Button timers are ticks_ms() values (small ints) so the loop never creates
+# the float objects time.monotonic() returns.
+HOLD_MS = 1000
+DISPLAY_DEBOUNCE_MS = 200
+IMAGE_SHOW_MS = 1000
 
 volume_hold_start = None
 is_holding_volume_button = False
-last_volume_button_state = True
 
 display_hold_start = None
 is_holding_display_button = False
-last_display_button_state = True
-
-last_profile_switch_time = 0
-last_key_press_time = 0
-debounce_delay = 0.2
-
-displayio.release_displays()
-i2c = busio.I2C(board.GP9, board.GP8)
-display_bus = displayio.I2CDisplay(i2c, device_address=0x3C)
-display = SH1106(display_bus, width=130, height=64)
-
-def setup_button(pin):
-    button = digitalio.DigitalInOut(pin)
-    button.direction = digitalio.Direction.INPUT
-    button.pull = digitalio.Pull.UP
-    return button
-def debounce_check(last_time, delay=0.5):
-    return time.monotonic() - last_time > delay
-last_mic_action_time = 0
-last_encoder2_action_time = 0
-
-mute_mic = setup_button(board.GP0)
-
-cols = [digitalio.DigitalInOut(pin) for pin in [board.GP1, board.GP2, board.GP3]]
-rows = [digitalio.DigitalInOut(pin) for pin in [board.GP4, board.GP13, board.GP6]]
-
-for row in rows:
-    row.direction = digitalio.Direction.OUTPUT
-    row.value = False
-for col in cols:
-    col.direction = digitalio.Direction.INPUT
-    col.pull = digitalio.Pull.DOWN
-
-key_mapping = {
-    (0, 0): 1, (0, 1): 4, (0, 2): 7,
-    (1, 0): 3, (1, 1): 6, (1, 2): 9,
-    (2, 0): 2, (2, 1): 5, (2, 2): 8,
-}
 
-image_files = [
-    "/img/youtube-logo-bmp.bmp",
-    "/img/vscode-logo-bmp.bmp",
-    "/img/obs-logo-bmp.bmp",
-    "/img/volt-logo-bmp.bmp",
-    "/img/windows-logo-bmp.bmp",
-    "/img/photoshop-logo-bmp.bmp",
-]
-
-selected_index = 0
-
-SPECIAL_DEFAULTS = {
-    "volume_encoder_left": {"name": "Volume Down", "key": ["media_volume_down"]},
-    "volume_encoder_right": {"name": "Volume Up", "key": ["media_volume_up"]},
-    "volume_encoder_click": {"name": "Play/Pause", "key": ["media_play_pause"]},
-    "volume_encoder_hold": {"name": "Mute", "key": ["media_mute"]},
-    "display_encoder_left": {"name": "Prev Profile", "action": "profile_prev"},
-    "display_encoder_right": {"name": "Next Profile", "action": "profile_next"},
-    "display_encoder_click": {"name": "Switch Profile", "action": "profile_next"},
-    "display_encoder_hold": {"name": "No Action", "action": "none"},
-    "mic_key": {"name": "Mic Toggle", "key": ["f13"]},
-}
+
+def debounce_check(last_time, delay_ms=500):
+    return last_time is None or ticks_diff(ticks_ms(), last_time) > delay_ms
+last_encoder2_action_time = None
+
+# Action number in keysfile.json per keypad key number (from hardware.json).
+matrix_keys = pins.key_numbers
+
+# Profile names and icons come from the "name"/"icon" of each keysfile.json profile.
+PROFILE_NAMES, image_files = profile_metadata(profiles_config)
+
+# Last profile, key press counts and latency histogram survive reboots.
+state = StateStore(len(matrix_keys), len(PROFILE_NAMES))
+selected_index = state.last_profile if state.last_profile < len(PROFILE_NAMES) else 0
+
+# Per-profile 512-entry switch-mask tables for single keys, chords and layers.
+# Only the selected profile's table is built before the loop starts. The
+# WARM_CHORD_TABLES most used others are built in idle passes, and any other
+# profile's on first use.
+WARM_CHORD_TABLES = 2
+chord_tables = [None] * len(PROFILE_NAMES)
+
+
+def chord_table(index):
+    table = chord_tables[index]
+    if table is None:
+        table = chord_tables[index] = ChordTable(
+            profiles_config.get(str(index), {}), matrix_keys, prepare_action
+        )
+    return table
+
+
+chords = ChordEngine(chord_table(selected_index), chord_window_ms)
+boot.mark("actions")
+
+
+def run_chord_action(action):
+    if action is not None:
+        stats.mark_busy()
+        with governor.boost():
+            execute_config(action, selected_index)
 
 
-def load_special_actions():
-    """Load editable special actions with safe defaults."""
+# Special actions compiled into a handler table at load (specialactions.py);
+# the loop runs them by slot index. Internal commands beyond profile steps:
+BRIGHTNESS_STEP = 0.1
+
+
+def change_brightness(step):
+    if screen is None:
+        return
+    display = screen.display
     try:
-        with open("special-keyout.json", "r") as f:
-            data = json.load(f)
-        actions = data.get("special_keys", {})
-    except Exception as e:
-        print(f"special-keyout.json load error: {e}")
-        actions = {}
-
-    merged = {}
-    for action_id, default_entry in SPECIAL_DEFAULTS.items():
-        merged[action_id] = default_entry.copy()
-        if action_id in actions and isinstance(actions[action_id], dict):
-            merged[action_id].update(actions[action_id])
-    return merged
-
-
-def normalize_token(token):
-    return str(token).strip().lower().replace("-", "_").replace(" ", "_")
-
-
-def token_to_keycode(token):
-    token = normalize_token(token)
-    key_map = {
-        "ctrl": Keycode.CONTROL,
-        "control": Keycode.CONTROL,
-        "alt": Keycode.ALT,
-        "shift": Keycode.SHIFT,
-        "windows": Keycode.WINDOWS,
-        "win": Keycode.WINDOWS,
-        "esc": Keycode.ESCAPE,
-        "escape": Keycode.ESCAPE,
-        "tab": Keycode.TAB,
-        "space": Keycode.SPACE,
-        "spacebar": Keycode.SPACE,
-        "enter": Keycode.ENTER,
-        "backspace": Keycode.BACKSPACE,
-        "up": Keycode.UP_ARROW,
-        "down": Keycode.DOWN_ARROW,
-        "left": Keycode.LEFT_ARROW,
-        "right": Keycode.RIGHT_ARROW,
-        "home": Keycode.HOME,
-        "end": Keycode.END,
-        "page_up": Keycode.PAGE_UP,
-        "pagedown": Keycode.PAGE_DOWN,
-        "page_down": Keycode.PAGE_DOWN,
-        "insert": Keycode.INSERT,
-        "delete": Keycode.DELETE,
-        "print_screen": Keycode.PRINT_SCREEN,
-    }
-
-    if token in key_map:
-        return key_map[token]
-
-    if len(token) == 1 and "a" <= token <= "z":
-        return getattr(Keycode, token.upper())
-    if token.isdigit():
-        digit_map = {
-            "0": Keycode.ZERO,
-            "1": Keycode.ONE,
-            "2": Keycode.TWO,
-            "3": Keycode.THREE,
-            "4": Keycode.FOUR,
-            "5": Keycode.FIVE,
-            "6": Keycode.SIX,
-            "7": Keycode.SEVEN,
-            "8": Keycode.EIGHT,
-            "9": Keycode.NINE,
-        }
-        return digit_map.get(token)
-    if token.startswith("f") and token[1:].isdigit():
-        try:
-            return getattr(Keycode, token.upper())
-        except AttributeError:
-            return None
-
-    return None
-
-
-def execute_special_key_sequence(tokens):
-    """Execute keyboard or media output for a special action entry."""
-    if not tokens:
+        display.brightness = min(1.0, max(0.0, display.brightness + step))
+    except (AttributeError, NotImplementedError, RuntimeError) as e:
+        print(f"[DISPLAY] Brightness change unsupported: {e}")
+
+
+def dump_trace(_value):
+    if trace is None:
+        print("[TRACE] Tracing is off; set TRACE_RECORDS")
         return
+    data = trace.dump()
+    if not host_link.send("TRACE", data):
+        hidtrace.print_dump(data)
+    # The next dump starts from here, with the profile it starts in.
+    trace.clear()
+    trace.record(hidtrace.PROFILE, selected_index, 0, ticks_ms())
+
+
+# Diagnostics page (diagscreen.py), toggled by a "diagnostics" special action.
+# It refreshes every DIAG_REFRESH_MS, and those passes are left out of the
+# loop timings it shows.
+DIAG_REFRESH_MS = 1000
+diag_page = None
+diagnostics_on = False
+diag_due = 0
+
+
+def toggle_diagnostics(_value):
+    global diag_page, diagnostics_on, diag_due
+    if screen is None:
+        return
+    if diagnostics_on:
+        diagnostics_on = False
+        diag_page.hide()
+        draw_profiles()
+        return
+    if diag_page is None:
+        from diagscreen import DiagnosticsScreen
+
+        diag_page = DiagnosticsScreen(screen.display)
+    diagnostics_on = True
+    diag_page.show()
+    # Readings start from a fresh window.
+    stats.sample()
+    diag_due = ticks_add(ticks_ms(), DIAG_REFRESH_MS)
+
+
+def refresh_diagnostics():
+    global diag_due
+    start = ticks_ms()
+    diag_due = ticks_add(start, DIAG_REFRESH_MS)
+    loop_hz, worst_latency = stats.sample()
+    diag_page.update(
+        (
+            loop_hz,
+            worst_latency,
+            macro_player.pending(),
+            gc.mem_free(),
+            stats.collections,
+            encoder_loss_base + producer.step_loss(),
+        )
+    )
+    stats.exclude(start)
+    stats.mark_busy()
+
 
-    if isinstance(tokens, str):
-        tokens = [tokens]
-
-    if len(tokens) == 1:
-        media_map = {
-            "media_volume_up": ConsumerControlCode.VOLUME_INCREMENT,
-            "media_volume_down": ConsumerControlCode.VOLUME_DECREMENT,
-            "media_mute": ConsumerControlCode.MUTE,
-            "media_play_pause": ConsumerControlCode.PLAY_PAUSE,
-        }
-        media_code = media_map.get(normalize_token(tokens[0]))
-        if media_code is not None:
-            cc.send(media_code)
-            return
-
-    keycodes = []
-    for token in tokens:
-        keycode = token_to_keycode(token)
-        if keycode is None:
-            print(f"Unsupported special token: {token}")
-            return
-        keycodes.append(keycode)
-
-    kbd = Keyboard(usb_hid.devices)
-    kbd.press(*keycodes)
-    time.sleep(0.05)
-    kbd.release_all()
-
-
-def run_special_action(action_id, actions):
-    """Run a mapped special action and return internal action string if present."""
-    entry = actions.get(action_id, SPECIAL_DEFAULTS.get(action_id, {}))
-    if "key" in entry:
-        execute_special_key_sequence(entry.get("key", []))
-        return None
-    return entry.get("action", "none")
-
-
-special_actions = load_special_actions()
-
-# Increase/decrease how many volume key events are sent per encoder tick.
-VOLUME_STEPS_PER_TICK = 3
+def toggle_layer(key_number):
+    if key_number in matrix_keys:
+        chords.toggle_layer(matrix_keys.index(key_number))
+    else:
+        print(f"[CHORD] No layer key {key_number}")
+
+
+special_commands = {
+    "brightness_up": lambda value: change_brightness(value or BRIGHTNESS_STEP),
+    "brightness_down": lambda value: change_brightness(-(value or BRIGHTNESS_STEP)),
+    "layer_toggle": toggle_layer,
+    "trace_dump": dump_trace,
+    "diagnostics": toggle_diagnostics,
+}
+special_handlers = compile_special_actions(
+    load_special_actions(), keyboard_device, cc, special_commands, report_format
+)
+
+# Loop governor: full speed while inputs are active, short polls after
+# IDLE_AFTER_MS of inactivity, light sleep (pin wake) after SLEEP_AFTER_MS.
+# Set SLEEP_AFTER_MS = 0 to never sleep. BOOST_FREQUENCY raises the CPU clock
+# while a matrix action (macro, text, launch) runs; None keeps the stock clock.
+IDLE_AFTER_MS = 1000
+IDLE_POLL_INTERVAL = 0.002
+SLEEP_AFTER_MS = 30000
+BOOST_FREQUENCY = 200_000_000
+# Print [BENCH] loop counters every N ms over serial (0 = off).
+BENCH_REPORT_INTERVAL_MS = 0
+# Sample the heap every pass and report loop passes that allocated without
+# handling any input (should stay 0). Costs loop rate; enable for testing.
+ALLOC_CHECK = False
+# Run gc.collect() once the inputs have been quiet this long.
+GC_IDLE_MS = 250
+
+governor = LoopGovernor(
+    idle_after_ms=IDLE_AFTER_MS,
+    idle_interval=IDLE_POLL_INTERVAL,
+    sleep_after_ms=SLEEP_AFTER_MS,
+    boost_frequency=BOOST_FREQUENCY,
+    collect_after_ms=GC_IDLE_MS,
+)
+stats = LoopStats(BENCH_REPORT_INTERVAL_MS, ALLOC_CHECK)
 
 is_showing_image = False
 image_display_start = 0
 
-def draw_bubbles(selected_index):
-    splash = displayio.Group()
-    bg_bitmap = displayio.Bitmap(display.width, display.height, 1)
-    bg_palette = displayio.Palette(1)
-    bg_palette[0] = 0x000000
-    bg_sprite = displayio.TileGrid(bg_bitmap, pixel_shader=bg_palette, x=0, y=0)
-    splash.append(bg_sprite)
-    display.root_group = splash
-
-    profile_name = get_profile_name(selected_index)
-    profile_label = label.Label(terminalio.FONT, text=profile_name, color=0xFFFFFF)
-    profile_label.x = (display.width - profile_label.bounding_box[2]) // 2
-    profile_label.y = 10
-    splash.append(profile_label)
-
-    bubble_width = 17
-    bubble_gap = 8
-    total_bubbles = 6
-    total_width = (bubble_width * 3) + (bubble_gap * 2)
-    start_x = (display.width - total_width) // 2
-    start_y = profile_label.y + profile_label.bounding_box[3] + 2
-
-    for i in range(total_bubbles):
-        x = start_x + (i % 3) * (bubble_width + bubble_gap)
-        y = start_y + (i // 3) * (bubble_width + bubble_gap)
-        is_selected = (i == selected_index)
-        center = (bubble_width - 1) / 2
-        radius = (bubble_width - 2) / 2
-        inner_radius = max(radius - 1, 0)
-        radius_sq = radius * radius
-        inner_radius_sq = inner_radius * inner_radius
-
-        if is_selected:
-            bubble_bitmap = displayio.Bitmap(bubble_width, bubble_width, 2)
-            bubble_palette = displayio.Palette(2)
-            bubble_palette[0] = 0x000000
-            bubble_palette[1] = 0xFFFFFF
-            for px in range(bubble_width):
-                for py in range(bubble_width):
-                    dx = px - center
-                    dy = py - center
-                    dist_sq = (dx * dx) + (dy * dy)
-                    if dist_sq <= radius_sq and dist_sq >= inner_radius_sq:
-                        bubble_bitmap[px, py] = 1
-                    elif dist_sq < inner_radius_sq:
-                        bubble_bitmap[px, py] = 0
-                    else:
-                        bubble_bitmap[px, py] = 0
-            bubble_sprite = displayio.TileGrid(bubble_bitmap, pixel_shader=bubble_palette, x=x, y=y)
-            splash.append(bubble_sprite)
-            number_label = label.Label(terminalio.FONT, text=str(i + 1), color=0xFFFFFF)
-        else:
-            bubble_bitmap = displayio.Bitmap(bubble_width, bubble_width, 2)
-            bubble_palette = displayio.Palette(2)
-            bubble_palette[0] = 0x000000
-            bubble_palette[1] = 0xFFFFFF
-            for px in range(bubble_width):
-                for py in range(bubble_width):
-                    dx = px - center
-                    dy = py - center
-                    if (dx * dx) + (dy * dy) <= radius_sq:
-                        bubble_bitmap[px, py] = 1
-                    else:
-                        bubble_bitmap[px, py] = 0
-            bubble_sprite = displayio.TileGrid(bubble_bitmap, pixel_shader=bubble_palette, x=x, y=y)
-            splash.append(bubble_sprite)
-            number_label = label.Label(terminalio.FONT, text=str(i + 1), color=0x000000)
-
-        number_label.x = x + (bubble_width - number_label.bounding_box[2]) // 2
-        number_label.y = y + (bubble_width - number_label.bounding_box[3]) // 2 + 6
-        splash.append(number_label)
-
-def get_profile_name(profile_index):
-    profile_names = ["Default", "VSCode", "OBS", "Softwares", "Windows", "Photoshop"]
-    return profile_names[profile_index] if 0 <= profile_index < len(profile_names) else "Profile"
-
-def load_image(profile_index):
-    image_file = image_files[profile_index]
+# Profile redraws triggered by encoder 2 are coalesced: each step pushes the
+# render out by the settle window, but never past the max deferral, so a
+# fast spin costs one redraw instead of one per detent.
+PROFILE_REDRAW_SETTLE_MS = 40
+PROFILE_REDRAW_MAX_DEFER_MS = 150
+redraw_due = None
+redraw_deadline = None
+
+# Created by start_display() once the inputs and actions are live.
+screen = None
+
+
+def draw_profiles():
+    if screen is not None and not diagnostics_on:
+        screen.draw_bubbles(selected_index)
+
+
+def show_typing_progress(done, total):
+    if screen is not None:
+        screen.show_progress(done, total)
+
+
+text_stream.on_progress = show_typing_progress
+
+
+def start_display():
+    global screen
+    from profileui import ProfileScreen, setup_display
+
+    display = setup_display(pins.display_scl, pins.display_sda, pins.display_address)
+    screen = ProfileScreen(display, PROFILE_NAMES, image_files)
+    screen.draw_bubbles(selected_index)
+    boot.mark("display")
+
+
+# One task runs per idle loop pass until the list is empty.
+startup_tasks = [start_display]
+for _index in state.profile_ranking(len(PROFILE_NAMES))[: WARM_CHORD_TABLES + 1]:
+    if _index != selected_index and state.profile_presses(_index):
+        startup_tasks.append(lambda index=_index: chord_table(index))
+
+def schedule_profile_redraw():
+    """Defer the bubble redraw until profile input has settled for a moment."""
+    global redraw_due, redraw_deadline
+    now = ticks_ms()
+    if redraw_deadline is None:
+        redraw_deadline = ticks_add(now, PROFILE_REDRAW_MAX_DEFER_MS)
+    redraw_due = ticks_add(now, PROFILE_REDRAW_SETTLE_MS)
+    if ticks_less(redraw_deadline, redraw_due):
+        redraw_due = redraw_deadline
+
+
+def handle_profile_steps(delta):
+    global selected_index
+    handler = special_handlers[DISPLAY_ENCODER_RIGHT if delta > 0 else DISPLAY_ENCODER_LEFT]
+    # Apply the net index change of the whole burst, then render once.
+    index_change = 0
+    for _ in range(abs(delta)):
+        index_change += handler.run()
+    if index_change:
+        selected_index = (selected_index + index_change) % len(image_files)
+        schedule_profile_redraw()
+
+
+def switch_to_profile(index):
+    """Select profile `index` at once, e.g. on a host focus change."""
+    global selected_index, redraw_due, redraw_deadline, is_showing_image
+    if index == selected_index:
+        return
+    selected_index = index
+    redraw_due = None
+    redraw_deadline = None
+    is_showing_image = False
+    draw_profiles()
+    print(f"[APP] {app_switcher.current_app} -> profile {index} ({PROFILE_NAMES[index]})")
+
+
+# The host agent reports the focused application; profiles with an "apps"
+# list in keysfile.json are selected automatically.
+APP_SWITCH_MAX_SLEEP = 1
+app_switcher = AppSwitcher(profiles_config, len(PROFILE_NAMES), switch_to_profile)
+app_switcher.attach(host_link)
+if app_switcher.app_profiles:
+    # Wake from light sleep often enough to follow focus changes.
+    governor.max_sleep = APP_SWITCH_MAX_SLEEP
+
+# Typing rate calibrated for this host (host/calibrate.py), and calibration runs.
+host_link.on("RATE", handle_rate)
+host_link.on("CAL", handle_calibration)
+request_typing_rate()
+
+
+# Raw HID link (boot.py's custom HID set): host/rawhid_push.py pushes
+# keysfile.json / special-keyout.json into RAM and reads telemetry. Pushed
+# configs are not written to CIRCUITPY and last until the next reset.
+def push_keys(payload):
+    import json
+
     try:
-        bitmap = displayio.OnDiskBitmap(open(image_file, "rb"))
-        return bitmap
-    except Exception as e:
-        print(f"Error loading image {image_file}: {e}")
-        return None
+        config = json.loads(payload)
+    except ValueError as e:
+        raw_link.send("ERROR", f"keysfile.json: {e}")
+        return
+    names, icons = profile_metadata(config.get("profiles", {}))
+    if len(names) != len(PROFILE_NAMES):
+        raw_link.send(
+            "ERROR", f"{len(names)} profiles pushed, {len(PROFILE_NAMES)} loaded; copy the file instead"
+        )
+        return
+    apply_config(config)
+    PROFILE_NAMES[:] = names
+    image_files[:] = icons
+    for index in range(len(chord_tables)):
+        chord_tables[index] = None
+    chords.table = chord_table(selected_index)
+    chords.window_ms = config.get("chord_window_ms", 30)
+    app_switcher.load(profiles_config, len(PROFILE_NAMES))
+    app_switcher.attach(host_link)
+    if screen is not None:
+        # Names may have changed under an unchanged selected_index.
+        screen.invalidate()
+    draw_profiles()
+    raw_link.send("DONE", "keysfile.json")
+
+
+def push_special(payload):
+    import json
 
-draw_bubbles(selected_index)
+    try:
+        actions = json.loads(payload).get("special_keys", {})
+    except ValueError as e:
+        raw_link.send("ERROR", f"special-keyout.json: {e}")
+        return
+    special_handlers[:] = compile_special_actions(
+        merge_special_actions(actions), keyboard_device, cc, special_commands, report_format
+    )
+    raw_link.send("DONE", "special-keyout.json")
+
+
+def send_telemetry(_payload):
+    loop_hz, worst_latency = stats.sample()
+    raw_link.send(
+        "STATS",
+        f"{stats.summary()} recent_loop_hz={loop_hz} recent_worst_latency_ms={worst_latency} "
+        f"free_bytes={gc.mem_free()} hid_queue={macro_player.pending()} "
+        f"encoder_step_loss={encoder_loss_base + producer.step_loss()}",
+    )
+
+
+raw_hid = raw_device(hidtrace.hid_devices())
+raw_link = HostLink(RawHidPort(raw_hid)) if raw_hid is not None else None
+if raw_link is not None:
+    raw_link.on("KEYS", push_keys)
+    raw_link.on("SPECIAL", push_special)
+    raw_link.on("STATS", send_telemetry)
+
+
+def handle_volume_steps(delta):
+    handler = special_handlers[VOLUME_ENCODER_RIGHT if delta > 0 else VOLUME_ENCODER_LEFT]
+    for _ in range(abs(delta)):
+        handler.run()
+
+
+def handle_display_click():
+    global selected_index, is_showing_image, image_display_start
+    step = special_handlers[DISPLAY_ENCODER_CLICK].run()
+    if step:
+        selected_index = (selected_index + step) % len(image_files)
+        if screen is not None and not diagnostics_on and screen.show_icon(selected_index):
+            is_showing_image = True
+            image_display_start = ticks_ms()
+
+
+# Last profile index written to the trace.
+traced_profile = None
 
 while True:
-    # Volume control on encoder1
-    position = encoder1.position
-    if last_position_encoder1 is None:
-        last_position_encoder1 = position
-    delta1 = position - last_position_encoder1
-    if delta1 != 0:
-        step_count = abs(delta1) * VOLUME_STEPS_PER_TICK
-        action_id = "volume_encoder_right" if delta1 > 0 else "volume_encoder_left"
-        for _ in range(step_count):
-            run_special_action(action_id, special_actions)
-    last_position_encoder1 = position
-
-    # Read software-based encoder2
-    softEncoder2.update()
-    pos2 = softEncoder2.position
-    if last_softPos2 is None:
-        last_softPos2 = pos2
-    delta2 = pos2 - last_softPos2
-    if delta2 != 0:
-        action_id = "display_encoder_right" if delta2 > 0 else "display_encoder_left"
-        step_count = abs(delta2)
-        for _ in range(step_count):
-            internal_action = run_special_action(action_id, special_actions)
-            if internal_action == "profile_next":
-                selected_index = (selected_index + 1) % len(image_files)
-                draw_bubbles(selected_index)
-            elif internal_action == "profile_prev":
-                selected_index = (selected_index - 1) % len(image_files)
-                draw_bubbles(selected_index)
-        last_softPos2 = pos2
-
-    #mic mute switch logic
-    if not mute_mic.value and debounce_check(last_mic_action_time):
-        run_special_action("mic_key", special_actions)
-        last_mic_action_time = time.monotonic()
-          
-    current_volume_button_state = encoder1_button.value
-    
-    if not current_volume_button_state and last_volume_button_state:
-        volume_hold_start = time.monotonic()
-        is_holding_volume_button = True
-    if current_volume_button_state and not last_volume_button_state:
-        if is_holding_volume_button and (time.monotonic() - volume_hold_start) < 1:
-            run_special_action("volume_encoder_click", special_actions)
+    producer.poll()
+    if host_link.poll():
+        stats.mark_busy()
+    if raw_link is not None and raw_link.poll():
+        stats.mark_busy()
+    while input_ring.get_into(input_event):
+        governor.mark_activity()
+        latency = stats.input_handled(input_event.timestamp)
+        if latency is not None:
+            state.record_latency(latency)
+        kind = input_event.kind
+        number = input_event.number
+        if trace is not None:
+            trace.record(kind, number, input_event.value, input_event.timestamp)
+
+        if kind == ENCODER_MOVED:
+            if number == VOLUME_ENCODER:
+                handle_volume_steps(input_event.value)
+            else:
+                handle_profile_steps(input_event.value)
+
+        elif kind == KEY_PRESSED:
+            held_inputs += 1
+            boot.first_key()
+            chords.press(number, input_event.timestamp)
+            state.count_key(selected_index, number)
+
+        elif kind == KEY_RELEASED:
+            held_inputs -= 1
+            run_chord_action(chords.release(number))
+
+        elif kind == BUTTON_PRESSED:
+            held_inputs += 1
+            if number == TEXT_CANCEL_BUTTON and (text_stream.running or bulk_paste.running):
+                # Only stops the typing; the release that follows does nothing.
+                text_stream.cancel()
+                bulk_paste.cancel()
+            elif number == MIC_BUTTON:
+                special_handlers[MIC_KEY].run()
+            elif number == VOLUME_BUTTON:
+                volume_hold_start = ticks_ms()
+                is_holding_volume_button = True
+            elif debounce_check(last_encoder2_action_time, DISPLAY_DEBOUNCE_MS):
+                display_hold_start = ticks_ms()
+                is_holding_display_button = True
+
+        elif kind == BUTTON_RELEASED:
+            held_inputs -= 1
+            if number == VOLUME_BUTTON:
+                if is_holding_volume_button and ticks_diff(ticks_ms(), volume_hold_start) < HOLD_MS:
+                    special_handlers[VOLUME_ENCODER_CLICK].run()
+                volume_hold_start = None
+                is_holding_volume_button = False
+            elif number == DISPLAY_BUTTON:
+                if is_holding_display_button and display_hold_start is not None and ticks_diff(ticks_ms(), display_hold_start) < HOLD_MS:
+                    handle_display_click()
+                    last_encoder2_action_time = ticks_ms()
+                display_hold_start = None
+                is_holding_display_button = False
+
+    # Everything closed in this scan (or within the chord window) resolves as one mask.
+    chords.table = chord_table(selected_index)
+    run_chord_action(chords.poll(ticks_ms()))
+
+    if is_holding_volume_button and volume_hold_start is not None and ticks_diff(ticks_ms(), volume_hold_start) >= HOLD_MS:
+        special_handlers[VOLUME_ENCODER_HOLD].run()
         volume_hold_start = None
         is_holding_volume_button = False
-    if is_holding_volume_button and volume_hold_start and (time.monotonic() - volume_hold_start) >= 1:
-        run_special_action("volume_encoder_hold", special_actions)
-        volume_hold_start = None
-        is_holding_volume_button = False
-    last_volume_button_state = current_volume_button_state
-    
-    # encoder2 button logic (click/hold)
-    current_display_button_state = encoder2_button.value
-    if not current_display_button_state and last_display_button_state and debounce_check(last_encoder2_action_time, 0.2):
-        display_hold_start = time.monotonic()
-        is_holding_display_button = True
-    if current_display_button_state and not last_display_button_state:
-        if is_holding_display_button and display_hold_start and (time.monotonic() - display_hold_start) < 1:
-            internal_action = run_special_action("display_encoder_click", special_actions)
-            if internal_action == "profile_next":
-                selected_index = (selected_index + 1) % len(image_files)
-            elif internal_action == "profile_prev":
-                selected_index = (selected_index - 1) % len(image_files)
-
-            if internal_action in ("profile_next", "profile_prev"):
-                bitmap = load_image(selected_index)
-                if bitmap:
-                    splash = displayio.Group()
-                    image_sprite = displayio.TileGrid(bitmap, pixel_shader=bitmap.pixel_shader)
-                    image_sprite.x = (display.width - bitmap.width) // 2
-                    image_sprite.y = (display.height - bitmap.height) // 2
-                    splash.append(image_sprite)
-                    display.root_group = splash
-                    is_showing_image = True
-                    image_display_start = time.monotonic()
-            last_encoder2_action_time = time.monotonic()
-        display_hold_start = None
-        is_holding_display_button = False
 
-    if is_holding_display_button and display_hold_start and (time.monotonic() - display_hold_start) >= 1:
-        internal_action = run_special_action("display_encoder_hold", special_actions)
-        if internal_action == "profile_next":
-            selected_index = (selected_index + 1) % len(image_files)
-            draw_bubbles(selected_index)
-        elif internal_action == "profile_prev":
-            selected_index = (selected_index - 1) % len(image_files)
-            draw_bubbles(selected_index)
+    if is_holding_display_button and display_hold_start is not None and ticks_diff(ticks_ms(), display_hold_start) >= HOLD_MS:
+        step = special_handlers[DISPLAY_ENCODER_HOLD].run()
+        if step:
+            selected_index = (selected_index + step) % len(image_files)
+            draw_profiles()
         display_hold_start = None
         is_holding_display_button = False
-        last_encoder2_action_time = time.monotonic()
-
-    last_display_button_state = current_display_button_state
-        
-    #profile
-    for row_index, row_pin in enumerate(rows):
-        row_pin.value = True
-        for col_index, col_pin in enumerate(cols):
-            if col_pin.value and (time.monotonic() - last_key_press_time > debounce_delay):
-                key_number = key_mapping[(row_index, col_index)]
-                if key_number == 6:
-                    print(f"[MATRIX] *** KEY 6 DETECTED at ({row_index}, {col_index}) ***")
-                execute_action(key_number, selected_index)
-                last_key_press_time = time.monotonic()
-        row_pin.value = False
-
-    # Add this code at the end of the while loop to check if it's time to switch back to bubbles
-    if is_showing_image and (time.monotonic() - image_display_start) >= 1.0:
-        draw_bubbles(selected_index)
-        is_showing_image = False
\ No newline at end of file
+        last_encoder2_action_time = ticks_ms()
+
+    if redraw_due is not None and not ticks_less(ticks_ms(), redraw_due):
+        stats.mark_busy()
+        draw_profiles()
+        redraw_due = None
+        redraw_deadline = None
+        # A fresh render replaces any profile icon still on screen.
+        is_showing_image = False
+
+    # A profile icon is shown for IMAGE_SHOW_MS, then the profile list comes back.
+    if is_showing_image and ticks_diff(ticks_ms(), image_display_start) >= IMAGE_SHOW_MS:
+        stats.mark_busy()
+        draw_profiles()
+        is_showing_image = False
+
+    macro_player.tick()
+    text_stream.tick()
+    launcher.tick()
+    bulk_paste.tick()
+
+    if diagnostics_on and not ticks_less(ticks_ms(), diag_due):
+        refresh_diagnostics()
+
+    # Deferred startup work, one step per pass and never while keys are down.
+    if startup_tasks and held_inputs == 0:
+        startup_tasks.pop(0)()
+        governor.mark_activity()
+        stats.mark_busy()
+
+    # Held inputs, running macros or text and pending display timers keep the loop in the fast band.
+    if (
+        is_showing_image
+        or held_inputs > 0
+        or redraw_due is not None
+        or macro_player.playing
+        or text_stream.running
+        or launcher.running
+        or bulk_paste.running
+    ):
+        governor.mark_activity()
+
+    if trace is not None and traced_profile != selected_index:
+        trace.record(hidtrace.PROFILE, selected_index, 0, ticks_ms())
+        traced_profile = selected_index
+
+    # Coalesced NVM write, only once the pad has been idle for a while.
+    state.set_profile(selected_index)
+    if state.maybe_flush(governor.idle_ms()):
+        stats.mark_busy()
+
+    # Explicit collections only in quiet windows; the steady loop itself
+    # allocates nothing, so automatic GC should not trigger mid-input.
+    if governor.collect():
+        stats.mark_collect()
+
+    stats.tick()
+    governor.wait(release_inputs, restore_inputs)
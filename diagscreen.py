@@ -0,0 +1,52 @@
+"""SH1106 diagnostics page: loop health readings in six fixed rows.
+
+All labels are built once. `update()` rewrites only the values that
+changed and then refreshes the display itself; auto refresh is off while
+the page is shown, so the I2C traffic happens only at the caller's chosen
+rate, and the caller can leave that pass out of the loop timings.
+"""
+import displayio
+import terminalio
+from adafruit_display_text import label
+
+ROWS = (
+    ("loop", "{} Hz"),
+    ("latency", "{} ms"),
+    ("hid queue", "{}"),
+    ("free heap", "{} B"),
+    ("gc runs", "{}"),
+    ("enc loss", "{} steps"),
+)
+LINE_HEIGHT = 10
+VALUE_X = 60
+
+
+class DiagnosticsScreen:
+    def __init__(self, display):
+        self.display = display
+        self.group = displayio.Group()
+        self.values = []
+        self.shown = [None] * len(ROWS)
+        for row, (name, _format) in enumerate(ROWS):
+            y = 5 + row * LINE_HEIGHT
+            self.group.append(label.Label(terminalio.FONT, text=name, color=0xFFFFFF, x=0, y=y))
+            value = label.Label(terminalio.FONT, text="-", color=0xFFFFFF, x=VALUE_X, y=y)
+            self.values.append(value)
+            self.group.append(value)
+
+    def show(self):
+        self.display.auto_refresh = False
+        self.display.root_group = self.group
+        self.display.refresh()
+
+    def hide(self):
+        """Give the display back to auto refresh; the caller redraws its own page."""
+        self.display.auto_refresh = True
+
+    def update(self, readings):
+        """Show `readings` (one number per row of ROWS) and refresh once."""
+        for index, reading in enumerate(readings):
+            if reading != self.shown[index]:
+                self.shown[index] = reading
+                self.values[index].text = ROWS[index][1].format(reading)
+        self.display.refresh()
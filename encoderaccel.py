@@ -0,0 +1,63 @@
+"""Encoder acceleration curve, mirroring the rotaryio2 native implementation.
+
+Each detent turned at or above a curve point's velocity (detents per second)
+counts as that point's multiplier in steps, so slow turns stay precise while
+fast sweeps cover a large range. `rotaryio2.IncrementalEncoder2` does this in
+its quadrature interrupt; this module is the reference used on stock
+CircuitPython builds and on the host, where recorded rotation traces can be
+replayed with `AccelerationCurve.replay()`.
+"""
+from ticks import ticks_diff
+
+VELOCITY_RESET_MS = 250
+
+
+class AccelerationCurve:
+    def __init__(self, points=(), reset_ms=VELOCITY_RESET_MS):
+        previous = -1
+        for velocity, multiplier in points:
+            if velocity <= previous:
+                raise ValueError("acceleration must be sorted by velocity")
+            if multiplier < 1:
+                raise ValueError("multiplier must be at least 1")
+            previous = velocity
+        self.points = tuple(points)
+        self.reset_ms = reset_ms
+        self.velocity = 0
+        self.last_detent_ms = None
+
+    def reset(self):
+        self.velocity = 0
+        self.last_detent_ms = None
+
+    def multiplier(self, velocity):
+        multiplier = 1
+        for threshold, point_multiplier in self.points:
+            if velocity < threshold:
+                break
+            multiplier = point_multiplier
+        return multiplier
+
+    def steps(self, detents, timestamp):
+        """Return the signed step count for `detents` seen at tick `timestamp`."""
+        if not detents:
+            return 0
+        count = detents if detents > 0 else -detents
+        if self.last_detent_ms is None:
+            elapsed = self.reset_ms
+        else:
+            elapsed = ticks_diff(timestamp, self.last_detent_ms)
+        if elapsed >= self.reset_ms or elapsed < 0:
+            # First detent after a pause: always precise.
+            self.velocity = 0
+        else:
+            instant = (count * 1000) // (elapsed or 1)
+            # Exponential moving average with alpha = 1/4.
+            self.velocity = (self.velocity * 3 + instant) // 4 if self.velocity else instant
+        self.last_detent_ms = timestamp
+        return detents * self.multiplier(self.velocity)
+
+    def replay(self, trace):
+        """Feed `(timestamp, detents)` pairs and return the step count for each."""
+        self.reset()
+        return [self.steps(detents, timestamp) for timestamp, detents in trace]
@@ -0,0 +1,83 @@
+"""terminalio.FONT strings rendered once into bitmaps, for swapping into TileGrids.
+
+Setting a Label's text looks up every glyph and rebuilds its tile grid. The
+profile selector only ever shows a fixed set of strings (profile numbers and
+names), so each one is drawn once into a bitmap and a redraw just points a
+TileGrid at another cached bitmap. `retain()` keeps a cache down to the
+strings near the visible window, so its size does not grow with the number
+of profiles. All bitmaps of one cache share a box
+size, because CircuitPython only swaps a TileGrid's bitmap for one of the
+same size; the text is centred in the box, or clipped on the right when it
+is wider.
+"""
+import bitmaptools
+import displayio
+import terminalio
+
+FONT = terminalio.FONT
+GLYPH_WIDTH, GLYPH_HEIGHT = FONT.get_bounding_box()[:2]
+
+
+def render_text(text, width, height=GLYPH_HEIGHT, font=FONT):
+    """A 2-colour bitmap with `text` in colour 1, centred in `width` x `height`."""
+    bitmap = displayio.Bitmap(width, height, 2)
+    glyphs = [font.get_glyph(ord(char)) or font.get_glyph(ord("?")) for char in text]
+    text_width = sum(glyph.shift_x for glyph in glyphs)
+    x = max((width - text_width) // 2, 0)
+    for glyph in glyphs:
+        if x + glyph.width > width:
+            break
+        columns = glyph.bitmap.width // glyph.width
+        source_x = (glyph.tile_index % columns) * glyph.width
+        source_y = (glyph.tile_index // columns) * glyph.height
+        bitmaptools.blit(
+            bitmap,
+            glyph.bitmap,
+            x,
+            (height - glyph.height) // 2,
+            x1=source_x,
+            y1=source_y,
+            x2=source_x + glyph.width,
+            y2=source_y + glyph.height,
+        )
+        x += glyph.shift_x
+    return bitmap
+
+
+class GlyphCache:
+    """Rendered bitmaps of one box size, keyed by their text."""
+
+    def __init__(self, width, height=GLYPH_HEIGHT):
+        self.width = width
+        self.height = height
+        self.bitmaps = {}
+
+    def preload(self, texts):
+        for text in texts:
+            self.get(text)
+
+    def retain(self, texts):
+        """Drop every bitmap not for one of `texts`, and render the missing ones."""
+        keep = set(texts)
+        for text in [text for text in self.bitmaps if text not in keep]:
+            del self.bitmaps[text]
+        self.preload(keep)
+
+    def clear(self):
+        self.bitmaps.clear()
+
+    def get(self, text):
+        """The bitmap for `text`; strings not preloaded are rendered on first use."""
+        bitmap = self.bitmaps.get(text)
+        if bitmap is None:
+            bitmap = self.bitmaps[text] = render_text(text, self.width, self.height)
+        return bitmap
+
+
+def text_palette(color):
+    """Palette drawing colour 1 of a cached bitmap in `color` over a transparent background."""
+    palette = displayio.Palette(2)
+    palette[0] = 0x000000
+    palette[1] = color
+    palette.make_transparent(0)
+    return palette
@@ -0,0 +1,133 @@
+"""Adaptive poll rate, light sleep and CPU boost for the main loop.
+
+The loop runs flat out while inputs are active, slows to a short poll
+interval once nothing has happened for a while, and after a longer quiet
+period enters light sleep until one of the input pins changes level.
+Garbage collection is scheduled into those quiet periods as well, so an
+automatic collection does not land in the middle of a burst of input.
+"""
+import gc
+import time
+
+from ticks import ticks_ms, ticks_diff
+
+try:
+    import alarm
+except ImportError:
+    alarm = None
+
+try:
+    import microcontroller
+except ImportError:
+    microcontroller = None
+
+
+class LoopGovernor:
+    def __init__(
+        self,
+        idle_after_ms=1000,
+        idle_interval=0.002,
+        sleep_after_ms=30000,
+        max_sleep=60,
+        boost_frequency=None,
+        collect_after_ms=250,
+    ):
+        self.idle_after_ms = idle_after_ms
+        self.idle_interval = idle_interval
+        self.sleep_after_ms = sleep_after_ms
+        self.max_sleep = max_sleep
+        self.boost_frequency = boost_frequency
+        self.collect_after_ms = collect_after_ms
+        self.last_activity = ticks_ms()
+        self.collect_pending = True
+        self.collections = 0
+        self._base_frequency = None
+
+    def mark_activity(self):
+        """Reset the inactivity timer; call whenever an input or timer is live."""
+        self.last_activity = ticks_ms()
+        self.collect_pending = True
+
+    def idle_ms(self):
+        return ticks_diff(ticks_ms(), self.last_activity)
+
+    def collect(self):
+        """Run gc.collect() once per idle window; returns True when it ran.
+
+        Nothing is collected until the inputs have been quiet for
+        `collect_after_ms`, and then only once until the next activity.
+        """
+        if not self.collect_pending or self.idle_ms() < self.collect_after_ms:
+            return False
+        gc.collect()
+        self.collect_pending = False
+        self.collections += 1
+        return True
+
+    def wait(self, release_inputs=None, restore_inputs=None):
+        """Pace one loop pass according to how long the inputs have been idle.
+
+        Returns True when the loop came back from a light sleep.
+        `release_inputs` must free the input pins and return PinAlarms for them;
+        `restore_inputs` re-creates the inputs after waking.
+        """
+        idle = self.idle_ms()
+        if idle < self.idle_after_ms:
+            return False
+        if (
+            alarm is None
+            or release_inputs is None
+            or not self.sleep_after_ms
+            or idle < self.sleep_after_ms
+        ):
+            time.sleep(self.idle_interval)
+            return False
+
+        pin_alarms = release_inputs()
+        try:
+            time_alarm = alarm.time.TimeAlarm(monotonic_time=time.monotonic() + self.max_sleep)
+            woken_by = alarm.light_sleep_until_alarms(time_alarm, *pin_alarms)
+        finally:
+            # PinAlarms release their pins when light sleep returns.
+            if restore_inputs is not None:
+                restore_inputs()
+        # Stay in the fast poll band while the user is likely to continue; a
+        # timer wake only gives the loop one pass (e.g. to poll the host) and
+        # sleeps again.
+        if not isinstance(woken_by, alarm.time.TimeAlarm):
+            self.mark_activity()
+        return True
+
+    def boost(self):
+        """Context manager raising the CPU clock while a long action runs."""
+        return _Boost(self)
+
+    def _set_frequency(self, frequency):
+        try:
+            microcontroller.cpu.frequency = frequency
+            return True
+        except (AttributeError, NotImplementedError, ValueError) as e:
+            print(f"[GOVERNOR] CPU frequency change unsupported: {e}")
+            self.boost_frequency = None
+            return False
+
+
+class _Boost:
+    def __init__(self, governor):
+        self.governor = governor
+        self.active = False
+
+    def __enter__(self):
+        governor = self.governor
+        if governor.boost_frequency and microcontroller is not None:
+            governor._base_frequency = microcontroller.cpu.frequency
+            if governor._base_frequency != governor.boost_frequency:
+                self.active = governor._set_frequency(governor.boost_frequency)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.active:
+            self.governor._set_frequency(self.governor._base_frequency)
+            self.active = False
+        self.governor.mark_activity()
+        return False
@@ -0,0 +1,106 @@
+"""Custom USB HID device set enabled by boot.py.
+
+Replaces CircuitPython's default devices with:
+
+    NKRO keyboard     report ID 1, 16 bytes: modifier bits, then one bit per
+                      usage 0x00-0x77, so any number of keys fit one report
+    consumer control  CircuitPython's stock device (report ID 3)
+    raw HID           report ID 6, 64 bytes each way on the vendor page
+                      0xFF60 (usage 0x61, as QMK/VIA use), carrying hostlink
+                      frames for config pushes and telemetry (rawhid.py)
+
+The firmware tells the sets apart by the raw HID device: when it is present
+the keyboard sends NKRO reports (keyreports.py), otherwise boot reports.
+"""
+try:
+    import usb_hid
+except ImportError:
+    usb_hid = None
+
+NKRO_REPORT_ID = 1
+NKRO_REPORT_SIZE = 16
+# Highest usage with a bit in the NKRO report (F24 is 0x73).
+NKRO_MAX_USAGE = 0x77
+
+RAW_REPORT_ID = 6
+RAW_REPORT_SIZE = 64
+RAW_USAGE_PAGE = 0xFF60
+RAW_USAGE = 0x61
+
+NKRO_KEYBOARD_DESCRIPTOR = bytes(
+    (
+        0x05, 0x01,        # Usage Page (Generic Desktop)
+        0x09, 0x06,        # Usage (Keyboard)
+        0xA1, 0x01,        # Collection (Application)
+        0x85, NKRO_REPORT_ID,
+        0x05, 0x07,        #   Usage Page (Keyboard/Keypad)
+        0x19, 0xE0,        #   Usage Minimum (Left Control)
+        0x29, 0xE7,        #   Usage Maximum (Right GUI)
+        0x15, 0x00,        #   Logical Minimum (0)
+        0x25, 0x01,        #   Logical Maximum (1)
+        0x75, 0x01,        #   Report Size (1)
+        0x95, 0x08,        #   Report Count (8)
+        0x81, 0x02,        #   Input (Data, Variable, Absolute): modifiers
+        0x19, 0x00,        #   Usage Minimum (0)
+        0x29, NKRO_MAX_USAGE,
+        0x95, NKRO_MAX_USAGE + 1,
+        0x81, 0x02,        #   Input (Data, Variable, Absolute): key bitmap
+        0x05, 0x08,        #   Usage Page (LEDs)
+        0x19, 0x01,        #   Usage Minimum (Num Lock)
+        0x29, 0x05,        #   Usage Maximum (Kana)
+        0x95, 0x05,        #   Report Count (5)
+        0x91, 0x02,        #   Output (Data, Variable, Absolute): LEDs
+        0x75, 0x03,        #   Report Size (3)
+        0x95, 0x01,        #   Report Count (1)
+        0x91, 0x01,        #   Output (Constant): padding
+        0xC0,              # End Collection
+    )
+)
+
+RAW_HID_DESCRIPTOR = bytes(
+    (
+        0x06, RAW_USAGE_PAGE & 0xFF, RAW_USAGE_PAGE >> 8,  # Usage Page (vendor)
+        0x09, RAW_USAGE,   # Usage
+        0xA1, 0x01,        # Collection (Application)
+        0x85, RAW_REPORT_ID,
+        0x15, 0x00,        #   Logical Minimum (0)
+        0x26, 0xFF, 0x00,  #   Logical Maximum (255)
+        0x75, 0x08,        #   Report Size (8)
+        0x95, RAW_REPORT_SIZE,
+        0x09, 0x62,        #   Usage (data in)
+        0x81, 0x02,        #   Input (Data, Variable, Absolute)
+        0x95, RAW_REPORT_SIZE,
+        0x09, 0x63,        #   Usage (data out)
+        0x91, 0x02,        #   Output (Data, Variable, Absolute)
+        0xC0,              # End Collection
+    )
+)
+
+
+def custom_devices():
+    """Devices for usb_hid.enable() in boot.py."""
+    keyboard = usb_hid.Device(
+        report_descriptor=NKRO_KEYBOARD_DESCRIPTOR,
+        usage_page=0x01,
+        usage=0x06,
+        report_ids=(NKRO_REPORT_ID,),
+        in_report_lengths=(NKRO_REPORT_SIZE,),
+        out_report_lengths=(1,),
+    )
+    raw = usb_hid.Device(
+        report_descriptor=RAW_HID_DESCRIPTOR,
+        usage_page=RAW_USAGE_PAGE,
+        usage=RAW_USAGE,
+        report_ids=(RAW_REPORT_ID,),
+        in_report_lengths=(RAW_REPORT_SIZE,),
+        out_report_lengths=(RAW_REPORT_SIZE,),
+    )
+    return (keyboard, usb_hid.Device.CONSUMER_CONTROL, raw)
+
+
+def raw_device(devices):
+    """The raw HID device among `devices`, or None with the default set."""
+    for device in devices:
+        if device.usage_page == RAW_USAGE_PAGE and device.usage == RAW_USAGE:
+            return device
+    return None
@@ -0,0 +1,165 @@
+"""Binary trace of input events and the HID reports they produced.
+
+Every record is 16 bytes, `<BBhI8s`:
+
+    kind       input event kind (inputcapture KEY_PRESSED ... ENCODER_MOVED),
+               HID_KEYBOARD / HID_CONSUMER / HID_OTHER for a sent report,
+               or PROFILE when the selected profile changed
+    number     key/button/encoder number, report length, or profile index
+    value      encoder steps (0 otherwise)
+    timestamp  ticks_ms() at capture (inputs) or at send (reports)
+    data       report bytes, zero padded; NKRO keyboard reports are stored as
+               the equivalent boot report (first six keys), so traces from
+               either HID device set compare and replay alike
+
+The device keeps the newest records in a preallocated RAM ring
+(`TraceBuffer`) and `dump()` serialises them behind a short header. The
+same module decodes dumps on a host (host/trace_tool.py), either from the
+binary TRACE frame saved by host/macropad_host.py or from the hex lines
+printed on the serial console when no host agent is listening.
+"""
+import struct
+
+from keyreports import NKRO
+from ticks import ticks_ms
+
+try:
+    import usb_hid
+except ImportError:
+    usb_hid = None
+
+RECORD = "<BBhI8s"
+RECORD_SIZE = struct.calcsize(RECORD)
+MAGIC = b"MPT1"
+# magic, record count
+HEADER = "<4sH"
+HEADER_SIZE = struct.calcsize(HEADER)
+
+HID_KEYBOARD = 0x10
+HID_CONSUMER = 0x11
+HID_OTHER = 0x1F
+PROFILE = 0x20
+
+# Hex characters per console line of a dump.
+DUMP_LINE = 64
+
+
+class TraceBuffer:
+    def __init__(self, capacity=512):
+        self.capacity = capacity
+        self.data = bytearray(capacity * RECORD_SIZE)
+        self.next = 0
+        self.count = 0
+
+    def record(self, kind, number, value, timestamp, data=b""):
+        struct.pack_into(RECORD, self.data, self.next * RECORD_SIZE, kind, number, value, timestamp, data)
+        self.next = (self.next + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def dump(self):
+        """Header plus the buffered records, oldest first."""
+        start = (self.next - self.count) % self.capacity * RECORD_SIZE
+        end = start + self.count * RECORD_SIZE
+        body = self.data[start:end]
+        if end > len(self.data):
+            body = self.data[start:] + self.data[: end - len(self.data)]
+        return struct.pack(HEADER, MAGIC, self.count) + bytes(body)
+
+    def clear(self):
+        self.next = 0
+        self.count = 0
+
+
+class TracingDevice:
+    """usb_hid.Device stand-in that records each report before sending it."""
+
+    def __init__(self, device, trace):
+        self.device = device
+        self.trace = trace
+        usage = (device.usage_page, device.usage)
+        if usage == (0x01, 0x06):
+            self.kind = HID_KEYBOARD
+        elif usage == (0x0C, 0x01):
+            self.kind = HID_CONSUMER
+        else:
+            self.kind = HID_OTHER
+        self.boot_report = bytearray(8)
+
+    def send_report(self, report, report_id=None):
+        if self.kind == HID_KEYBOARD and len(report) == NKRO.size:
+            NKRO.to_boot(report, self.boot_report)
+            self.trace.record(self.kind, 8, 0, ticks_ms(), self.boot_report)
+        else:
+            self.trace.record(self.kind, len(report), 0, ticks_ms(), report)
+        if report_id is None:
+            self.device.send_report(report)
+        else:
+            self.device.send_report(report, report_id)
+
+    def __getattr__(self, name):
+        return getattr(self.device, name)
+
+
+# Set by the firmware before the HID users are imported to turn tracing on.
+trace = None
+_devices = None
+
+
+def hid_devices():
+    """usb_hid.devices, with keyboard and consumer wrapped in TracingDevice while `trace` is set."""
+    global _devices
+    if _devices is None:
+        devices = usb_hid.devices
+        if trace is not None:
+            # The raw HID link is not input or HID output; it stays untraced.
+            devices = [
+                TracingDevice(device, trace) if device.usage_page in (0x01, 0x0C) else device
+                for device in devices
+            ]
+        _devices = devices
+    return _devices
+
+
+def print_dump(data):
+    """Write a dump to the console as hex lines (see parse_dump)."""
+    text = data.hex()
+    print(f"[TRACE] begin {len(data)}")
+    for start in range(0, len(text), DUMP_LINE):
+        print(f"[TRACE] {text[start : start + DUMP_LINE]}")
+    print("[TRACE] end")
+
+
+def parse_dump(data):
+    """Records from a binary dump or a console log containing one.
+
+    Returns a list of (kind, number, value, timestamp, report bytes).
+    """
+    if not data.startswith(MAGIC):
+        text = data.decode("utf-8", "replace")
+        lines = []
+        inside = False
+        for line in text.splitlines():
+            line = line.strip()
+            if line.startswith("[TRACE] begin"):
+                inside = True
+                lines = []
+            elif line == "[TRACE] end":
+                inside = False
+            elif inside and line.startswith("[TRACE] "):
+                lines.append(line[len("[TRACE] ") :])
+        data = bytes.fromhex("".join(lines))
+    magic, count = struct.unpack_from(HEADER, data)
+    if magic != MAGIC:
+        raise ValueError("not a trace dump")
+    records = []
+    for index in range(count):
+        kind, number, value, timestamp, report = struct.unpack_from(
+            RECORD, data, HEADER_SIZE + index * RECORD_SIZE
+        )
+        if kind in (HID_KEYBOARD, HID_CONSUMER, HID_OTHER):
+            report = report[:number]
+        else:
+            report = b""
+        records.append((kind, number, value, timestamp, report))
+    return records
@@ -0,0 +1,101 @@
+"""Precompile the firmware modules to .mpy and copy the firmware to a drive.
+
+Importing a .mpy skips parsing and compiling on the device, which is most of
+the import cost of the larger modules (keyout, macro, layouts ...):
+
+    python host/build_mpy.py /media/$USER/CIRCUITPY
+    python host/build_mpy.py build/circuitpy --mpy-cross ~/bin/mpy-cross-9.2.4
+
+Needs the mpy-cross release matching the board's CircuitPython version
+(9.x here), from https://adafruit-circuit-python.s3.amazonaws.com/index.html?prefix=bin/mpy-cross/.
+Entry points (boot.py, code.py, main.py) stay .py. A stale .py copy of a
+compiled module is deleted from the target, because it would be imported
+instead of the .mpy. Unless --no-data or --no-lint is given, the config
+files are checked with config_lint.py first and nothing is written when it
+finds errors.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+from config_lint import lint
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+ENTRY_POINTS = ("boot.py", "code.py", "main.py")
+DATA = ("keysfile.json", "special-keyout.json", "hardware.json", "img", "lib")
+
+
+def firmware_modules():
+    return sorted(
+        name
+        for name in os.listdir(ROOT)
+        if name.endswith(".py") and name not in ENTRY_POINTS
+    )
+
+
+def compile_module(mpy_cross, name, target):
+    output = os.path.join(target, name[:-3] + ".mpy")
+    subprocess.run([mpy_cross, "-o", output, os.path.join(ROOT, name)], check=True)
+    stale = os.path.join(target, name)
+    if os.path.exists(stale):
+        os.remove(stale)
+    return os.path.getsize(output)
+
+
+def copy_item(name, target):
+    source = os.path.join(ROOT, name)
+    destination = os.path.join(target, name)
+    if os.path.isdir(source):
+        shutil.copytree(source, destination, dirs_exist_ok=True)
+    elif os.path.exists(source):
+        shutil.copy2(source, destination)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("target", help="CIRCUITPY drive or output directory")
+    parser.add_argument("--mpy-cross", default="mpy-cross", help="mpy-cross executable")
+    parser.add_argument(
+        "--no-data", action="store_true", help="only compile modules; skip JSON, img/ and lib/"
+    )
+    parser.add_argument(
+        "--no-lint", action="store_true", help="copy the config files without checking them"
+    )
+    args = parser.parse_args(argv)
+
+    if not args.no_data and not args.no_lint:
+        errors = [
+            f"{report.filename} {path}: {message}"
+            for report in lint(ROOT)
+            for path, message in report.errors
+        ]
+        if errors:
+            for line in errors:
+                print(f"[BUILD] {line}", file=sys.stderr)
+            print("[BUILD] Config has errors, nothing written (see host/config_lint.py)", file=sys.stderr)
+            return 1
+
+    os.makedirs(args.target, exist_ok=True)
+    try:
+        for name in firmware_modules():
+            size = compile_module(args.mpy_cross, name, args.target)
+            print(f"[BUILD] {name[:-3]}.mpy {size} bytes")
+    except FileNotFoundError:
+        print(f"[BUILD] {args.mpy_cross} not found; pass --mpy-cross", file=sys.stderr)
+        return 1
+    except subprocess.CalledProcessError as e:
+        print(f"[BUILD] mpy-cross failed: {e}", file=sys.stderr)
+        return 1
+    for name in ENTRY_POINTS:
+        copy_item(name, args.target)
+    if not args.no_data:
+        for name in DATA:
+            copy_item(name, args.target)
+    print(f"[BUILD] Firmware written to {args.target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
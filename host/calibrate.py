@@ -0,0 +1,195 @@
+"""Find the fastest typing rate a host takes without dropping keystrokes.
+
+    python host/calibrate.py                        # pad on the auto-detected data port
+    python host/calibrate.py --port COM7 --host-profile laptop
+    python host/calibrate.py --simulate 8           # no device: simulated host, 8 ms polling
+
+The pad types TEST_TEXT and Enter into this terminal (keep it focused) at
+rising rates, and every line that comes back is compared with the text
+sent. The first mismatch or missing line ends the run; SAFETY_MARGIN of the
+fastest rate that passed every time is stored for the host profile in the
+rates file and sent to the pad. host/macropad_host.py sends the stored rate
+again whenever the pad starts, and the pad paces text typing and key combos
+with it. Stop macropad_host.py while calibrating: both need the data port.
+
+--simulate runs keyout.py in host/simulator.py instead and echoes its HID
+reports through a model host that reads the keyboard state every N ms, so
+key presses shorter than that are lost (as on remote desktops and VMs).
+"""
+import argparse
+import contextlib
+import io
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from macropad_host import RATES_FILE, FrameStream, find_data_port, save_typing_rate  # noqa: E402
+
+# Letters, shifted letters, digits, punctuation and repeated keys.
+TEST_TEXT = "The quick brown fox jumps over the lazy dog, SPHINX OF BLACK QUARTZ 0123456789. Look 1100"
+FIRST_RATE = 10.0
+RATE_FACTOR = 1.25
+MAX_RATE = 1000.0
+# Runs per rate; all must come back intact.
+PASSES = 2
+SAFETY_MARGIN = 0.8
+# Seconds allowed beyond the nominal typing time for the pad and the echo.
+TYPED_SLACK = 2.0
+ECHO_TIMEOUT = 1.0
+ENTER = 0x28
+
+
+def trial_rates(first=FIRST_RATE, factor=RATE_FACTOR, highest=MAX_RATE):
+    rate = first
+    while rate <= highest:
+        yield round(rate, 1)
+        rate *= factor
+
+
+class ConsoleEcho:
+    """Lines typed into this terminal, read by a background thread."""
+
+    def __init__(self):
+        self.lines = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        for line in sys.stdin:
+            self.lines.put(line.rstrip("\r\n"))
+
+    def read_line(self, timeout=ECHO_TIMEOUT):
+        try:
+            return self.lines.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class PadTarget:
+    """The pad types each trial line into the host; ConsoleEcho reads it back."""
+
+    def __init__(self, stream, echo):
+        self.stream = stream
+        self.echo = echo
+
+    def type_line(self, rate, text):
+        self.stream.send("CAL", f"{rate:g} {text}")
+        deadline = time.monotonic() + (len(text) + 1) / rate + TYPED_SLACK
+        while time.monotonic() < deadline:
+            frame = self.stream.receive()
+            if frame is not None and frame[0] == "TYPED":
+                return self.echo.read_line()
+        print("[CAL] The pad did not confirm the line", file=sys.stderr)
+        return None
+
+    def apply(self, rate):
+        self.stream.send("RATE", f"{rate:g}")
+
+
+class SimulatedHost:
+    """Echo stand-in: keyout.py on simulated HID, read by a host polling every `poll_ms`."""
+
+    def __init__(self, poll_ms):
+        from simulator import SimClock, load_firmware
+
+        self.poll_ms = poll_ms
+        self.clock = SimClock()
+        self.output = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.keyout = load_firmware(self.clock, self.output).keyout
+        self.chars = {}
+
+    def _learn(self, text):
+        layout = self.keyout.text_layout
+        for char in text:
+            strokes = layout.keystrokes(char, None)
+            if strokes is not None and len(strokes) == 1:
+                self.chars[strokes[0]] = char
+
+    def type_line(self, rate, text):
+        self._learn(text)
+        del self.output[:]
+        self.keyout.type_calibration_line(rate, text)
+        # The host only sees the last report of each polling interval.
+        seen = {}
+        for now, usage_page, report in self.output:
+            if usage_page == 0x01:
+                seen[now // self.poll_ms] = report
+        line = []
+        previous = bytes(8)
+        for _interval, report in sorted(seen.items()):
+            for usage in report[2:]:
+                if usage and usage not in previous[2:]:
+                    if usage == ENTER:
+                        return "".join(line)
+                    line.append(self.chars.get((report[0], usage), "?"))
+            previous = report
+        return None
+
+    def apply(self, rate):
+        self.keyout.set_typing_rate(rate)
+
+
+def calibrate(target, text=TEST_TEXT, passes=PASSES):
+    """Fastest rate at which every pass came back intact, or None."""
+    best = None
+    for rate in trial_rates():
+        for _ in range(passes):
+            echoed = target.type_line(rate, text)
+            if echoed != text:
+                shown = "nothing" if echoed is None else repr(echoed)
+                print(f"[CAL] {rate:g} chars/s: FAILED, got {shown}")
+                return best
+        print(f"[CAL] {rate:g} chars/s: ok")
+        best = rate
+    return best
+
+
+def main(argv=None):
+    import platform
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", help="serial device of the macropad data port")
+    parser.add_argument(
+        "--host-profile", default=platform.node(), help="name the rate is stored under (default: hostname)"
+    )
+    parser.add_argument("--rates-file", default=RATES_FILE, help="where calibrated rates are kept")
+    parser.add_argument(
+        "--simulate", type=int, metavar="MS", help="no device: simulated host polling every MS ms"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="do not store the result")
+    args = parser.parse_args(argv)
+
+    if args.simulate:
+        return _run(SimulatedHost(args.simulate), args)
+
+    import serial
+
+    port_name = args.port or find_data_port()
+    if port_name is None:
+        parser.error("no macropad data port found; pass --port")
+    with serial.Serial(port_name, timeout=0.1) as port:
+        print(f"[CAL] Typing into this terminal from {port_name}; keep it focused.")
+        time.sleep(2)
+        return _run(PadTarget(FrameStream(port), ConsoleEcho()), args)
+
+
+def _run(target, args):
+    best = calibrate(target)
+    if best is None:
+        print("[CAL] No rate passed; nothing stored")
+        return 1
+    safe = round(best * SAFETY_MARGIN, 1)
+    print(f"[CAL] Fastest clean rate {best:g} chars/s, safe rate {safe:g} chars/s")
+    target.apply(safe)
+    if not args.dry_run:
+        save_typing_rate(args.host_profile, safe, args.rates_file)
+        print(f"[CAL] Stored for {args.host_profile} in {args.rates_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,493 @@
+"""Check keysfile.json, special-keyout.json and hardware.json before deployment.
+
+    python host/config_lint.py                  # the files next to code.py
+    python host/config_lint.py --root build/circuitpy -v
+
+Every action is compiled the way the firmware does it at load: key tokens
+are resolved to usages and the chord must fit the keyboard report (NKRO
+when boot.py sets CUSTOM_HID), macros go through macro.compile_macro with
+the configured layout, and text must be typeable with that layout and
+`unicode_input`. Key numbers are checked against the matrix in hardware.json.
+Problems are printed with their JSON path:
+
+    keysfile.json profiles/0/4/key: error: unknown key token 'ctlr'
+
+Errors are things the pad would skip or get wrong at runtime; warnings are
+settings it ignores. The exit status is 1 when there are errors (or
+warnings, with --strict). host/build_mpy.py runs this before copying the
+config to the drive.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from inputcapture import ENCODER_BACKENDS, KEY_BACKENDS  # noqa: E402
+from keyreports import BOOT, NKRO  # noqa: E402
+from keytokens import keycode_for, media_code_for  # noqa: E402
+from layouts import LAYOUT_NAMES, UNICODE_INPUT_MODES, get_layout  # noqa: E402
+from macro import MacroError, compile_macro  # noqa: E402
+from pinmap import DEFAULT_HARDWARE, PinMap  # noqa: E402
+from specialactions import PROFILE_STEPS, SPECIAL_IDS  # noqa: E402
+
+KEYSFILE = "keysfile.json"
+SPECIAL_FILE = "special-keyout.json"
+HARDWARE_FILE = "hardware.json"
+
+TOP_LEVEL_FIELDS = ("profiles", "layout", "unicode_input", "chord_window_ms", "typing_rate", "launch_presets")
+ACTION_FIELDS = (
+    "name",
+    "key",
+    "action",
+    "macro",
+    "text_content",
+    "text_type",
+    "text_press_enter",
+    "software",
+    "command",
+    "launch_method",
+    "launch_preset",
+)
+TEXT_TYPES = ("single", "line-by-line", "paragraph", "bulk")
+LAUNCH_METHODS = ("search", "run")
+LAUNCH_PRESETS = ("fast", "normal", "slow")
+PRESET_TIMES = ("open", "ready", "settle")
+TYPING_RATE_RANGE = (1, 1000)
+# Commands code.py registers in special_commands; "none" does nothing.
+SPECIAL_COMMANDS = ("brightness_up", "brightness_down", "layer_toggle", "trace_dump", "diagnostics", "none")
+
+
+class Report:
+    """Collected problems of one file."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.errors = []
+        self.warnings = []
+        self.compiled = []
+
+    def error(self, path, message):
+        self.errors.append((path, message))
+
+    def warn(self, path, message):
+        self.warnings.append((path, message))
+
+    def lines(self, verbose=False):
+        for level, problems in (("error", self.errors), ("warning", self.warnings)):
+            for path, message in problems:
+                yield f"{self.filename} {path}: {level}: {message}"
+        if verbose:
+            for path, summary in self.compiled:
+                yield f"{self.filename} {path}: {summary}"
+
+
+def custom_hid_enabled(root):
+    """True when boot.py enables the NKRO/raw HID device set."""
+    try:
+        with open(os.path.join(root, "boot.py")) as f:
+            return re.search(r"^CUSTOM_HID\s*=\s*True\b", f.read(), re.MULTILINE) is not None
+    except OSError:
+        return False
+
+
+def _tokens(value):
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list) and all(isinstance(token, str) for token in value):
+        return value
+    return None
+
+
+def resolve_chord(tokens, report_format, report, path):
+    """Usages of the key `tokens`, or None after reporting why they do not work."""
+    usages = []
+    for token in tokens:
+        usage = keycode_for(token)
+        if usage is None:
+            if media_code_for(token) is not None:
+                report.error(path, f"media token {token!r} only works in special-keyout.json and macro media steps")
+            else:
+                report.error(path, f"unknown key token {token!r}")
+            return None
+        usages.append(usage)
+    try:
+        report_format.build(0, usages)
+    except ValueError as e:
+        report.error(path, str(e))
+        return None
+    return usages
+
+
+class KeysfileChecker:
+    def __init__(self, config, key_numbers, report_format, root, report):
+        self.config = config
+        self.key_numbers = key_numbers
+        self.format = report_format
+        self.root = root
+        self.report = report
+        self.presets = set(LAUNCH_PRESETS)
+        self.layout = get_layout("us")
+        self.unicode_input = None
+
+    def check(self):
+        config = self.config
+        report = self.report
+        if not isinstance(config, dict):
+            report.error("/", "top level must be an object")
+            return
+        for field in config:
+            if field not in TOP_LEVEL_FIELDS:
+                report.warn(field, "unknown setting, ignored")
+        layout_name = config.get("layout", "us")
+        if layout_name not in LAYOUT_NAMES:
+            report.error("layout", f"{layout_name!r} is not one of {', '.join(LAYOUT_NAMES)}")
+        else:
+            self.layout = get_layout(layout_name)
+        unicode_input = config.get("unicode_input")
+        if unicode_input is not None and unicode_input not in UNICODE_INPUT_MODES:
+            report.error("unicode_input", f"{unicode_input!r} is not one of {', '.join(UNICODE_INPUT_MODES)}")
+        else:
+            self.unicode_input = unicode_input
+        window = config.get("chord_window_ms", 30)
+        if not isinstance(window, int) or isinstance(window, bool) or window < 0:
+            report.error("chord_window_ms", "must be a whole number of milliseconds")
+        rate = config.get("typing_rate", 25)
+        low, high = TYPING_RATE_RANGE
+        if not isinstance(rate, (int, float)) or isinstance(rate, bool) or not low <= rate <= high:
+            report.error("typing_rate", f"must be a number from {low} to {high}")
+        self.check_presets(config.get("launch_presets", {}))
+
+        profiles = config.get("profiles")
+        if not isinstance(profiles, dict):
+            report.error("profiles", "missing or not an object")
+            return
+        count = 0
+        while str(count) in profiles:
+            self.check_profile(profiles[str(count)], f"profiles/{count}")
+            count += 1
+        for index in profiles:
+            if not (index.isdigit() and int(index) < count):
+                report.warn(f"profiles/{index}", f"not reachable: profiles must be numbered 0..n without gaps (found 0..{count - 1})")
+
+    def check_presets(self, presets):
+        if not isinstance(presets, dict):
+            self.report.error("launch_presets", "must be an object")
+            return
+        for name, preset in presets.items():
+            path = f"launch_presets/{name}"
+            if not isinstance(preset, dict):
+                self.report.error(path, "must be an object of times in seconds")
+                continue
+            self.presets.add(name)
+            for field, value in preset.items():
+                if field not in PRESET_TIMES:
+                    self.report.warn(f"{path}/{field}", f"unknown time, expected one of {', '.join(PRESET_TIMES)}")
+                elif not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+                    self.report.error(f"{path}/{field}", "must be a number of seconds")
+
+    def check_profile(self, profile, path):
+        report = self.report
+        if not isinstance(profile, dict):
+            report.error(path, "profile must be an object")
+            return
+        for field, value in profile.items():
+            field_path = f"{path}/{field}"
+            if field.isdigit():
+                if int(field) not in self.key_numbers:
+                    report.warn(field_path, f"no key {field} in the hardware.json matrix")
+                else:
+                    self.check_action(value, field_path)
+            elif field == "name":
+                if not isinstance(value, str):
+                    report.error(field_path, "must be a string")
+            elif field == "icon":
+                self.check_icon(value, field_path)
+            elif field == "apps":
+                if not isinstance(value, list) or not all(isinstance(app, str) for app in value):
+                    report.error(field_path, "must be a list of executable names")
+            elif field in ("launch_method", "launch_preset"):
+                self.check_launch_setting(field, value, field_path)
+            elif field == "chords":
+                self.check_chords(value, field_path)
+            elif field == "layers":
+                self.check_layers(value, field_path)
+            else:
+                report.warn(field_path, "unknown profile setting, ignored")
+
+    def check_icon(self, icon, path):
+        if not isinstance(icon, str):
+            self.report.error(path, "must be a bitmap path")
+        elif not os.path.exists(os.path.join(self.root, icon.lstrip("/"))):
+            self.report.warn(path, f"{icon} does not exist")
+
+    def check_launch_setting(self, field, value, path):
+        if field == "launch_method" and value not in LAUNCH_METHODS:
+            self.report.error(path, f"{value!r} is not one of {', '.join(LAUNCH_METHODS)}")
+        elif field == "launch_preset" and value not in self.presets:
+            self.report.error(path, f"unknown preset {value!r}")
+
+    def check_chords(self, chords, path):
+        if not isinstance(chords, list):
+            self.report.error(path, "must be a list")
+            return
+        for index, chord in enumerate(chords):
+            chord_path = f"{path}/{index}"
+            if not isinstance(chord, dict):
+                self.report.error(chord_path, "chord must be an object")
+                continue
+            keys = chord.get("keys")
+            if not isinstance(keys, list) or not all(isinstance(number, int) for number in keys):
+                self.report.error(f"{chord_path}/keys", "must be a list of key numbers")
+                continue
+            missing = [number for number in keys if number not in self.key_numbers]
+            if missing:
+                self.report.error(f"{chord_path}/keys", f"no key {missing[0]} in the hardware.json matrix")
+            elif len(set(keys)) < 2:
+                self.report.error(f"{chord_path}/keys", "a chord needs at least 2 different keys")
+            else:
+                self.check_action(chord, chord_path, ("keys",))
+
+    def check_layers(self, layers, path):
+        if not isinstance(layers, dict):
+            self.report.error(path, "must be an object of layer key -> actions")
+            return
+        for layer_key, actions in layers.items():
+            layer_path = f"{path}/{layer_key}"
+            if not layer_key.isdigit() or int(layer_key) not in self.key_numbers:
+                self.report.error(layer_path, f"no key {layer_key} in the hardware.json matrix")
+                continue
+            if not isinstance(actions, dict):
+                self.report.error(layer_path, "must be an object of key number -> action")
+                continue
+            for number, action in actions.items():
+                action_path = f"{layer_path}/{number}"
+                if not number.isdigit() or int(number) not in self.key_numbers:
+                    self.report.error(action_path, f"no key {number} in the hardware.json matrix")
+                elif number == layer_key:
+                    self.report.warn(action_path, "the layer key itself is never looked up in its layer")
+                else:
+                    self.check_action(action, action_path)
+
+    def check_action(self, action, path, extra_fields=()):
+        """Check one action the way keyout._execute_from_config would pick its kind."""
+        report = self.report
+        if not isinstance(action, dict):
+            report.error(path, "action must be an object")
+            return
+        for field in action:
+            if field not in ACTION_FIELDS and field not in extra_fields:
+                report.warn(f"{path}/{field}", "unknown action field, ignored")
+        name = action.get("name", path)
+        if "name" in action and not isinstance(name, str):
+            report.error(f"{path}/name", "must be a string")
+        tokens = _tokens(action.get("key", []))
+        if tokens is None:
+            report.error(f"{path}/key", "must be a token or a list of tokens")
+            tokens = []
+
+        if "macro" in action:
+            try:
+                macro = compile_macro(action["macro"], name, self.layout, self.unicode_input, self.format)
+            except (MacroError, OverflowError, TypeError, ValueError) as e:
+                report.error(f"{path}/macro", str(e))
+            else:
+                report.compiled.append((path, f"macro, {len(macro)} reports"))
+            return
+
+        if action.get("action") == "text_input" or "text_content" in action:
+            self.check_text(action, path)
+            if tokens:
+                report.warn(f"{path}/key", "ignored on a text action")
+            return
+        if "text_input" in tokens:
+            report.error(f"{path}/key", 'text_input is not a key token; use "action": "text_input" with "text_content"')
+            return
+
+        if action.get("software"):
+            self.check_software(action, path)
+            return
+        if "action" in action:
+            report.error(f"{path}/action", f"unknown action {action['action']!r}")
+            return
+
+        if not tokens:
+            report.warn(path, "no key, macro, text or software: the key does nothing")
+            return
+        usages = resolve_chord(tokens, self.format, report, f"{path}/key")
+        if usages is not None:
+            report.compiled.append((path, "combo " + " ".join(f"{usage:02x}" for usage in usages)))
+
+    def check_text(self, action, path):
+        report = self.report
+        text = action.get("text_content", "")
+        if not isinstance(text, str):
+            report.error(f"{path}/text_content", "must be a string")
+            return
+        if not text:
+            report.warn(f"{path}/text_content", "empty: the key types nothing")
+        text_type = action.get("text_type", "single")
+        if text_type not in TEXT_TYPES:
+            report.error(f"{path}/text_type", f"{text_type!r} is not one of {', '.join(TEXT_TYPES)}")
+        if not isinstance(action.get("text_press_enter", True), bool):
+            report.error(f"{path}/text_press_enter", "must be true or false")
+        missing = sorted({char for char in text if self.layout.keystrokes(char, self.unicode_input) is None})
+        if missing:
+            report.error(
+                f"{path}/text_content",
+                f"layout {self.layout.name} cannot type {''.join(missing)!r}; set unicode_input",
+            )
+        report.compiled.append((path, f"text, {len(text)} chars ({text_type})"))
+
+    def check_software(self, action, path):
+        if not isinstance(action["software"], str):
+            self.report.error(f"{path}/software", "must be a string")
+        if "command" in action and not isinstance(action["command"], str):
+            self.report.error(f"{path}/command", "must be a string")
+        for field in ("launch_method", "launch_preset"):
+            if field in action:
+                self.check_launch_setting(field, action[field], f"{path}/{field}")
+        self.report.compiled.append((path, f"launch {action['software']}"))
+
+
+def check_special(config, key_numbers, report_format, report):
+    if not isinstance(config, dict) or not isinstance(config.get("special_keys"), dict):
+        report.error("special_keys", "missing or not an object")
+        return
+    for field in config:
+        if field != "special_keys":
+            report.warn(field, "unknown setting, ignored")
+    for action_id, entry in config["special_keys"].items():
+        path = f"special_keys/{action_id}"
+        if action_id not in SPECIAL_IDS:
+            report.warn(path, f"unknown input, expected one of {', '.join(SPECIAL_IDS)}")
+            continue
+        if not isinstance(entry, dict):
+            report.error(path, "must be an object")
+            continue
+        if "key" in entry:
+            tokens = _tokens(entry["key"])
+            if tokens is None:
+                report.error(f"{path}/key", "must be a token or a list of tokens")
+            elif len(tokens) == 1 and media_code_for(tokens[0]) is not None:
+                report.compiled.append((path, f"media {media_code_for(tokens[0]):02x}"))
+            elif tokens:
+                usages = resolve_chord(tokens, report_format, report, f"{path}/key")
+                if usages is not None:
+                    report.compiled.append((path, "combo " + " ".join(f"{usage:02x}" for usage in usages)))
+            continue
+        action = entry.get("action", "none")
+        if action not in PROFILE_STEPS and action not in SPECIAL_COMMANDS:
+            report.error(f"{path}/action", f"unknown action {action!r}")
+            continue
+        value = entry.get("value")
+        if action == "layer_toggle" and value not in key_numbers:
+            report.error(f"{path}/value", "must be the number of a key in the hardware.json matrix")
+        elif action.startswith("brightness_") and value is not None and not isinstance(value, (int, float)):
+            report.error(f"{path}/value", "must be a brightness step (e.g. 0.1)")
+        report.compiled.append((path, action))
+
+
+def check_hardware(config, report):
+    """Merged pin map (file over the defaults), or None when it cannot be built."""
+    hardware = {section: dict(values) for section, values in DEFAULT_HARDWARE.items()}
+    if not isinstance(config, dict):
+        report.error("/", "top level must be an object")
+        return None
+    for section, values in config.items():
+        if section not in hardware:
+            report.warn(section, "unknown section, ignored")
+        elif not isinstance(values, dict):
+            report.error(section, "must be an object")
+        else:
+            hardware[section].update(values)
+    try:
+        pins = PinMap(hardware)
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        report.error("/", f"invalid pin map: {e!r}")
+        return None
+    numbers = pins.key_numbers
+    duplicates = sorted({number for number in numbers if numbers.count(number) > 1})
+    if duplicates:
+        report.error("matrix/keys", f"key number {duplicates[0]} is used twice")
+    used = list(pins.rows + pins.columns + pins.buttons + (pins.display_scl, pins.display_sda))
+    for pair in pins.encoders:
+        used.extend(pair)
+    shared = sorted({pin for pin in used if used.count(pin) > 1})
+    if shared:
+        report.error("/", f"pin {shared[0]} is assigned twice")
+    for section, backend, backends in (
+        ("matrix", pins.key_backend, KEY_BACKENDS),
+        ("buttons", pins.button_backend, KEY_BACKENDS),
+        ("encoders", pins.encoder_backend, ENCODER_BACKENDS),
+    ):
+        if backend != "auto" and backend not in backends:
+            report.error(f"{section}/backend", f"{backend!r} is not auto or one of {', '.join(backends)}")
+    return pins
+
+
+def _load(path, report):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except OSError:
+        return None
+    except ValueError as e:
+        report.error("/", f"not valid JSON: {e}")
+        return None
+
+
+def lint(root=ROOT, nkro=None):
+    """Reports for the three config files under `root`."""
+    if nkro is None:
+        nkro = custom_hid_enabled(root)
+    report_format = NKRO if nkro else BOOT
+    reports = []
+
+    hardware_report = Report(HARDWARE_FILE)
+    hardware = _load(os.path.join(root, HARDWARE_FILE), hardware_report)
+    pins = check_hardware(hardware if hardware is not None else {}, hardware_report)
+    reports.append(hardware_report)
+    key_numbers = set(pins.key_numbers if pins else PinMap(DEFAULT_HARDWARE).key_numbers)
+
+    keys_report = Report(KEYSFILE)
+    keys = _load(os.path.join(root, KEYSFILE), keys_report)
+    if keys is None and not keys_report.errors:
+        keys_report.error("/", "file not found")
+    elif keys is not None:
+        KeysfileChecker(keys, key_numbers, report_format, root, keys_report).check()
+    reports.append(keys_report)
+
+    special_report = Report(SPECIAL_FILE)
+    special = _load(os.path.join(root, SPECIAL_FILE), special_report)
+    if special is not None:
+        check_special(special, key_numbers, report_format, special_report)
+    reports.append(special_report)
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--root", default=ROOT, help="directory holding the config files and boot.py")
+    parser.add_argument("--nkro", action="store_true", default=None, help="check chords against NKRO reports")
+    parser.add_argument("--boot", dest="nkro", action="store_false", help="check chords against 6-key boot reports")
+    parser.add_argument("--strict", action="store_true", help="fail on warnings too")
+    parser.add_argument("-v", "--verbose", action="store_true", help="also list every compiled action")
+    args = parser.parse_args(argv)
+
+    reports = lint(args.root, args.nkro)
+    errors = warnings = 0
+    for report in reports:
+        for line in report.lines(args.verbose):
+            print(line)
+        errors += len(report.errors)
+        warnings += len(report.warnings)
+    print(f"[LINT] {errors} errors, {warnings} warnings")
+    return 1 if errors or (args.strict and warnings) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
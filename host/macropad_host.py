@@ -0,0 +1,333 @@
+"""Host-side agent for the macropad's usb_cdc data port.
+
+Speaks the same ``TAG LENGTH\\n`` + payload framing as hostlink.py on the
+device. Run it on the PC the macropad is plugged into:
+
+    python host/macropad_host.py            # auto-detect the data port
+    python host/macropad_host.py --port COM7
+    python host/macropad_host.py --mock-apps code.exe obs64.exe
+                                            # cycle fake focus changes for testing
+
+Requires pyserial (``pip install pyserial``).
+
+Handled messages:
+    WAIT <stage>   reply READY once the launcher dialog for <stage> ("run" or
+                   "search") has focus, so the pad types without fixed delays
+    CLIP <text>    put <text> on the clipboard and reply PASTE with the paste
+                   modifier ("ctrl" or "cmd"); the pad then sends one paste
+                   shortcut instead of typing the text
+    TRACE <dump>   save an input/HID trace (hidtrace.py format) as
+                   trace-<date>-<time>.mpt for host/trace_tool.py
+    RATE           reply RATE with the typing rate host/calibrate.py stored
+                   for this host profile (chars/s); no reply when there is none
+
+Sent messages:
+    APP <name>     the focused application changed (executable name without
+                   path, e.g. "code.exe"); the pad selects the profile whose
+                   "apps" list contains it
+    RATE <rate>    at startup, the stored typing rate for this host profile
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+READY_POLL_INTERVAL = 0.01
+READY_TIMEOUT = 3.0
+APP_POLL_INTERVAL = 0.25
+# Fastest safe typing rate per host profile, written by host/calibrate.py.
+RATES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "typing-rates.json")
+
+
+class FrameStream:
+    """Frame reader/writer over any object with read(n)/write(bytes)."""
+
+    def __init__(self, port):
+        self.port = port
+
+    def send(self, tag, payload=b""):
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        self.port.write(f"{tag} {len(payload)}\n".encode() + payload)
+        flush = getattr(self.port, "flush", None)
+        if flush is not None:
+            flush()
+
+    def _read_exact(self, count):
+        data = b""
+        while len(data) < count:
+            chunk = self.port.read(count - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def receive(self):
+        """Return the next (tag, payload) frame, or None when the port times out."""
+        header = b""
+        while not header.endswith(b"\n"):
+            byte = self.port.read(1)
+            if not byte:
+                if not header:
+                    return None
+                continue
+            header += byte
+        try:
+            tag, length = header.strip().split(b" ")
+            length = int(length)
+        except ValueError:
+            print(f"[HOST] Bad frame header: {header!r}", file=sys.stderr)
+            return self.receive()
+        payload = self._read_exact(length) if length else b""
+        return tag.decode(), payload
+
+
+def foreground_window():
+    """Return (class name, title) of the focused window, or None off Windows."""
+    if sys.platform != "win32":
+        return None
+    import ctypes
+
+    user32 = ctypes.windll.user32
+    hwnd = user32.GetForegroundWindow()
+    title = ctypes.create_unicode_buffer(256)
+    class_name = ctypes.create_unicode_buffer(256)
+    user32.GetWindowTextW(hwnd, title, 256)
+    user32.GetClassNameW(hwnd, class_name, 256)
+    return class_name.value, title.value
+
+
+def foreground_app():
+    """Return the executable name of the focused application, or None."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            user32 = ctypes.windll.user32
+            kernel32 = ctypes.windll.kernel32
+            pid = wintypes.DWORD()
+            user32.GetWindowThreadProcessId(user32.GetForegroundWindow(), ctypes.byref(pid))
+            # PROCESS_QUERY_LIMITED_INFORMATION
+            process = kernel32.OpenProcess(0x1000, False, pid.value)
+            if not process:
+                return None
+            try:
+                path = ctypes.create_unicode_buffer(260)
+                size = wintypes.DWORD(260)
+                if not kernel32.QueryFullProcessImageNameW(process, 0, path, ctypes.byref(size)):
+                    return None
+            finally:
+                kernel32.CloseHandle(process)
+            return path.value.rsplit("\\", 1)[-1]
+        if sys.platform == "darwin":
+            script = 'tell application "System Events" to get name of first process whose frontmost is true'
+            result = subprocess.run(["osascript", "-e", script], capture_output=True, timeout=1)
+            return result.stdout.decode().strip() or None
+        result = subprocess.run(
+            ["xdotool", "getactivewindow", "getwindowpid"], capture_output=True, timeout=1
+        )
+        pid = result.stdout.decode().strip()
+        if not pid:
+            return None
+        with open(f"/proc/{pid}/comm") as comm:
+            return comm.read().strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def stage_ready(stage, window):
+    class_name, title = window
+    if stage == "run":
+        # The Run dialog is a standard dialog box titled "Run".
+        return class_name == "#32770" and title == "Run"
+    if stage == "search":
+        return title == "Search" or class_name == "Windows.UI.Core.CoreWindow"
+    return True
+
+
+def set_clipboard(text):
+    """Put `text` on the system clipboard; return False if no tool is available."""
+    if sys.platform == "win32":
+        commands = [(["clip"], "utf-16")]
+    elif sys.platform == "darwin":
+        commands = [(["pbcopy"], "utf-8")]
+    else:
+        commands = [
+            (["wl-copy"], "utf-8"),
+            (["xclip", "-selection", "clipboard"], "utf-8"),
+            (["xsel", "--clipboard", "--input"], "utf-8"),
+        ]
+    for command, encoding in commands:
+        try:
+            subprocess.run(command, input=text.encode(encoding), check=True, timeout=2)
+            return True
+        except (OSError, subprocess.SubprocessError):
+            continue
+    return False
+
+
+def paste_modifier():
+    return "cmd" if sys.platform == "darwin" else "ctrl"
+
+
+def load_typing_rates(path=RATES_FILE):
+    """{host profile: chars per second} from the rates file, {} without one."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_typing_rate(host_profile, rate, path=RATES_FILE):
+    rates = load_typing_rates(path)
+    rates[host_profile] = rate
+    with open(path, "w") as f:
+        json.dump(rates, f, indent=2, sort_keys=True)
+
+
+class HostAgent:
+    def __init__(self, stream, app_source=foreground_app, trace_dir=".", typing_rate=None):
+        self.stream = stream
+        self.handlers = {
+            "WAIT": self.handle_wait,
+            "CLIP": self.handle_clip,
+            "TRACE": self.handle_trace,
+            "RATE": self.handle_rate,
+        }
+        self.trace_dir = trace_dir
+        # Calibrated chars/s for this host, or None to leave the pad's own.
+        self.typing_rate = typing_rate
+        # Called every APP_POLL_INTERVAL; None disables focus reports.
+        self.app_source = app_source
+        self.last_app = None
+        self.next_app_poll = 0.0
+
+    def report_app(self):
+        """Send APP when the focused application changed since the last report."""
+        now = time.monotonic()
+        if self.app_source is None or now < self.next_app_poll:
+            return
+        self.next_app_poll = now + APP_POLL_INTERVAL
+        app = self.app_source()
+        if app and app != self.last_app:
+            self.last_app = app
+            self.stream.send("APP", app)
+
+    def set_clipboard(self, text):
+        return set_clipboard(text)
+
+    def handle_clip(self, payload):
+        text = payload.decode("utf-8")
+        if not self.set_clipboard(text):
+            # No PASTE: the pad types the text itself after its timeout.
+            print("[HOST] Could not set the clipboard", file=sys.stderr)
+            return
+        self.stream.send("PASTE", paste_modifier())
+
+    def handle_trace(self, payload):
+        path = os.path.join(self.trace_dir, time.strftime("trace-%Y%m%d-%H%M%S.mpt"))
+        with open(path, "wb") as f:
+            f.write(payload)
+        print(f"[HOST] Saved trace {path} ({len(payload)} bytes)")
+
+    def handle_rate(self, payload=b""):
+        if self.typing_rate is not None:
+            self.stream.send("RATE", f"{self.typing_rate:g}")
+
+    def handle_wait(self, payload):
+        stage = payload.decode()
+        deadline = time.monotonic() + READY_TIMEOUT
+        while time.monotonic() < deadline:
+            window = foreground_window()
+            if window is None or stage_ready(stage, window):
+                self.stream.send("READY", stage)
+                return
+            time.sleep(READY_POLL_INTERVAL)
+        # No READY: the pad falls back to its own timeout.
+        print(f"[HOST] {stage} not ready after {READY_TIMEOUT}s", file=sys.stderr)
+
+    def serve_once(self):
+        frame = self.stream.receive()
+        if frame is None:
+            return False
+        tag, payload = frame
+        handler = self.handlers.get(tag)
+        if handler is None:
+            print(f"[HOST] Unhandled message {tag}", file=sys.stderr)
+        else:
+            handler(payload)
+        return True
+
+    def serve_forever(self):
+        # A pad that is already running does not ask again.
+        self.handle_rate()
+        while True:
+            self.serve_once()
+            self.report_app()
+
+
+def mock_app_source(apps, interval):
+    """App source that cycles through `apps`, one every `interval` seconds."""
+    start = time.monotonic()
+
+    def source():
+        step = int((time.monotonic() - start) / interval)
+        return apps[step % len(apps)]
+
+    return source
+
+
+def find_data_port():
+    from serial.tools import list_ports
+
+    for port in list_ports.comports():
+        # CircuitPython exposes the console first and the data port second.
+        if port.vid == 0x239A and (port.interface or "").endswith("CDC2 data"):
+            return port.device
+    candidates = [port.device for port in list_ports.comports() if port.vid == 0x239A]
+    return sorted(candidates)[-1] if candidates else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", help="serial device of the macropad data port")
+    parser.add_argument("--no-apps", action="store_true", help="do not report the focused app")
+    parser.add_argument(
+        "--mock-apps", nargs="+", metavar="APP", help="report these app names in turn instead"
+    )
+    parser.add_argument(
+        "--mock-interval", type=float, default=3.0, help="seconds per mock app (default 3)"
+    )
+    parser.add_argument("--trace-dir", default=".", help="where TRACE dumps are saved")
+    parser.add_argument(
+        "--host-profile", default=platform.node(), help="typing rate entry to use (default: hostname)"
+    )
+    parser.add_argument("--rates-file", default=RATES_FILE, help="calibrated typing rates")
+    args = parser.parse_args(argv)
+
+    app_source = foreground_app
+    if args.no_apps:
+        app_source = None
+    elif args.mock_apps:
+        app_source = mock_app_source(args.mock_apps, args.mock_interval)
+
+    import serial
+
+    port_name = args.port or find_data_port()
+    if port_name is None:
+        parser.error("no macropad data port found; pass --port")
+    with serial.Serial(port_name, timeout=0.1) as port:
+        print(f"[HOST] Listening on {port_name}")
+        typing_rate = load_typing_rates(args.rates_file).get(args.host_profile)
+        if typing_rate is not None:
+            print(f"[HOST] Typing rate for {args.host_profile}: {typing_rate:g} chars/s")
+        HostAgent(FrameStream(port), app_source, args.trace_dir, typing_rate).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
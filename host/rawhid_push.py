@@ -0,0 +1,151 @@
+"""Push config to the pad and read telemetry over its raw HID endpoint.
+
+    python host/rawhid_push.py keys                       # ../keysfile.json
+    python host/rawhid_push.py special my-special.json
+    python host/rawhid_push.py stats --watch 2            # telemetry every 2 s
+
+Needs boot.py's custom HID set (CUSTOM_HID = True) and hidapi
+(``pip install hidapi``). Files are checked as JSON here, then sent as
+hostlink frames (KEYS / SPECIAL / STATS) through rawhid.py's report format;
+the pad answers DONE, ERROR or STATS. Pushed configs live in the pad's RAM
+until the next reset: nothing on CIRCUITPY is written, so copy the file
+over as well to keep it.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from hiddescriptors import RAW_REPORT_ID, RAW_REPORT_SIZE, RAW_USAGE, RAW_USAGE_PAGE  # noqa: E402
+from macropad_host import FrameStream  # noqa: E402
+from rawhid import ACK, CHUNK, DATA  # noqa: E402
+
+CIRCUITPYTHON_VID = 0x239A
+ACK_TIMEOUT = 1.0
+REPLY_TIMEOUT = 5.0
+
+
+class RawHidPort:
+    """read()/write() over the raw HID endpoint, for FrameStream."""
+
+    def __init__(self, device, timeout_ms=100):
+        self.device = device
+        self.timeout_ms = timeout_ms
+        self.received = bytearray()
+        self.acks = 0
+
+    def _read_report(self, timeout_ms):
+        data = self.device.read(RAW_REPORT_SIZE + 1, timeout_ms)
+        # Reports carry their ID first; on Linux the keyboard's arrive here too.
+        if not data or data[0] != RAW_REPORT_ID:
+            return False
+        if data[1] == ACK:
+            self.acks += 1
+        elif data[1] == DATA:
+            self.received.extend(data[3 : 3 + min(data[2], CHUNK)])
+        return True
+
+    def write(self, data):
+        for start in range(0, len(data), CHUNK):
+            chunk = bytes(data[start : start + CHUNK])
+            report = bytes((RAW_REPORT_ID, DATA, len(chunk))) + chunk
+            acks = self.acks
+            self.device.write(report.ljust(RAW_REPORT_SIZE + 1, b"\0"))
+            # The pad keeps only its newest OUT report: wait until it took this one.
+            deadline = time.monotonic() + ACK_TIMEOUT
+            while self.acks == acks:
+                if time.monotonic() > deadline:
+                    raise OSError("the pad did not acknowledge a raw HID report")
+                self._read_report(10)
+        return len(data)
+
+    def read(self, count=1):
+        if not self.received:
+            self._read_report(self.timeout_ms)
+        data = bytes(self.received[:count])
+        del self.received[:count]
+        return data
+
+
+def find_raw_device():
+    """hidapi path of the pad's raw HID collection, or None."""
+    import hid
+
+    fallback = None
+    for info in hid.enumerate():
+        if info["usage_page"] == RAW_USAGE_PAGE and info["usage"] == RAW_USAGE:
+            return info["path"]
+        # Linux reports only the first collection of the shared interface.
+        if info["vendor_id"] == CIRCUITPYTHON_VID and fallback is None:
+            fallback = info["path"]
+    return fallback
+
+
+def request(stream, tag, payload=b"", replies=("DONE", "ERROR")):
+    """Send one frame and return the (tag, payload) reply, or None on timeout."""
+    stream.send(tag, payload)
+    deadline = time.monotonic() + REPLY_TIMEOUT
+    while time.monotonic() < deadline:
+        frame = stream.receive()
+        if frame is not None and frame[0] in replies:
+            return frame
+    return None
+
+
+def push(stream, tag, path):
+    with open(path, "rb") as f:
+        payload = f.read()
+    try:
+        json.loads(payload)
+    except ValueError as e:
+        print(f"[PUSH] {path}: {e}")
+        return 1
+    reply = request(stream, tag, payload)
+    if reply is None:
+        print(f"[PUSH] No reply from the pad for {path}")
+        return 1
+    print(f"[PUSH] {reply[0]} {reply[1].decode()}")
+    return 0 if reply[0] == "DONE" else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", help="hidapi device path (default: auto-detect)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    keys_parser = commands.add_parser("keys", help="push keysfile.json")
+    keys_parser.add_argument("file", nargs="?", default=os.path.join(ROOT, "keysfile.json"))
+    special_parser = commands.add_parser("special", help="push special-keyout.json")
+    special_parser.add_argument("file", nargs="?", default=os.path.join(ROOT, "special-keyout.json"))
+    stats_parser = commands.add_parser("stats", help="print loop telemetry")
+    stats_parser.add_argument("--watch", type=float, metavar="S", help="repeat every S seconds")
+    args = parser.parse_args(argv)
+
+    import hid
+
+    path = args.path or find_raw_device()
+    if path is None:
+        parser.error("no raw HID device found; is CUSTOM_HID enabled in boot.py?")
+    device = hid.device()
+    device.open_path(path if isinstance(path, bytes) else path.encode())
+    try:
+        stream = FrameStream(RawHidPort(device))
+        if args.command == "keys":
+            return push(stream, "KEYS", args.file)
+        if args.command == "special":
+            return push(stream, "SPECIAL", args.file)
+        while True:
+            reply = request(stream, "STATS", replies=("STATS",))
+            print(f"[STATS] {reply[1].decode() if reply else 'no reply'}")
+            if not args.watch:
+                return 0 if reply else 1
+            time.sleep(args.watch)
+    finally:
+        device.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+"""Host simulation of the pad's action engine on virtual HID devices.
+
+`load_firmware()` registers stand-ins for the CircuitPython modules that the
+action code imports (supervisor, usb_hid, adafruit_hid) on top of a virtual
+millisecond clock, then imports keyout.py, chords.py, specialactions.py and
+macro.py unchanged. `PadModel` repeats code.py's input dispatch (matrix
+chords, encoder steps, click/hold buttons) on top of them, so a list of
+input events can be turned into the HID reports the firmware would send:
+
+    clock, output = SimClock(), []
+    pad = PadModel(load_firmware(clock, output), clock)
+    pad.feed(KEY_PRESSED, 0, 0, clock.now)
+
+The host agent is not simulated: the data port is absent, so actions fall
+back to what the pad does without host/macropad_host.py (e.g. "bulk" text
+is typed instead of pasted).
+"""
+import os
+import struct
+import sys
+# Loaded here so that stdlib modules bind the real time module, not SimClock.
+import threading  # noqa: F401
+import types
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Modules re-imported against the simulated clock and HID devices.
+FIRMWARE_MODULES = (
+    "ticks",
+    "hiddescriptors",
+    "keyreports",
+    "hidtrace",
+    "hostlink",
+    "keytokens",
+    "layouts",
+    "macro",
+    "textstream",
+    "launcher",
+    "bulkpaste",
+    "keyout",
+    "chords",
+    "specialactions",
+    "pinmap",
+    "profilemeta",
+    "inputcapture",
+    "encoderaccel",
+)
+
+# Same timing as code.py.
+HOLD_MS = 1000
+DISPLAY_DEBOUNCE_MS = 200
+VOLUME_ENCODER = 0
+VOLUME_BUTTON = 0
+DISPLAY_BUTTON = 1
+MIC_BUTTON = 2
+TEXT_CANCEL_BUTTON = DISPLAY_BUTTON
+TICKS_MAX = (1 << 29) - 1
+
+
+class SimClock:
+    """Virtual time: sleeps advance it instantly, nothing else does."""
+
+    def __init__(self, now=0):
+        self.now = now
+
+    def ticks_ms(self):
+        return self.now & TICKS_MAX
+
+    def sleep(self, seconds):
+        self.now += int(round(seconds * 1000))
+
+    def monotonic(self):
+        return self.now / 1000
+
+
+class SimDevice:
+    """usb_hid.Device stand-in appending (time, usage page, report) to `output`."""
+
+    def __init__(self, usage_page, usage, clock, output):
+        self.usage_page = usage_page
+        self.usage = usage
+        self.clock = clock
+        self.output = output
+
+    def send_report(self, report, report_id=None):
+        self.output.append((self.clock.now, self.usage_page, bytes(report)))
+
+    def get_last_received_report(self, report_id=None):
+        return None
+
+
+def _keycode_class():
+    names = {}
+    for index, letter in enumerate("ABCDEFGHIJKLMNOPQRSTUVWXYZ"):
+        names[letter] = 0x04 + index
+    digits = ("ONE", "TWO", "THREE", "FOUR", "FIVE", "SIX", "SEVEN", "EIGHT", "NINE", "ZERO")
+    for index, digit in enumerate(digits):
+        names[digit] = 0x1E + index
+    for number in range(1, 13):
+        names[f"F{number}"] = 0x3A + number - 1
+    for number in range(13, 25):
+        names[f"F{number}"] = 0x68 + number - 13
+    names.update(
+        ENTER=0x28, RETURN=0x28, ESCAPE=0x29, BACKSPACE=0x2A, TAB=0x2B,
+        SPACEBAR=0x2C, SPACE=0x2C, MINUS=0x2D, EQUALS=0x2E, LEFT_BRACKET=0x2F,
+        RIGHT_BRACKET=0x30, BACKSLASH=0x31, POUND=0x32, SEMICOLON=0x33, QUOTE=0x34,
+        GRAVE_ACCENT=0x35, COMMA=0x36, PERIOD=0x37, FORWARD_SLASH=0x38,
+        CAPS_LOCK=0x39, PRINT_SCREEN=0x46, SCROLL_LOCK=0x47, PAUSE=0x48,
+        INSERT=0x49, HOME=0x4A, PAGE_UP=0x4B, DELETE=0x4C, END=0x4D,
+        PAGE_DOWN=0x4E, RIGHT_ARROW=0x4F, LEFT_ARROW=0x50, DOWN_ARROW=0x51,
+        UP_ARROW=0x52, APPLICATION=0x65,
+        LEFT_CONTROL=0xE0, CONTROL=0xE0, LEFT_SHIFT=0xE1, SHIFT=0xE1,
+        LEFT_ALT=0xE2, ALT=0xE2, OPTION=0xE2, LEFT_GUI=0xE3, GUI=0xE3,
+        WINDOWS=0xE3, COMMAND=0xE3, RIGHT_CONTROL=0xE4, RIGHT_SHIFT=0xE5,
+        RIGHT_ALT=0xE6, RIGHT_GUI=0xE7,
+    )
+    return type("Keycode", (), names)
+
+
+def _find_device(devices, *, usage_page, usage, timeout=None):
+    for device in devices:
+        if device.usage_page == usage_page and device.usage == usage:
+            return device
+    raise ValueError("Could not find matching HID device.")
+
+
+class _ConsumerControl:
+    def __init__(self, devices):
+        self.device = _find_device(devices, usage_page=0x0C, usage=0x01)
+
+    def send(self, consumer_code):
+        self.press(consumer_code)
+        self.release()
+
+    def press(self, consumer_code):
+        self.device.send_report(struct.pack("<H", consumer_code))
+
+    def release(self):
+        self.device.send_report(b"\x00\x00")
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+
+def load_firmware(clock, output, root=ROOT):
+    """Import the firmware's action modules against simulated hardware.
+
+    Returns a namespace with the imported modules and the HID devices.
+    Config files are read from `root`.
+    """
+    devices = [
+        SimDevice(0x01, 0x06, clock, output),
+        SimDevice(0x0C, 0x01, clock, output),
+    ]
+    sim_time = _module("time", sleep=clock.sleep, monotonic=clock.monotonic)
+    fakes = {
+        "time": sim_time,
+        "supervisor": _module("supervisor", ticks_ms=clock.ticks_ms),
+        "usb_hid": _module("usb_hid", devices=devices),
+        "adafruit_hid": _module("adafruit_hid", find_device=_find_device),
+        "adafruit_hid.keycode": _module("adafruit_hid.keycode", Keycode=_keycode_class()),
+        "adafruit_hid.consumer_control": _module(
+            "adafruit_hid.consumer_control", ConsumerControl=_ConsumerControl
+        ),
+    }
+    saved = {name: sys.modules.get(name) for name in fakes}
+    for name in FIRMWARE_MODULES:
+        sys.modules.pop(name, None)
+    sys.modules.update(fakes)
+    cwd = os.getcwd()
+    try:
+        os.chdir(root)
+        import chords
+        import inputcapture
+        import keyout
+        import pinmap
+        import profilemeta
+        import specialactions
+    finally:
+        os.chdir(cwd)
+        # Only the firmware modules keep the simulated clock and devices.
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+    return types.SimpleNamespace(
+        root=root,
+        devices=devices,
+        chords=chords,
+        inputcapture=inputcapture,
+        keyout=keyout,
+        pinmap=pinmap,
+        profilemeta=profilemeta,
+        specialactions=specialactions,
+        consumer=_ConsumerControl(devices),
+    )
+
+
+class PadModel:
+    """code.py's input dispatch over the simulated firmware modules."""
+
+    def __init__(self, firmware, clock, profile=0):
+        self.firmware = firmware
+        self.clock = clock
+        keyout = firmware.keyout
+        special = firmware.specialactions
+        cwd = os.getcwd()
+        try:
+            os.chdir(firmware.root)
+            pins = firmware.pinmap.load_pinmap()
+            entries = special.load_special_actions()
+        finally:
+            os.chdir(cwd)
+        self.matrix_keys = pins.key_numbers
+        names, _icons = firmware.profilemeta.profile_metadata(keyout.profiles_config)
+        self.profile_count = len(names)
+        self.profile = profile % self.profile_count
+        self.tables = {}
+        self.chords = firmware.chords.ChordEngine(self.table(self.profile), keyout.chord_window_ms)
+        self.handlers = special.compile_special_actions(
+            entries,
+            keyout.keyboard_device,
+            firmware.consumer,
+            {"layer_toggle": self.toggle_layer},
+            keyout.report_format,
+        )
+        self.volume_hold_start = None
+        self.display_hold_start = None
+        self.last_display_action = None
+
+    def table(self, index):
+        if index not in self.tables:
+            keyout = self.firmware.keyout
+            self.tables[index] = self.firmware.chords.ChordTable(
+                keyout.profiles_config.get(str(index), {}), self.matrix_keys, keyout.prepare_action
+            )
+        return self.tables[index]
+
+    def toggle_layer(self, key_number):
+        if key_number in self.matrix_keys:
+            self.chords.toggle_layer(self.matrix_keys.index(key_number))
+
+    def set_profile(self, index):
+        self.profile = index % self.profile_count
+
+    def step_profile(self, step):
+        if step:
+            self.set_profile(self.profile + step)
+
+    def run_action(self, action):
+        if action is not None:
+            self.firmware.keyout.execute_config(action, self.profile)
+
+    def elapsed(self, start):
+        return (self.clock.ticks_ms() - start) & TICKS_MAX
+
+    def feed(self, kind, number, value, timestamp):
+        """Dispatch one input event (inputcapture kinds), like code.py's loop."""
+        events = self.firmware.inputcapture
+        special = self.firmware.specialactions
+        if kind == events.ENCODER_MOVED:
+            if number == VOLUME_ENCODER:
+                slot = special.VOLUME_ENCODER_RIGHT if value > 0 else special.VOLUME_ENCODER_LEFT
+                for _ in range(abs(value)):
+                    self.handlers[slot].run()
+            else:
+                slot = special.DISPLAY_ENCODER_RIGHT if value > 0 else special.DISPLAY_ENCODER_LEFT
+                self.step_profile(sum(self.handlers[slot].run() for _ in range(abs(value))))
+        elif kind == events.KEY_PRESSED:
+            self.chords.press(number, timestamp)
+        elif kind == events.KEY_RELEASED:
+            self.run_action(self.chords.release(number))
+        elif kind == events.BUTTON_PRESSED:
+            keyout = self.firmware.keyout
+            if number == TEXT_CANCEL_BUTTON and (keyout.text_stream.running or keyout.bulk_paste.running):
+                keyout.text_stream.cancel()
+                keyout.bulk_paste.cancel()
+            elif number == MIC_BUTTON:
+                self.handlers[special.MIC_KEY].run()
+            elif number == VOLUME_BUTTON:
+                self.volume_hold_start = self.clock.ticks_ms()
+            elif (
+                self.last_display_action is None
+                or self.elapsed(self.last_display_action) > DISPLAY_DEBOUNCE_MS
+            ):
+                self.display_hold_start = self.clock.ticks_ms()
+        elif kind == events.BUTTON_RELEASED:
+            if number == VOLUME_BUTTON:
+                if self.volume_hold_start is not None and self.elapsed(self.volume_hold_start) < HOLD_MS:
+                    self.handlers[special.VOLUME_ENCODER_CLICK].run()
+                self.volume_hold_start = None
+            elif number == DISPLAY_BUTTON:
+                if self.display_hold_start is not None and self.elapsed(self.display_hold_start) < HOLD_MS:
+                    self.step_profile(self.handlers[special.DISPLAY_ENCODER_CLICK].run())
+                    self.last_display_action = self.clock.ticks_ms()
+                self.display_hold_start = None
+
+    def poll(self):
+        """One loop pass without input: chord window, hold timers, macros, text and launches."""
+        special = self.firmware.specialactions
+        self.chords.table = self.table(self.profile)
+        self.run_action(self.chords.poll(self.clock.ticks_ms()))
+        if self.volume_hold_start is not None and self.elapsed(self.volume_hold_start) >= HOLD_MS:
+            self.handlers[special.VOLUME_ENCODER_HOLD].run()
+            self.volume_hold_start = None
+        if self.display_hold_start is not None and self.elapsed(self.display_hold_start) >= HOLD_MS:
+            self.step_profile(self.handlers[special.DISPLAY_ENCODER_HOLD].run())
+            self.display_hold_start = None
+            self.last_display_action = self.clock.ticks_ms()
+        self.firmware.keyout.macro_player.tick()
+        self.firmware.keyout.text_stream.tick()
+        self.firmware.keyout.launcher.tick()
+        self.firmware.keyout.bulk_paste.tick()
+
+    @property
+    def busy(self):
+        """True while a macro, a text, a paste or a software launch is still being sent."""
+        keyout = self.firmware.keyout
+        return (
+            keyout.macro_player.playing
+            or keyout.text_stream.running
+            or keyout.launcher.running
+            or keyout.bulk_paste.running
+        )
+
@@ -0,0 +1,153 @@
+"""In-process stand-in for the host agent, for checking the pad protocol on a PC.
+
+Connects the firmware's own hostlink.HostLink to a HostAgent through an
+in-memory loopback port instead of USB, with the clipboard kept in memory:
+
+    python host/standin.py                 # CLIP round trip with a sample text
+    python host/standin.py --size 20000    # larger payload
+    python host/standin.py --silent        # agent never answers: pad falls back
+    python host/standin.py --apps code.exe obs64.exe
+                                           # APP focus reports -> keysfile.json profiles
+
+Needs no pyserial and no device.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from appswitch import AppSwitcher  # noqa: E402
+from hostlink import HostLink  # noqa: E402
+from macropad_host import FrameStream, HostAgent  # noqa: E402
+
+
+class _Pipe:
+    def __init__(self):
+        self.data = bytearray()
+        self.ready = threading.Condition()
+
+    def write(self, data):
+        with self.ready:
+            self.data.extend(data)
+            self.ready.notify_all()
+        return len(data)
+
+    def take(self, count):
+        chunk = bytes(self.data[:count])
+        del self.data[:count]
+        return chunk
+
+
+class LoopbackPort:
+    """One end of an in-memory serial link; see loopback_pair()."""
+
+    def __init__(self, incoming, outgoing, timeout=0.1):
+        self.incoming = incoming
+        self.outgoing = outgoing
+        self.timeout = timeout
+        self.connected = True
+
+    @property
+    def in_waiting(self):
+        return len(self.incoming.data)
+
+    def read(self, count=1):
+        incoming = self.incoming
+        with incoming.ready:
+            if not incoming.data:
+                incoming.ready.wait(self.timeout)
+            return incoming.take(count)
+
+    def write(self, data):
+        return self.outgoing.write(data)
+
+
+def loopback_pair():
+    """Return (device_port, host_port) connected to each other."""
+    to_host = _Pipe()
+    to_device = _Pipe()
+    return LoopbackPort(to_device, to_host), LoopbackPort(to_host, to_device)
+
+
+class StandinAgent(HostAgent):
+    """HostAgent with an in-memory clipboard; `silent` drops every request."""
+
+    def __init__(self, stream, silent=False):
+        super().__init__(stream, app_source=None)
+        self.silent = silent
+        self.clipboard = None
+
+    def set_clipboard(self, text):
+        self.clipboard = text
+        return True
+
+    def serve_once(self):
+        if self.silent:
+            return self.stream.receive() is not None
+        return super().serve_once()
+
+
+def start_standin(silent=False):
+    """Run a StandinAgent in a daemon thread; return (device HostLink, agent)."""
+    device_port, host_port = loopback_pair()
+    agent = StandinAgent(FrameStream(host_port), silent)
+    threading.Thread(target=agent.serve_forever, daemon=True).start()
+    return HostLink(device_port), agent
+
+
+def check_apps(apps, keysfile):
+    """Send APP reports through the stand-in and print the profile each selects."""
+    link, agent = start_standin()
+    with open(keysfile) as f:
+        profiles = json.load(f).get("profiles", {})
+    switcher = AppSwitcher(profiles, len(profiles), lambda index: None)
+    switcher.attach(link)
+    for app in apps:
+        agent.stream.send("APP", app)
+        deadline = time.monotonic() + 1.0
+        while switcher.current_app != app and time.monotonic() < deadline:
+            link.poll()
+            time.sleep(0.001)
+        if switcher.current_app != app:
+            print(f"[STANDIN] APP {app} not delivered")
+            return 1
+        print(f"[STANDIN] APP {app} -> profile {switcher.profile_for(app)}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=4096, help="payload length in characters")
+    parser.add_argument("--silent", action="store_true", help="agent never replies")
+    parser.add_argument("--timeout", type=float, default=1.0, help="pad-side PASTE timeout (s)")
+    parser.add_argument("--apps", nargs="+", metavar="APP", help="send APP focus reports")
+    parser.add_argument(
+        "--keysfile", default=os.path.join(os.path.dirname(__file__), "..", "keysfile.json")
+    )
+    args = parser.parse_args(argv)
+
+    if args.apps:
+        return check_apps(args.apps, args.keysfile)
+
+    link, agent = start_standin(args.silent)
+    text = ("Grüße from the macropad. " * (args.size // 25 + 1))[: args.size]
+    start = time.monotonic()
+    link.send("CLIP", text)
+    reply = link.wait_for("PASTE", args.timeout)
+    elapsed = (time.monotonic() - start) * 1000
+    if reply is None:
+        print(f"[STANDIN] no PASTE after {elapsed:.0f} ms: pad would type {len(text)} chars")
+        return 0 if args.silent else 1
+    if agent.clipboard != text:
+        print("[STANDIN] clipboard mismatch")
+        return 1
+    print(f"[STANDIN] PASTE {reply.decode()} after {elapsed:.1f} ms for {len(text)} chars")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Inspect, diff and replay input/HID traces captured with hidtrace.py.
+
+    python host/trace_tool.py show trace.mpt
+    python host/trace_tool.py diff before.mpt after.mpt
+    python host/trace_tool.py replay trace.mpt [--profile N] [--root DIR] [-v]
+
+A trace is the .mpt file saved by host/macropad_host.py, or a serial console
+log containing the "[TRACE]" hex dump. `replay` feeds the recorded inputs
+through host/simulator.py with the config files in --root and diffs the
+resulting HID reports against the recorded ones; `diff` compares the HID
+output of two captures. Both print the input-to-first-report latency, so a
+slowdown shows up next to any behaviour change. Exit status 1 means the HID
+output differs.
+"""
+import argparse
+import contextlib
+import difflib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hidtrace import HID_CONSUMER, HID_KEYBOARD, HID_OTHER, PROFILE, parse_dump  # noqa: E402
+from simulator import ROOT, TICKS_MAX, PadModel, SimClock, load_firmware  # noqa: E402
+
+HID_KINDS = (HID_KEYBOARD, HID_CONSUMER, HID_OTHER)
+KIND_NAMES = {
+    1: "key down",
+    2: "key up",
+    3: "button down",
+    4: "button up",
+    5: "encoder",
+    HID_KEYBOARD: "keyboard",
+    HID_CONSUMER: "consumer",
+    HID_OTHER: "hid",
+    PROFILE: "profile",
+}
+# Simulated usage page -> trace record kind.
+USAGE_PAGE_KINDS = {0x01: HID_KEYBOARD, 0x0C: HID_CONSUMER}
+# Loop passes simulated after the last input, for holds, chords and macros.
+SETTLE_MS = 3000
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return parse_dump(f.read())
+
+
+def describe(record):
+    kind, number, value, _timestamp, report = record
+    name = KIND_NAMES.get(kind, f"kind {kind}")
+    if kind in HID_KINDS:
+        return f"{name} {report.hex()}"
+    if kind == 5:
+        return f"{name} {number} {value:+d}"
+    return f"{name} {number}"
+
+
+def elapsed(start, timestamp):
+    return (timestamp - start) & TICKS_MAX
+
+
+def hid_after_first_input(records):
+    """(timestamp, kind, report) of reports sent after the first input event."""
+    reports = []
+    seen_input = False
+    for kind, _number, _value, timestamp, report in records:
+        if kind in HID_KINDS:
+            if seen_input:
+                reports.append((timestamp, kind, report))
+        elif kind != PROFILE:
+            seen_input = True
+    return reports
+
+
+def input_latencies(records):
+    """ms from each input event to the first report that followed it."""
+    latencies = []
+    pending = None
+    for kind, _number, _value, timestamp, _report in records:
+        if kind in HID_KINDS:
+            if pending is not None:
+                latencies.append(elapsed(pending, timestamp))
+                pending = None
+        elif kind != PROFILE:
+            pending = timestamp
+    return latencies
+
+
+def latency_summary(label, records):
+    latencies = sorted(input_latencies(records))
+    if not latencies:
+        return f"{label}: no input produced a report"
+    median = latencies[len(latencies) // 2]
+    return f"{label}: {len(latencies)} inputs with output, median {median} ms, worst {latencies[-1]} ms"
+
+
+def diff_reports(expected, actual, expected_label, actual_label):
+    """Print where two report sequences differ; True when they match."""
+    a = [(kind, report) for _t, kind, report in expected]
+    b = [(kind, report) for _t, kind, report in actual]
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    same = True
+    for tag, a_start, a_end, b_start, b_end in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        same = False
+        print(f"--- {tag}: {expected_label}[{a_start}:{a_end}] vs {actual_label}[{b_start}:{b_end}]")
+        for timestamp, kind, report in expected[a_start:a_end]:
+            print(f"  - {timestamp:>10} {KIND_NAMES[kind]} {report.hex()}")
+        for timestamp, kind, report in actual[b_start:b_end]:
+            print(f"  + {timestamp:>10} {KIND_NAMES[kind]} {report.hex()}")
+    print(f"{len(a)} vs {len(b)} reports: {'identical' if same else 'DIFFERENT'}")
+    return same
+
+
+def show(records):
+    if not records:
+        print("empty trace")
+        return
+    start = records[0][3]
+    for record in records:
+        print(f"{elapsed(start, record[3]):>8} ms  {describe(record)}")
+    print(latency_summary("latency", records))
+
+
+def replay(records, profile=None, root=ROOT, verbose=False):
+    """Simulated records (inputs plus the HID reports they produce)."""
+    inputs = [record for record in records if record[0] not in HID_KINDS]
+    if profile is None:
+        profile = next((record[1] for record in inputs if record[0] == PROFILE), 0)
+    start = inputs[0][3] if inputs else 0
+    clock = SimClock(start)
+    output = []
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        firmware = load_firmware(clock, output, root)
+        del output[:]
+        pad = PadModel(firmware, clock, profile)
+        simulated = []
+        sent = 0
+        for kind, number, value, timestamp, _report in inputs:
+            # Loop passes 1 ms apart until the event was captured; an action
+            # that blocked past it delays the event, as on the device.
+            due = start + elapsed(start, timestamp)
+            while clock.now < due:
+                pad.poll()
+                clock.now += 1
+            sent = _collect(output, sent, simulated)
+            simulated.append((kind, number, value, timestamp, b""))
+            if kind == PROFILE:
+                pad.set_profile(number)
+            else:
+                pad.feed(kind, number, value, timestamp)
+            pad.poll()
+        # Run out any text still being typed, then let the timers settle.
+        settle_start = clock.now
+        while clock.now - settle_start < SETTLE_MS or pad.busy:
+            pad.poll()
+            clock.now += 1
+        _collect(output, sent, simulated)
+    return simulated
+
+
+def _collect(output, sent, simulated):
+    for timestamp, usage_page, report in output[sent:]:
+        kind = USAGE_PAGE_KINDS.get(usage_page, HID_OTHER)
+        simulated.append((kind, len(report), 0, timestamp & TICKS_MAX, report))
+    return len(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    show_parser = commands.add_parser("show", help="print a trace as a timeline")
+    show_parser.add_argument("trace")
+    diff_parser = commands.add_parser("diff", help="compare the HID output of two traces")
+    diff_parser.add_argument("expected")
+    diff_parser.add_argument("actual")
+    replay_parser = commands.add_parser("replay", help="re-run inputs through the simulator")
+    replay_parser.add_argument("trace")
+    replay_parser.add_argument("--profile", type=int, help="profile at the start of the trace")
+    replay_parser.add_argument("--root", default=ROOT, help="directory with the config files")
+    replay_parser.add_argument("-v", "--verbose", action="store_true", help="show firmware output")
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        show(load(args.trace))
+        return 0
+    if args.command == "diff":
+        expected = load(args.expected)
+        actual = load(args.actual)
+        print(latency_summary(args.expected, expected))
+        print(latency_summary(args.actual, actual))
+        same = diff_reports(
+            hid_after_first_input(expected), hid_after_first_input(actual), "expected", "actual"
+        )
+        return 0 if same else 1
+    recorded = load(args.trace)
+    simulated = replay(recorded, args.profile, args.root, args.verbose)
+    print(latency_summary("recorded", recorded))
+    print(latency_summary("simulated", simulated))
+    same = diff_reports(
+        hid_after_first_input(recorded), hid_after_first_input(simulated), "recorded", "simulated"
+    )
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
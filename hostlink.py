@@ -0,0 +1,127 @@
+"""Framed message channel to the host agent over the usb_cdc data port.
+
+Every message is an ASCII header line ``TAG LENGTH\\n`` followed by LENGTH
+raw payload bytes. The same framing is implemented by `host/macropad_host.py`.
+The data port must be enabled in boot.py; without it (or with no agent
+listening) `HostLink.connected` is False and callers fall back to
+behaviour that does not need the host.
+"""
+import time
+
+try:
+    import usb_cdc
+except ImportError:
+    usb_cdc = None
+
+MAX_HEADER = 32
+
+
+class HostLink:
+    def __init__(self, serial=None):
+        if serial is None and usb_cdc is not None:
+            serial = usb_cdc.data
+        self.serial = serial
+        self.buffer = bytearray()
+        self.handlers = {}
+        self._pending_tag = None
+        self._pending_length = 0
+        # Complete frames may still be buffered (wait_for() returns after the
+        # first match); otherwise only new bytes can complete one.
+        self._unparsed = False
+
+    @property
+    def connected(self):
+        """True when the data port exists and a host program has it open."""
+        serial = self.serial
+        return serial is not None and getattr(serial, "connected", True)
+
+    def on(self, tag, handler):
+        """Call `handler(payload)` for every received frame with `tag`."""
+        self.handlers[tag] = handler
+
+    def send(self, tag, payload=b""):
+        if not self.connected:
+            return False
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        self.serial.write(f"{tag} {len(payload)}\n".encode())
+        if payload:
+            self.serial.write(payload)
+        return True
+
+    def _read_available(self):
+        serial = self.serial
+        waiting = serial.in_waiting if serial is not None else 0
+        if waiting:
+            self.buffer.extend(serial.read(waiting))
+        return waiting
+
+    def _next_frame(self):
+        """Parse one complete frame out of the buffer, or return None."""
+        buffer = self.buffer
+        if self._pending_tag is None:
+            end = bytes(buffer[:MAX_HEADER]).find(b"\n")
+            if end < 0:
+                if len(buffer) > MAX_HEADER:
+                    # Garbage without a header terminator; resynchronise.
+                    self.buffer = bytearray()
+                return None
+            header = bytes(buffer[:end])
+            buffer = self.buffer = buffer[end + 1 :]
+            try:
+                tag, length = header.split(b" ")
+                self._pending_length = int(length)
+                self._pending_tag = tag.decode()
+            except ValueError:
+                print(f"[HOST] Bad frame header: {header}")
+                return self._next_frame()
+        if len(buffer) < self._pending_length:
+            return None
+        payload = bytes(buffer[: self._pending_length])
+        self.buffer = buffer[self._pending_length :]
+        tag = self._pending_tag
+        self._pending_tag = None
+        return tag, payload
+
+    def poll(self):
+        """Dispatch every complete frame received so far to its handler.
+
+        Returns True when anything arrived. Nothing is parsed or allocated
+        while the port is quiet, even with part of a frame buffered.
+        """
+        if self.serial is None or not (self._read_available() or self._unparsed):
+            return False
+        self._unparsed = False
+        frame = self._next_frame()
+        while frame is not None:
+            handler = self.handlers.get(frame[0])
+            if handler is not None:
+                handler(frame[1])
+            frame = self._next_frame()
+        return True
+
+    def wait_for(self, tag, timeout):
+        """Block up to `timeout` seconds for a frame with `tag`.
+
+        Frames with other tags are still dispatched to their handlers.
+        Returns the payload, or None on timeout or when no host is connected.
+        """
+        if not self.connected:
+            return None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            self._read_available()
+            frame = self._next_frame()
+            while frame is not None:
+                if frame[0] == tag:
+                    self._unparsed = True
+                    return frame[1]
+                handler = self.handlers.get(frame[0])
+                if handler is not None:
+                    handler(frame[1])
+                frame = self._next_frame()
+            time.sleep(0.001)
+        return None
+
+
+link = HostLink()
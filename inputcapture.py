@@ -0,0 +1,449 @@
+"""Background input capture feeding a lock-free ring of timestamped events.
+
+On the RP2040 the matrix and buttons are scanned by `keypad` in the
+background (C code running off the tick interrupt) and the encoders are
+decoded by PIO state machines through `rotaryio`, so nothing in the Python
+loop samples pins anymore. `InputProducer.poll()` only moves what those
+background scanners captured into an `EventRing`, which the main loop drains.
+
+Each group of inputs is a source (KeypadSource, PolledKeySource,
+EncoderSource) that emits the same (kind, number, value, timestamp) events,
+so the loop does not care which backend produced them. `make_producer()`
+builds them from a pinmap.PinMap and picks the fastest backend available.
+
+On a desktop Python the same producer can run on its own thread with
+`ThreadedProducer`, which is how tests/test_inputcapture.py exercises the
+single-producer/single-consumer ring off-device.
+"""
+import array
+import time
+
+from ticks import ticks_ms, ticks_diff
+from encoderaccel import AccelerationCurve
+
+try:
+    import digitalio
+except ImportError:
+    digitalio = None
+
+try:
+    import keypad
+except ImportError:
+    keypad = None
+
+try:
+    import rotaryio
+except ImportError:
+    rotaryio = None
+
+try:
+    import rotaryio2
+except ImportError:
+    rotaryio2 = None
+
+try:
+    import threading
+except ImportError:
+    threading = None
+
+# Event kinds
+KEY_PRESSED = 1
+KEY_RELEASED = 2
+BUTTON_PRESSED = 3
+BUTTON_RELEASED = 4
+ENCODER_MOVED = 5
+
+
+class InputEvent:
+    """Reusable event record filled by `EventRing.get_into()`."""
+
+    def __init__(self):
+        self.kind = 0
+        self.number = 0
+        self.value = 0
+        self.timestamp = 0
+
+
+class EventRing:
+    """Single-producer/single-consumer ring buffer of input events.
+
+    All storage is preallocated. The producer only writes `head` and the
+    consumer only writes `tail`, and each slot is fully written before `head`
+    moves past it, so no lock is needed between the two sides.
+    """
+
+    def __init__(self, capacity=64):
+        if capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.mask = capacity - 1
+        self.kinds = bytearray(capacity)
+        self.numbers = bytearray(capacity)
+        self.values = array.array("h", [0] * capacity)
+        self.timestamps = array.array("L", [0] * capacity)
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return (self.head - self.tail) & 0xFFFF
+
+    def put(self, kind, number, value, timestamp):
+        """Producer side. Returns False (and counts a drop) when full."""
+        head = self.head
+        if ((head - self.tail) & 0xFFFF) > self.mask:
+            self.dropped += 1
+            return False
+        slot = head & self.mask
+        self.kinds[slot] = kind
+        self.numbers[slot] = number
+        self.values[slot] = value
+        self.timestamps[slot] = timestamp
+        self.head = (head + 1) & 0xFFFF
+        return True
+
+    def get_into(self, event):
+        """Consumer side. Fill `event` with the oldest entry; False when empty."""
+        tail = self.tail
+        if tail == self.head:
+            return False
+        slot = tail & self.mask
+        event.kind = self.kinds[slot]
+        event.number = self.numbers[slot]
+        event.value = self.values[slot]
+        event.timestamp = self.timestamps[slot]
+        self.tail = (tail + 1) & 0xFFFF
+        return True
+
+    def clear(self):
+        self.tail = self.head
+
+
+class SoftwareEncoder:
+    """Polled quadrature decoder, used when no PIO state machine is available."""
+
+    def __init__(self, pinA, pinB):
+        self.a = digitalio.DigitalInOut(pinA)
+        self.b = digitalio.DigitalInOut(pinB)
+        self.a.direction = digitalio.Direction.INPUT
+        self.a.pull = digitalio.Pull.UP
+        self.b.direction = digitalio.Direction.INPUT
+        self.b.pull = digitalio.Pull.UP
+        self.position = 0
+        # State changes that skipped a quadrature state: two quarter steps lost.
+        self.missed = 0
+        self._state = (int(self.a.value) << 1) | int(self.b.value)
+        self._transition_accum = 0
+        # Valid Gray-code transitions: +1/-1 quarter-steps, 0 for invalid/bounce.
+        self._transition_table = (
+            0, -1, 1, 0,
+            1, 0, 0, -1,
+            -1, 0, 0, 1,
+            0, 1, -1, 0,
+        )
+
+    def update(self):
+        current_state = (int(self.a.value) << 1) | int(self.b.value)
+        if current_state != self._state:
+            transition = (self._state << 2) | current_state
+            quarter_step = self._transition_table[transition]
+            if quarter_step:
+                self._transition_accum += quarter_step
+                if self._transition_accum >= 4:
+                    self.position += 1
+                    self._transition_accum = 0
+                elif self._transition_accum <= -4:
+                    self.position -= 1
+                    self._transition_accum = 0
+            else:
+                self.missed += 1
+            self._state = current_state
+
+    def deinit(self):
+        self.a.deinit()
+        self.b.deinit()
+
+
+# Backends from lowest to highest latency; "auto" takes the first one the
+# build supports, naming one skips only the faster ones.
+KEY_BACKENDS = ("keypad", "polled")
+ENCODER_BACKENDS = ("rotaryio2", "rotaryio", "polled")
+
+
+def _allowed(backends, backend):
+    if backend == "auto":
+        return backends
+    if backend not in backends:
+        raise ValueError(f"unknown input backend {backend!r}")
+    return backends[backends.index(backend) :]
+
+
+def make_encoder(pin_a, pin_b, acceleration=(), backend="auto"):
+    """Prefer the native rotaryio2 or PIO-backed rotaryio decoder, fall back to polling."""
+    allowed = _allowed(ENCODER_BACKENDS, backend)
+    if rotaryio2 is not None and "rotaryio2" in allowed:
+        try:
+            encoder = rotaryio2.IncrementalEncoder2(pin_a, pin_b)
+            encoder.acceleration = acceleration
+            return encoder
+        except (RuntimeError, ValueError) as e:
+            print(f"[INPUT] rotaryio2 unavailable on {pin_a}/{pin_b}: {e}")
+    if rotaryio is not None and "rotaryio" in allowed:
+        try:
+            return rotaryio.IncrementalEncoder(pin_a, pin_b)
+        except (RuntimeError, ValueError) as e:
+            print(f"[INPUT] rotaryio unavailable on {pin_a}/{pin_b}: {e}")
+    return SoftwareEncoder(pin_a, pin_b)
+
+
+class KeypadSource:
+    """Key transitions scanned and timestamped in the background by `keypad`."""
+
+    def __init__(self, scanner, pressed_kind, released_kind):
+        self.scanner = scanner
+        self.pressed_kind = pressed_kind
+        self.released_kind = released_kind
+        self._event = keypad.Event()
+
+    def poll(self, ring):
+        event = self._event
+        queue = self.scanner.events
+        while queue.get_into(event):
+            kind = self.pressed_kind if event.pressed else self.released_kind
+            ring.put(kind, event.key_number, 0, event.timestamp)
+        if queue.overflowed:
+            ring.dropped += 1
+            queue.clear()
+
+    def deinit(self):
+        self.scanner.deinit()
+
+
+class PolledKeySource:
+    """Keys sampled with digitalio, for builds without `keypad`.
+
+    With `rows`, each row is driven to `pressed_level` in turn and `pins` are
+    the sensed columns; keys are numbered row-major like keypad.KeyMatrix.
+    Scans are `interval_ms` apart, which also debounces.
+    """
+
+    def __init__(self, pins, pressed_kind, released_kind, rows=(), pressed_level=False, interval_ms=20):
+        self.pressed_kind = pressed_kind
+        self.released_kind = released_kind
+        self.pressed_level = pressed_level
+        self.interval_ms = interval_ms
+        pull = digitalio.Pull.DOWN if pressed_level else digitalio.Pull.UP
+        self.columns = []
+        for pin in pins:
+            column = digitalio.DigitalInOut(pin)
+            column.switch_to_input(pull=pull)
+            self.columns.append(column)
+        # Undriven rows float so that only the scanned row can close a key.
+        self.rows = [digitalio.DigitalInOut(pin) for pin in rows] or [None]
+        self.state = bytearray(len(self.rows) * len(self.columns))
+        self.last_scan = ticks_ms()
+
+    def poll(self, ring):
+        now = ticks_ms()
+        if ticks_diff(now, self.last_scan) < self.interval_ms:
+            return
+        self.last_scan = now
+        state = self.state
+        index = 0
+        for row in self.rows:
+            if row is not None:
+                row.switch_to_output(value=self.pressed_level)
+            for column in self.columns:
+                pressed = column.value == self.pressed_level
+                if pressed != state[index]:
+                    state[index] = pressed
+                    ring.put(self.pressed_kind if pressed else self.released_kind, index, 0, now)
+                index += 1
+            if row is not None:
+                row.switch_to_input()
+
+    def deinit(self):
+        for pin in self.columns + self.rows:
+            if pin is not None:
+                pin.deinit()
+
+
+class EncoderSource:
+    """Accelerated step counts from a set of encoders.
+
+    Encoders with a native `take_delta_into()` (rotaryio2) scale in C; the others,
+    and a native one whose position moves while it never reports a detent,
+    go through the matching `AccelerationCurve` in `curves`.
+    """
+
+    def __init__(self, encoders, curves=()):
+        self.encoders = list(encoders)
+        self.last_positions = [encoder.position for encoder in self.encoders]
+        self.curves = list(curves)
+        while len(self.curves) < len(self.encoders):
+            self.curves.append(AccelerationCurve())
+        self.native = [hasattr(encoder, "take_delta_into") for encoder in self.encoders]
+        # take_delta_into() target: steps, detents, timestamp, position.
+        self.delta = array.array("i", [0] * 4)
+        # Steps of events dropped on a full ring.
+        self.dropped_steps = 0
+
+    def poll(self, ring):
+        count = len(self.encoders)
+        index = 0
+        while index < count:
+            self._poll_encoder(index, ring)
+            index += 1
+
+    def _poll_encoder(self, index, ring):
+        encoder = self.encoders[index]
+        if self.native[index]:
+            # Fills a preallocated buffer, so an idle pass allocates nothing.
+            delta = encoder.take_delta_into(self.delta)
+            if delta:
+                self.last_positions[index] += delta
+                steps = self.delta[0]
+                if not ring.put(ENCODER_MOVED, index, steps, self.delta[2]):
+                    self.dropped_steps += abs(steps)
+                return
+            if self.delta[3] == self.last_positions[index]:
+                return
+            # The position, read atomically with the detents, moved without
+            # any: this build's quadrature handler does not feed
+            # take_delta_into(), so scale the position deltas with the curve
+            # like any other encoder.
+            print(f"[INPUT] Encoder {index}: no native detents, using position deltas")
+            self.native[index] = False
+        if isinstance(encoder, SoftwareEncoder):
+            encoder.update()
+        position = encoder.position
+        delta = position - self.last_positions[index]
+        if delta:
+            self.last_positions[index] = position
+            now = ticks_ms()
+            steps = self.curves[index].steps(delta, now)
+            if not ring.put(ENCODER_MOVED, index, steps, now):
+                self.dropped_steps += abs(steps)
+
+    def positions(self):
+        return tuple(self.last_positions)
+
+    def step_loss(self):
+        """Estimated encoder steps lost: dropped events plus skipped states of polled encoders.
+
+        A skipped quadrature state is half a detent whose direction is
+        unknown. PIO and native decoders do not skip states.
+        """
+        missed = 0
+        for encoder in self.encoders:
+            if isinstance(encoder, SoftwareEncoder):
+                missed += encoder.missed
+        return self.dropped_steps + missed // 2
+
+    def deinit(self):
+        for encoder in self.encoders:
+            encoder.deinit()
+
+
+class InputProducer:
+    """Polls every input source into one ring of normalised, timestamped events.
+
+    A source is any object with `poll(ring)`, which puts
+    (kind, number, value, timestamp) events, and `deinit()`.
+    """
+
+    def __init__(self, ring, sources=()):
+        self.ring = ring
+        self.sources = list(sources)
+
+    def poll(self):
+        ring = self.ring
+        sources = self.sources
+        count = len(sources)
+        index = 0
+        while index < count:
+            sources[index].poll(ring)
+            index += 1
+
+    def positions(self):
+        """Encoder positions, to carry across a re-creation (e.g. light sleep)."""
+        for source in self.sources:
+            if isinstance(source, EncoderSource):
+                return source.positions()
+        return ()
+
+    def step_loss(self):
+        """Estimated encoder steps lost since this producer was created."""
+        loss = 0
+        for source in self.sources:
+            if isinstance(source, EncoderSource):
+                loss += source.step_loss()
+        return loss
+
+    def deinit(self):
+        for source in self.sources:
+            source.deinit()
+
+
+def make_matrix_source(rows, columns, columns_to_anodes=False, backend="auto"):
+    if keypad is not None and "keypad" in _allowed(KEY_BACKENDS, backend):
+        matrix = keypad.KeyMatrix(rows, columns, columns_to_anodes=columns_to_anodes)
+        return KeypadSource(matrix, KEY_PRESSED, KEY_RELEASED)
+    # keypad drives rows low into anode columns, high into cathode columns.
+    return PolledKeySource(columns, KEY_PRESSED, KEY_RELEASED, rows, not columns_to_anodes)
+
+
+def make_button_source(pins, backend="auto"):
+    """Buttons wired to ground, with internal pull-ups."""
+    if keypad is not None and "keypad" in _allowed(KEY_BACKENDS, backend):
+        buttons = keypad.Keys(pins, value_when_pressed=False, pull=True)
+        return KeypadSource(buttons, BUTTON_PRESSED, BUTTON_RELEASED)
+    return PolledKeySource(pins, BUTTON_PRESSED, BUTTON_RELEASED)
+
+
+def make_producer(ring, pins, accelerations=(), positions=None):
+    """Build the on-device producer from a pinmap.PinMap."""
+    encoders = []
+    curves = []
+    for index, (pin_a, pin_b) in enumerate(pins.encoders):
+        points = accelerations[index] if index < len(accelerations) else ()
+        encoders.append(make_encoder(pin_a, pin_b, points, pins.encoder_backend))
+        curves.append(AccelerationCurve(points))
+    if positions:
+        for encoder, position in zip(encoders, positions):
+            encoder.position = position
+    return InputProducer(
+        ring,
+        (
+            make_matrix_source(pins.rows, pins.columns, pins.columns_to_anodes, pins.key_backend),
+            make_button_source(pins.buttons, pins.button_backend),
+            EncoderSource(encoders, curves),
+        ),
+    )
+
+
+if threading is not None:
+
+    class ThreadedProducer:
+        """Host stand-in for the second core: runs `producer.poll()` on a thread."""
+
+        def __init__(self, producer, interval=0.0005):
+            self.producer = producer
+            self.interval = interval
+            self._running = False
+            self._thread = None
+
+        def start(self):
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+        def _run(self):
+            while self._running:
+                self.producer.poll()
+                time.sleep(self.interval)
+
+        def stop(self):
+            self._running = False
+            if self._thread is not None:
+                self._thread.join()
+                self._thread = None
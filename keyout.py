@@ -1,31 +1,136 @@
-from adafruit_hid.keyboard import Keyboard
-from adafruit_hid.keycode import Keycode
-import usb_hid
 import time
 import json
-
-# Initialize HID devices
-keyboard = Keyboard(usb_hid.devices)
+from adafruit_hid import find_device
+from bulkpaste import BulkPaste
+from hidtrace import hid_devices
+from hostlink import link as host_link
+from keyreports import ChordKeyboard, report_format_for
+from keytokens import LEFT_CONTROL, LEFT_GUI, keycode_for, modifier_bit
+from launcher import Launcher
+from layouts import get_layout
+from macro import MacroError, MacroPlayer, compile_macro
+from textstream import TextStream
+
+# Initialize HID devices (wrapped to record reports while hidtrace is on).
+# With boot.py's custom set the keyboard takes NKRO reports (keyreports.py).
+hid = hid_devices()
+report_format = report_format_for(hid)
+keyboard_device = find_device(hid, usage_page=0x01, usage=0x06)
+keyboard = ChordKeyboard(keyboard_device, report_format)
+macro_player = MacroPlayer(
+    keyboard_device,
+    find_device(hid, usage_page=0x0C, usage=0x01),
+    report_format,
+)
+# Reused keyboard report for text typing: modifiers plus one key
+_text_report = bytearray(report_format.size)
+# Text actions type from the main loop through this stream (tick() every pass).
+text_stream = TextStream(keyboard_device, report_format)
 
 # Load configurations from JSON file
 try:
     with open("keysfile.json", "r") as f:
         config = json.load(f)
     profiles_config = config.get("profiles", {})
+    launch_presets_config = config.get("launch_presets", {})
+    layout_name = config.get("layout", "us")
+    unicode_input = config.get("unicode_input")
+    chord_window_ms = config.get("chord_window_ms", 30)
+    typing_rate = config.get("typing_rate", 25)
     print(f"[INIT] JSON loaded successfully. Profiles: {list(profiles_config.keys())}")
     for p_idx, p_data in profiles_config.items():
         print(f"[INIT]   Profile {p_idx}: keys {list(p_data.keys())}")
 except FileNotFoundError:
     print("[ERROR] keysfile.json not found!")
     profiles_config = {}
+    launch_presets_config = {}
+    layout_name = "us"
+    unicode_input = None
+    chord_window_ms = 30
+    typing_rate = 25
 except Exception as e:
     print(f"[ERROR] Failed to load JSON: {e}")
     import traceback
     traceback.print_exc()
     profiles_config = {}
-
-# Dictionary with key configurations: key_index -> {name, key, function}
-profiles = {}
+    launch_presets_config = {}
+    layout_name = "us"
+    unicode_input = None
+    chord_window_ms = 30
+    typing_rate = 25
+
+# Host keyboard layout used to turn text into key presses.
+text_layout = get_layout(layout_name)
+print(f"[INIT] Text layout: {text_layout.name}, unicode input: {unicode_input}")
+
+# Text typing pace in characters per second: "typing_rate" in keysfile.json,
+# replaced by the rate host/calibrate.py measured for the host when the agent
+# sends one. Each character holds its key for TYPING_HOLD_SHARE of its period.
+TYPING_RATE_RANGE = (1, 1000)
+TYPING_HOLD_SHARE = 0.25
+_key_hold = 0.0
+_key_gap = 0.0
+_chord_hold = 0.0
+
+
+def set_typing_rate(chars_per_second):
+    """Pace text typing and key combos for `chars_per_second`."""
+    global typing_rate, _key_hold, _key_gap, _chord_hold
+    low, high = TYPING_RATE_RANGE
+    typing_rate = min(max(float(chars_per_second), low), high)
+    _chord_hold = 1 / typing_rate
+    _key_hold = _chord_hold * TYPING_HOLD_SHARE
+    _key_gap = _chord_hold - _key_hold
+
+
+set_typing_rate(typing_rate)
+
+# Milliseconds to wait for the host agent to confirm a "bulk" text is on the
+# clipboard before typing it key by key instead.
+BULK_PASTE_TIMEOUT_MS = 1000
+
+# Pause in milliseconds after each line ("line-by-line") or paragraph ("paragraph").
+TEXT_PART_PAUSE_MS = {"line-by-line": 300, "paragraph": 300}
+
+# Software launch timing (seconds):
+#   open:   after tapping Windows / Win+R, before asking the host or waiting
+#   ready:  fixed wait for the dialog, or the longest wait for a host READY
+#   settle: between typing the name and pressing Enter (search results)
+LAUNCH_PRESETS = {
+    "fast": {"open": 0.05, "ready": 0.25, "settle": 0.15},
+    "normal": {"open": 0.2, "ready": 0.5, "settle": 0.5},
+    "slow": {"open": 0.3, "ready": 1.0, "settle": 1.0},
+}
+for preset_name, preset in launch_presets_config.items():
+    if isinstance(preset, dict):
+        LAUNCH_PRESETS[preset_name] = dict(LAUNCH_PRESETS["normal"], **preset)
+
+# Macros compiled at load time: id(action config) -> CompiledMacro
+macros = {}
+# Key combos resolved at load time: id(action config) -> tuple of usages
+combos = {}
+
+
+def apply_config(config):
+    """Use a parsed keysfile.json document from now on, e.g. one pushed over raw HID.
+
+    Only RAM changes: profiles_config is updated in place for its importers,
+    and compiled macros and combos are dropped. The typing rate is
+    kept, since the host agent may have set it.
+    """
+    global layout_name, unicode_input, chord_window_ms, text_layout
+    profiles_config.clear()
+    profiles_config.update(config.get("profiles", {}))
+    for preset_name, preset in config.get("launch_presets", {}).items():
+        if isinstance(preset, dict):
+            LAUNCH_PRESETS[preset_name] = dict(LAUNCH_PRESETS["normal"], **preset)
+    layout_name = config.get("layout", "us")
+    unicode_input = config.get("unicode_input")
+    chord_window_ms = config.get("chord_window_ms", 30)
+    text_layout = get_layout(layout_name)
+    macros.clear()
+    combos.clear()
+    print(f"[INIT] Config applied. Profiles: {list(profiles_config.keys())}")
 
 
 def _is_text_action(key_config):
@@ -34,14 +139,7 @@ def _is_text_action(key_config):
     if key_config.get("action") == "text_input":
         return True
     # If has text_content, it's a text action
-    if "text_content" in key_config:
-        return True
-    # Check if key field contains text_input (legacy support)
-    key_value = key_config.get("key")
-    if isinstance(key_value, list) and "text_input" in key_value:
-        print(f"[WARN] Found 'text_input' in key field - should use action field instead")
-        return True
-    return False
+    return "text_content" in key_config
 
 
 def _normalized_key_list(key_value):
@@ -58,253 +156,239 @@ def _is_software_action(key_config):
         return bool(key_config.get("software"))
     return bool(key_config.get("software"))
 
-def execute_combination(*keys):
-    """Simulate pressing a combination of keys."""
-    key_dict = {
-    "windows": Keycode.WINDOWS,
-    # Letters
-    "a": Keycode.A, "b": Keycode.B, "c": Keycode.C, "d": Keycode.D,
-    "e": Keycode.E, "f": Keycode.F, "g": Keycode.G, "h": Keycode.H,
-    "i": Keycode.I, "j": Keycode.J, "k": Keycode.K, "l": Keycode.L,
-    "m": Keycode.M, "n": Keycode.N, "o": Keycode.O, "p": Keycode.P,
-    "q": Keycode.Q, "r": Keycode.R, "s": Keycode.S, "t": Keycode.T,
-    "u": Keycode.U, "v": Keycode.V, "w": Keycode.W, "x": Keycode.X,
-    "y": Keycode.Y, "z": Keycode.Z,
-
-    # Numbers
-    "0": Keycode.ZERO, "1": Keycode.ONE, "2": Keycode.TWO, "3": Keycode.THREE,
-    "4": Keycode.FOUR, "5": Keycode.FIVE, "6": Keycode.SIX, "7": Keycode.SEVEN,
-    "8": Keycode.EIGHT, "9": Keycode.NINE,
-
-    # Special characters
-    "backslash": Keycode.BACKSLASH, "space": Keycode.SPACEBAR, "enter": Keycode.ENTER,
-    "esc": Keycode.ESCAPE, "backspace": Keycode.BACKSPACE, "tab": Keycode.TAB,
-    "shift": Keycode.SHIFT, "ctrl": Keycode.CONTROL, "alt": Keycode.ALT,
-    "up": Keycode.UP_ARROW, "down": Keycode.DOWN_ARROW, "left": Keycode.LEFT_ARROW,
-    "right": Keycode.RIGHT_ARROW, "home": Keycode.HOME, "end": Keycode.END,
-    "pageup": Keycode.PAGE_UP, "pagedown": Keycode.PAGE_DOWN, "insert": Keycode.INSERT,
-    "delete": Keycode.DELETE,"print_screen":Keycode.PRINT_SCREEN,
-
-    # Function Keys
-    "f1": Keycode.F1, "f2": Keycode.F2, "f3": Keycode.F3, "f4": Keycode.F4,
-    "f5": Keycode.F5, "f6": Keycode.F6, "f7": Keycode.F7, "f8": Keycode.F8,
-    "f9": Keycode.F9, "f10": Keycode.F10, "f11": Keycode.F11, "f12": Keycode.F12,
-    "f13": Keycode.F13, "f14": Keycode.F14, "f15": Keycode.F15, "f16": Keycode.F16,
-    "f17": Keycode.F17, "f18": Keycode.F18, "f19": Keycode.F19, "f20": Keycode.F20,
-    "f21": Keycode.F21, "f22": Keycode.F22, "f23": Keycode.F23, "f24": Keycode.F24,
-
-    # Punctuation and symbols
-    "comma": Keycode.COMMA, "period": Keycode.PERIOD, "slash": Keycode.FORWARD_SLASH,
-    "semicolon": Keycode.SEMICOLON, "quote": Keycode.QUOTE, "left_bracket": Keycode.LEFT_BRACKET,
-    "right_bracket": Keycode.RIGHT_BRACKET, "minus": Keycode.MINUS, "equal": Keycode.EQUALS
-    }
+def press_combination(usages):
+    """Press resolved key usages as one report and release them after one character period.
 
-    try:
-        keys_to_press = [key_dict[key] for key in keys]
-        print(f"[COMBO] Pressing keys: {keys} -> {keys_to_press}")
-        keyboard.press(*keys_to_press)
-        time.sleep(0.1)
-        keyboard.release(*keys_to_press)
-        print(f"[COMBO] Released successfully")
-    except KeyError as e:
-        print(f"[ERROR] Unsupported key in combination: {e}")
-        print(f"[ERROR] Tried to map: {keys}")
-    except Exception as e:
-        print(f"[ERROR] execute_combination failed: {e}")
-        import traceback
-        traceback.print_exc()
-
-def open_software(software_name):
-    """Open a specific software by typing its name and pressing Enter."""
-    keyboard.press(Keycode.WINDOWS)
-    time.sleep(0.2)
-    keyboard.release(Keycode.WINDOWS)
-    time.sleep(0.5)  # Wait for the search bar
-    type_string(software_name)  # Type the software name
-    time.sleep(0.5)
-    keyboard.press(Keycode.ENTER)
-    keyboard.release(Keycode.ENTER)
-
-
-def _tap_key(keycode, use_shift=False):
-    if use_shift:
-        keyboard.press(Keycode.SHIFT)
-    keyboard.press(keycode)
-    time.sleep(0.01)  # Reduced from 0.02
-    keyboard.release(keycode)
-    if use_shift:
-        keyboard.release(Keycode.SHIFT)
+    Any macro, text, paste or launch still running is stopped first, so its
+    keys cannot land inside the combination.
+    """
+    stop_output()
+    keyboard.press(*usages)
+    time.sleep(_chord_hold)
+    keyboard.release(*usages)
 
 
-def type_string_simple(text):
-    """Type text using simple, reliable character-by-character method - optimized for speed."""
+def open_software(software_name, method="search", preset="normal", command=None):
+    """Start opening a specific software from the Windows search box or the Run dialog.
+
+    method "run" opens Win+R and burst-types `command` (or the software name),
+    which needs no search results and so skips the settle delay. The launch
+    runs from the main loop through `launcher`; this returns at once.
+    """
+    stop_output()
+    timing = LAUNCH_PRESETS.get(preset, LAUNCH_PRESETS["normal"])
+    if method == "run":
+        launcher.start(command or software_name, "run", timing)
+    else:
+        launcher.start(software_name, "search", timing)
+
+
+def _send_text_keys(modifiers, usage):
+    report_format.set_single(_text_report, modifiers, usage)
+    keyboard_device.send_report(_text_report)
+
+
+def _type_char(char, hold=0):
+    """Type one character through the layout table; False if it cannot be typed."""
+    strokes = text_layout.keystrokes(char, unicode_input)
+    if strokes is None:
+        print(f"[TYPING] Skipping unsupported: {char}")
+        return False
+    last = len(strokes) - 1
+    for index, (modifiers, usage) in enumerate(strokes):
+        _send_text_keys(modifiers, usage)
+        if hold:
+            time.sleep(hold)
+        # Release the key; modifiers of a multi-stroke sequence stay held.
+        _send_text_keys(strokes[index + 1][0] if index < last else 0, 0)
+    return True
+
+
+def type_burst(text):
+    """Type text with one report per key and no pacing delays."""
     for char in text:
-        if char == "\n":
-            keyboard.press(Keycode.ENTER)
-            keyboard.release(Keycode.ENTER)
-            time.sleep(0.02)  # Reduced from 0.05
-        elif char == "\t":
-            keyboard.press(Keycode.TAB)
-            keyboard.release(Keycode.TAB)
-            time.sleep(0.02)  # Reduced from 0.05
-        elif char == " ":
-            keyboard.press(Keycode.SPACEBAR)
-            keyboard.release(Keycode.SPACEBAR)
-            time.sleep(0.02)  # Reduced from 0.05
-        else:
-            # Try to map character to key+shift combination
-            key_result = _char_to_key(char)
-            if key_result:
-                keycode, use_shift = key_result
-                if use_shift:
-                    keyboard.press(Keycode.SHIFT)
-                keyboard.press(keycode)
-                time.sleep(0.01)  # Reduced from 0.02
-                keyboard.release(keycode)
-                if use_shift:
-                    keyboard.release(Keycode.SHIFT)
-            else:
-                print(f"[TYPING] Skipping unsupported: {char}")
-        time.sleep(0.03)  # Reduced from 0.08 - delay between characters
-
-
-def _char_to_key(char):
-    # Letters
-    if "a" <= char <= "z":
-        return getattr(Keycode, char.upper()), False
-    if "A" <= char <= "Z":
-        return getattr(Keycode, char), True
-
-    # Digits
-    digit_map = {
-        "0": Keycode.ZERO,
-        "1": Keycode.ONE,
-        "2": Keycode.TWO,
-        "3": Keycode.THREE,
-        "4": Keycode.FOUR,
-        "5": Keycode.FIVE,
-        "6": Keycode.SIX,
-        "7": Keycode.SEVEN,
-        "8": Keycode.EIGHT,
-        "9": Keycode.NINE,
-    }
-    if char in digit_map:
-        return digit_map[char], False
-
-    # Common symbols on US layout
-    symbol_map = {
-        " ": (Keycode.SPACEBAR, False),
-        "-": (Keycode.MINUS, False),
-        "_": (Keycode.MINUS, True),
-        "=": (Keycode.EQUALS, False),
-        "+": (Keycode.EQUALS, True),
-        "[": (Keycode.LEFT_BRACKET, False),
-        "{": (Keycode.LEFT_BRACKET, True),
-        "]": (Keycode.RIGHT_BRACKET, False),
-        "}": (Keycode.RIGHT_BRACKET, True),
-        "\\": (Keycode.BACKSLASH, False),
-        "|": (Keycode.BACKSLASH, True),
-        ";": (Keycode.SEMICOLON, False),
-        ":": (Keycode.SEMICOLON, True),
-        "'": (Keycode.QUOTE, False),
-        '"': (Keycode.QUOTE, True),
-        ",": (Keycode.COMMA, False),
-        "<": (Keycode.COMMA, True),
-        ".": (Keycode.PERIOD, False),
-        ">": (Keycode.PERIOD, True),
-        "/": (Keycode.FORWARD_SLASH, False),
-        "?": (Keycode.FORWARD_SLASH, True),
-        "!": (Keycode.ONE, True),
-        "@": (Keycode.TWO, True),
-        "#": (Keycode.THREE, True),
-        "$": (Keycode.FOUR, True),
-        "%": (Keycode.FIVE, True),
-        "^": (Keycode.SIX, True),
-        "&": (Keycode.SEVEN, True),
-        "*": (Keycode.EIGHT, True),
-        "(": (Keycode.NINE, True),
-        ")": (Keycode.ZERO, True),
-    }
-
-    # Add optional keys only when present in this firmware build.
-    grave = getattr(Keycode, "GRAVE_ACCENT", None)
-    if grave is not None:
-        symbol_map["`"] = (grave, False)
-        symbol_map["~"] = (grave, True)
-
-    return symbol_map.get(char)
-
-def type_string(text):
-    """Simulate typing a string character by character (legacy - slower version)."""
+        _type_char(char)
+
+
+# Software launches step through their waits from the main loop (tick() every pass).
+launcher = Launcher(keyboard, host_link, type_burst)
+host_link.on("READY", launcher.handle_ready)
+
+
+def type_string_simple(text):
+    """Type text character by character at the calibrated typing rate."""
     for char in text:
-        if char == "\n":  # Newline
-            keyboard.press(Keycode.ENTER)
-            keyboard.release(Keycode.ENTER)
-        elif char == "\t":  # Tab
-            keyboard.press(Keycode.TAB)
-            keyboard.release(Keycode.TAB)
-        else:
-            key_result = _char_to_key(char)
-            if key_result:
-                keycode, use_shift = key_result
-                _tap_key(keycode, use_shift)
-            else:
-                print(f"Unsupported character: {char}")
-        time.sleep(0.03)  # Reduced from 0.05
+        _type_char(char, _key_hold)
+        time.sleep(_key_gap)
+
+
+def request_typing_rate():
+    """Ask the host agent for its calibrated rate; the reply arrives as a RATE frame."""
+    host_link.send("RATE")
+
+
+def handle_rate(payload):
+    """RATE frame from the host agent: the typing rate calibrated for its host."""
+    try:
+        set_typing_rate(float(payload))
+    except ValueError:
+        print(f"[TYPING] Bad typing rate: {payload}")
+        return
+    print(f"[TYPING] Host typing rate {typing_rate} chars/s")
+
+
+def type_calibration_line(chars_per_second, text):
+    """Type `text` and Enter at a trial rate, then restore the configured rate."""
+    saved = typing_rate
+    set_typing_rate(chars_per_second)
+    try:
+        type_string_simple(text + "\n")
+    finally:
+        set_typing_rate(saved)
+
+
+def handle_calibration(payload):
+    """CAL frame from host/calibrate.py: "<rate> <text>"; answered with TYPED."""
+    rate, _, text = payload.decode("utf-8").partition(" ")
+    try:
+        rate = float(rate)
+    except ValueError:
+        print(f"[TYPING] Bad calibration request: {payload}")
+        return
+    type_calibration_line(rate, text)
+    host_link.send("TYPED", f"{rate}")
+
+def paste_keys(reply):
+    """Send the paste shortcut; a PASTE reply names the agent OS's modifier, Cmd on macOS, else Ctrl."""
+    modifier = LEFT_GUI if reply == b"cmd" else LEFT_CONTROL
+    _send_text_keys(modifier_bit(modifier), text_layout.lookup("v")[0])
+    _send_text_keys(0, 0)
+
+
+def type_parts(parts, pause_ms=0):
+    """Start typing text parts through `text_stream` at the calibrated rate."""
+    hold_ms = max(1, int(_key_hold * 1000 + 0.5))
+    text_stream.start(
+        parts,
+        text_layout,
+        unicode_input,
+        hold_ms,
+        max(0, int(_chord_hold * 1000 + 0.5) - hold_ms),
+        pause_ms,
+    )
+
+
+# "bulk" texts wait for the host's PASTE from the main loop (tick() every pass).
+bulk_paste = BulkPaste(host_link, paste_keys, type_parts, BULK_PASTE_TIMEOUT_MS)
+host_link.on("PASTE", bulk_paste.handle_paste)
+
+
+def stop_output():
+    """Stop any macro, text, paste or launch in progress: one stream of key reports at a time."""
+    macro_player.stop()
+    text_stream.cancel()
+    bulk_paste.cancel()
+    launcher.cancel()
+
 
 def type_text_content(text_content, text_type="single", press_enter=False):
-    """Type the content of a text configuration.
-    
+    """Start typing the content of a text configuration.
+
+    The text goes out through `text_stream` from the main loop, so this
+    returns at once and the typing can be cancelled.
+
     Args:
         text_content (str): The text to type
         text_type (str): Type of text input
             - "single": Type the text as-is
             - "line-by-line": Type each line with a pause between
             - "paragraph": Type with proper paragraph formatting
+            - "bulk": Paste through the host agent's clipboard, typing
+              the text instead when the agent does not answer
     """
-    print(f"[TYPING] Starting: text_type={text_type}, len={len(text_content) if text_content else 0}")
-    
     if not text_content:
         print("[TYPING] No text content to type")
         return
-    
-    if text_type == "line-by-line":
+    stop_output()
+
+    if text_type == "bulk":
+        if bulk_paste.start(text_content, "\n" if press_enter else ""):
+            return
+        print("[TYPING] Bulk paste unavailable, typing instead")
+        parts = [text_content]
+    elif text_type == "line-by-line":
         lines = text_content.splitlines()
-        for i, line in enumerate(lines):
-            print(f"[TYPING] Line {i+1}/{len(lines)}")
-            type_string_simple(line)
-            if i < len(lines) - 1:
-                keyboard.press(Keycode.ENTER)
-                keyboard.release(Keycode.ENTER)
-                time.sleep(0.3)
+        parts = [line + "\n" for line in lines[:-1]] + lines[-1:]
     elif text_type == "paragraph":
-        paragraphs = text_content.split('\n\n')
-        for i, para in enumerate(paragraphs):
-            print(f"[TYPING] Paragraph {i+1}/{len(paragraphs)}")
-            type_string_simple(para)
-            if i < len(paragraphs) - 1:
-                keyboard.press(Keycode.ENTER)
-                keyboard.release(Keycode.ENTER)
-                time.sleep(0.1)
-                keyboard.press(Keycode.ENTER)
-                keyboard.release(Keycode.ENTER)
-                time.sleep(0.3)
-    else:  # Default to "single"
-        print("[TYPING] Single mode")
-        type_string_simple(text_content)
+        paragraphs = text_content.split("\n\n")
+        parts = [para + "\n\n" for para in paragraphs[:-1]] + paragraphs[-1:]
+    else:
+        parts = [text_content]
 
     if press_enter:
-        print("[TYPING] Pressing ENTER at end")
-        keyboard.press(Keycode.ENTER)
-        keyboard.release(Keycode.ENTER)
-    
-    print("[TYPING] Complete")
+        parts[-1] += "\n"
+    type_parts(parts, TEXT_PART_PAUSE_MS.get(text_type, 0))
+
 
+def _launch_from_config(key_config, profile_cfg):
+    profile_cfg = profile_cfg or {}
+    method = key_config.get("launch_method", profile_cfg.get("launch_method"))
+    if method is None:
+        method = "run" if key_config.get("command") else "search"
+    preset = key_config.get("launch_preset", profile_cfg.get("launch_preset", "normal"))
+    open_software(key_config.get("software", ""), method, preset, key_config.get("command"))
 
-def _execute_from_config(key_config):
-    """Execute one key action directly from raw config payload."""
-    if not isinstance(key_config, dict):
-        print("Invalid key config")
+
+def prepare_action(key_config, name="macro"):
+    """Compile an action's macro or key combo ahead of time; False if it is invalid.
+
+    Called once per action when a chord table is built, so a key press runs
+    prebuilt reports without checking tokens again. host/config_lint.py
+    reports the same problems before the files are deployed.
+    """
+    key_id = id(key_config)
+    if key_id in macros or key_id in combos:
+        return True
+    if "macro" in key_config:
+        try:
+            macros[key_id] = compile_macro(
+                key_config["macro"], name, text_layout, unicode_input, report_format
+            )
+        except (MacroError, OverflowError, TypeError, ValueError) as e:
+            print(f"[MACRO] {name}: invalid macro - {e}")
+            return False
+        return True
+    if _is_text_action(key_config) or _is_software_action(key_config):
+        return True
+    usages = []
+    for token in _normalized_key_list(key_config.get("key")):
+        usage = keycode_for(token)
+        if usage is None:
+            print(f"[COMBO] {name}: unsupported key token {token}")
+            return False
+        usages.append(usage)
+    try:
+        report_format.build(0, usages)
+    except ValueError as e:
+        print(f"[COMBO] {name}: {e}")
+        return False
+    if usages:
+        combos[key_id] = tuple(usages)
+    return True
+
+
+def _execute_from_config(key_config, profile_cfg=None):
+    """Execute one action that prepare_action() has accepted."""
+    key_id = id(key_config)
+    usages = combos.get(key_id)
+    if usages is not None:
+        press_combination(usages)
+        return
+
+    macro = macros.get(key_id)
+    if macro is not None:
+        stop_output()
+        macro_player.start(macro)
         return
 
     if _is_text_action(key_config):
@@ -315,111 +399,16 @@ def _execute_from_config(key_config):
         return
 
     if _is_software_action(key_config):
-        open_software(key_config.get("software", ""))
-        return
-
-    key_tokens = _normalized_key_list(key_config.get("key"))
-    if key_tokens:
-        execute_combination(*key_tokens)
+        _launch_from_config(key_config, profile_cfg)
         return
 
     print("Key not configured")
 
-# Generate profiles with functions from JSON configuration
-print("[INIT] Building profiles from JSON config...")
-for profile_idx, profile_data in profiles_config.items():
-    profile_idx = int(profile_idx)  # Convert string index to integer
-    profiles[profile_idx] = {}
-    print(f"[INIT] Building profile {profile_idx}...")
-    
-    for key_idx, key_config in profile_data.items():
-        key_idx = int(key_idx)  # Convert string index to integer
-        if not isinstance(key_config, dict):
-            print(f"[INIT]   Key {key_idx}: SKIP - not a dict")
-            continue
-
-        key_name = key_config.get("name", f"Key {key_idx}")
-        key_tokens = _normalized_key_list(key_config.get("key"))
-        
-        # Create the appropriate function based on configuration
-        if _is_text_action(key_config):
-            # This is a text input action
-            if "text_content" in key_config:
-                text_content = key_config["text_content"]
-                text_type = key_config.get("text_type", "single")
-                text_press_enter = key_config.get("text_press_enter", True)
-                profiles[profile_idx][key_idx] = {
-                    "name": key_name,
-                    "key": key_tokens,
-                    "function": lambda t=text_content, ty=text_type, pe=text_press_enter: type_text_content(t, ty, pe)
-                }
-                print(f"[INIT]   Key {key_idx} ({key_name}): TEXT_INPUT mode")
-            else:
-                profiles[profile_idx][key_idx] = {
-                    "name": key_name,
-                    "key": key_tokens,
-                    "function": lambda: print("No text content defined")
-                }
-                print(f"[INIT]   Key {key_idx} ({key_name}): TEXT_INPUT but no content")
-        elif _is_software_action(key_config):
-            # This is a software opening action
-            software_name = key_config.get("software", "")
-            profiles[profile_idx][key_idx] = {
-                "name": key_name,
-                "key": key_tokens,
-                "function": lambda s=software_name: open_software(s)
-            }
-            print(f"[INIT]   Key {key_idx} ({key_name}): SOFTWARE mode ({software_name})")
-        elif key_tokens:
-            # This is a key combination action
-            key_combo = key_tokens
-            profiles[profile_idx][key_idx] = {
-                "name": key_name,
-                "key": key_combo,
-                "function": lambda k=key_combo: execute_combination(*k)
-            }
-            print(f"[INIT]   Key {key_idx} ({key_name}): COMBO mode ({key_combo})")
-        else:
-            profiles[profile_idx][key_idx] = {
-                "name": key_name,
-                "key": [],
-                "function": lambda: print("Key not configured")
-            }
-            print(f"[INIT]   Key {key_idx} ({key_name}): NOT CONFIGURED")
-
-print(f"[INIT] Profile building complete. Total profiles: {len(profiles)}")
-
-# Function to trigger key action based on key_index
-def execute_action(key_index, profile_index=0):
-    try:
-        print(f"\n[KEY PRESS] key={key_index}, profile={profile_index}")
-        
-        # Runtime-first path: execute directly from JSON-derived config.
-        profile_cfg = profiles_config.get(str(profile_index), {})
-        if not profile_cfg:
-            print(f"[ACTION] Profile {profile_index} not found in profiles_config")
-            return
-        
-        key_cfg = profile_cfg.get(str(key_index))
-        if key_cfg is not None:
-            print(f"[ACTION] Found in runtime config, executing...")
-            _execute_from_config(key_cfg)
-            return
-        
-        print(f"[ACTION] Key {key_index} not in profile {profile_index} runtime config")
-
-        # Fallback to prebuilt map if runtime entry is missing.
-        profile = profiles.get(profile_index, {})
-        action = profile.get(key_index)
-        if action:
-            print(f"[ACTION] Found in prebuilt map, executing...")
-            action["function"]()
-            return
 
-        print(f"[WARNING] Missing action for key {key_index} in profile {profile_index}")
-    except KeyError as e:
-        print(f"[ERROR] KeyError for Key {key_index} in Profile {profile_index}: {e}")
-    except Exception as e:
-        print(f"[ERROR] Unexpected error for Key {key_index} in Profile {profile_index}: {e}")
-        import traceback
-        traceback.print_exc()
\ No newline at end of file
+def execute_config(key_config, profile_index=0):
+    """Run an action config directly, e.g. one resolved through a ChordTable.
+
+    prepare_action() has checked it when the table was built, so nothing is
+    validated or logged per press.
+    """
+    _execute_from_config(key_config, profiles_config.get(str(profile_index), {}))
@@ -0,0 +1,139 @@
+"""Keyboard report layouts and a keyboard that sends a whole chord per report.
+
+    BOOT   8 bytes, [modifiers, 0, six key slots]: CircuitPython's default keyboard
+    NKRO   16 bytes, [modifiers, bitmap of usages 0x00-0x77]: hiddescriptors.py
+
+Both start with the modifier byte. `report_format_for()` picks the layout
+from the enabled HID devices. Text typing, macros and special actions build
+their reports through the format, so a chord of any size the format allows
+goes out as one report.
+"""
+from hiddescriptors import NKRO_MAX_USAGE, NKRO_REPORT_SIZE, raw_device
+from keytokens import modifier_bit
+
+
+class BootFormat:
+    size = 8
+    max_keys = 6
+
+    def __init__(self):
+        self.release_report = bytes(self.size)
+
+    def add(self, report, usage):
+        """Press `usage` in `report`; False when the report has no room for it."""
+        for slot in range(2, 8):
+            if report[slot] == usage:
+                return True
+        for slot in range(2, 8):
+            if report[slot] == 0:
+                report[slot] = usage
+                return True
+        return False
+
+    def remove(self, report, usage):
+        for slot in range(2, 8):
+            if report[slot] == usage:
+                report[slot] = 0
+
+    def set_single(self, report, modifiers, usage):
+        """Make `report` hold `modifiers` and at most one key, without allocating."""
+        report[0] = modifiers
+        report[2] = usage
+
+    def build(self, modifiers, usages):
+        """Report bytes pressing `modifiers` plus `usages`; ValueError if they do not fit."""
+        report = bytearray(self.size)
+        report[0] = modifiers
+        for usage in usages:
+            bit = modifier_bit(usage)
+            if bit:
+                report[0] |= bit
+            elif not self.add(report, usage):
+                raise ValueError(f"no room for key {usage:#04x} in a {self.size}-byte report")
+        return bytes(report)
+
+
+class NkroFormat(BootFormat):
+    size = NKRO_REPORT_SIZE
+    max_keys = NKRO_MAX_USAGE + 1
+
+    def add(self, report, usage):
+        if usage > NKRO_MAX_USAGE:
+            return False
+        report[1 + (usage >> 3)] |= 1 << (usage & 7)
+        return True
+
+    def remove(self, report, usage):
+        if usage <= NKRO_MAX_USAGE:
+            report[1 + (usage >> 3)] &= ~(1 << (usage & 7)) & 0xFF
+
+    def set_single(self, report, modifiers, usage):
+        for index in range(1, self.size):
+            report[index] = 0
+        report[0] = modifiers
+        if usage:
+            self.add(report, usage)
+
+    def to_boot(self, report, out):
+        """Fill the 8-byte boot report `out` with the first six keys of `report`."""
+        out[0] = report[0]
+        slot = 2
+        for index in range(1, self.size):
+            bits = report[index]
+            if not bits:
+                continue
+            for bit in range(8):
+                if bits & (1 << bit) and slot < 8:
+                    out[slot] = ((index - 1) << 3) + bit
+                    slot += 1
+        while slot < 8:
+            out[slot] = 0
+            slot += 1
+
+
+BOOT = BootFormat()
+NKRO = NkroFormat()
+
+
+def report_format_for(devices):
+    """NKRO when boot.py enabled the custom device set, else BOOT."""
+    return NKRO if raw_device(devices) is not None else BOOT
+
+
+class ChordKeyboard:
+    """press()/release() like adafruit_hid's Keyboard, one report per call."""
+
+    def __init__(self, device, report_format):
+        self.device = device
+        self.format = report_format
+        self.report = bytearray(report_format.size)
+
+    def press(self, *keycodes):
+        report = self.report
+        for keycode in keycodes:
+            bit = modifier_bit(keycode)
+            if bit:
+                report[0] |= bit
+            elif not self.format.add(report, keycode):
+                raise ValueError(f"no room for key {keycode:#04x} in a {len(report)}-byte report")
+        self.device.send_report(report)
+
+    def release(self, *keycodes):
+        report = self.report
+        for keycode in keycodes:
+            bit = modifier_bit(keycode)
+            if bit:
+                report[0] &= ~bit & 0xFF
+            else:
+                self.format.remove(report, keycode)
+        self.device.send_report(report)
+
+    def release_all(self):
+        report = self.report
+        for index in range(len(report)):
+            report[index] = 0
+        self.device.send_report(report)
+
+    def send(self, *keycodes):
+        self.press(*keycodes)
+        self.release_all()
@@ -0,0 +1,125 @@
+"""Config token names resolved to raw USB HID usage IDs.
+
+This module has no CircuitPython dependencies, so the same tables serve the
+firmware at load time and host-side tools. Keyboard usages are from the HID
+Usage Tables "Keyboard/Keypad" page (0x07), media usages from the
+"Consumer" page (0x0C).
+"""
+
+# Modifier usages; their report bit is (usage - 0xE0).
+LEFT_CONTROL = 0xE0
+LEFT_SHIFT = 0xE1
+LEFT_ALT = 0xE2
+LEFT_GUI = 0xE3
+RIGHT_CONTROL = 0xE4
+RIGHT_SHIFT = 0xE5
+RIGHT_ALT = 0xE6
+RIGHT_GUI = 0xE7
+
+MOD_SHIFT = 1 << (LEFT_SHIFT - LEFT_CONTROL)
+MOD_ALTGR = 1 << (RIGHT_ALT - LEFT_CONTROL)
+
+ENTER = 0x28
+ESCAPE = 0x29
+BACKSPACE = 0x2A
+TAB = 0x2B
+SPACE = 0x2C
+
+KEY_TOKENS = {
+    "ctrl": LEFT_CONTROL,
+    "control": LEFT_CONTROL,
+    "shift": LEFT_SHIFT,
+    "alt": LEFT_ALT,
+    "windows": LEFT_GUI,
+    "win": LEFT_GUI,
+    "right_ctrl": RIGHT_CONTROL,
+    "right_shift": RIGHT_SHIFT,
+    "right_alt": RIGHT_ALT,
+    "altgr": RIGHT_ALT,
+    "right_windows": RIGHT_GUI,
+    "enter": ENTER,
+    "esc": ESCAPE,
+    "escape": ESCAPE,
+    "backspace": BACKSPACE,
+    "tab": TAB,
+    "space": SPACE,
+    "spacebar": SPACE,
+    "minus": 0x2D,
+    "equal": 0x2E,
+    "equals": 0x2E,
+    "left_bracket": 0x2F,
+    "right_bracket": 0x30,
+    "backslash": 0x31,
+    "semicolon": 0x33,
+    "quote": 0x34,
+    "grave": 0x35,
+    "comma": 0x36,
+    "period": 0x37,
+    "slash": 0x38,
+    "caps_lock": 0x39,
+    "print_screen": 0x46,
+    "scroll_lock": 0x47,
+    "pause": 0x48,
+    "insert": 0x49,
+    "home": 0x4A,
+    "pageup": 0x4B,
+    "page_up": 0x4B,
+    "delete": 0x4C,
+    "end": 0x4D,
+    "pagedown": 0x4E,
+    "page_down": 0x4E,
+    "right": 0x4F,
+    "left": 0x50,
+    "down": 0x51,
+    "up": 0x52,
+    "menu": 0x65,
+    "application": 0x65,
+}
+
+MEDIA_TOKENS = {
+    "media_volume_up": 0xE9,
+    "media_volume_down": 0xEA,
+    "media_mute": 0xE2,
+    "media_play_pause": 0xCD,
+    "media_next": 0xB5,
+    "media_previous": 0xB6,
+    "media_stop": 0xB7,
+}
+
+def normalize_token(token):
+    return str(token).strip().lower().replace("-", "_").replace(" ", "_")
+
+
+def keycode_for(token):
+    """Return the keyboard usage for a config token, or None if unknown."""
+    token = normalize_token(token)
+    usage = KEY_TOKENS.get(token)
+    if usage is not None:
+        return usage
+    if len(token) == 1:
+        if "a" <= token <= "z":
+            return 0x04 + ord(token) - ord("a")
+        if "1" <= token <= "9":
+            return 0x1E + ord(token) - ord("1")
+        if token == "0":
+            return 0x27
+    if token.startswith("f") and token[1:].isdigit():
+        number = int(token[1:])
+        if 1 <= number <= 12:
+            return 0x3A + number - 1
+        if 13 <= number <= 24:
+            return 0x68 + number - 13
+    return None
+
+
+def media_code_for(token):
+    """Return the consumer-control usage for a media token, or None."""
+    return MEDIA_TOKENS.get(normalize_token(token))
+
+
+def modifier_bit(usage):
+    """Report modifier bit for a modifier usage, 0 for ordinary keys."""
+    if LEFT_CONTROL <= usage <= RIGHT_GUI:
+        return 1 << (usage - LEFT_CONTROL)
+    return 0
+
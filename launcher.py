@@ -0,0 +1,96 @@
+"""Software launch from the Windows search box or Run dialog, stepped from the main loop.
+
+`Launcher.start()` taps the opening shortcut and returns. `tick()`, called
+every loop pass, moves to the next step once its wait is over: the dialog
+opening, the host agent's READY for it (or a fixed wait when no agent is
+listening), typing the name, the search results settling, and Enter. The
+matrix, the encoders and the host link keep running meanwhile, and
+`cancel()` lets go of any key held.
+
+The READY frame reaches `handle_ready()` through `host_link.poll()`.
+"""
+from adafruit_hid.keycode import Keycode
+
+from ticks import ticks_add, ticks_less, ticks_ms
+
+_IDLE = 0
+_OPENING = 1
+_WAIT_READY = 2
+_SETTLING = 3
+
+
+class Launcher:
+    def __init__(self, keyboard, host_link, type_text):
+        self.keyboard = keyboard
+        self.host_link = host_link
+        # Types a string at once, without pacing (keyout.type_burst).
+        self.type_text = type_text
+        self.step = _IDLE
+        self.due = 0
+
+    @property
+    def running(self):
+        return self.step != _IDLE
+
+    def start(self, text, method, timing):
+        """Open the search box (method "search") or Run dialog ("run") and launch `text`.
+
+        `timing` is a LAUNCH_PRESETS entry in seconds: "open" after the
+        shortcut, "ready" as the longest wait for the dialog, "settle" between
+        typing and Enter in the search box.
+        """
+        self.cancel()
+        self.text = text
+        self.method = method
+        self.ready_ms = int(timing["ready"] * 1000)
+        self.settle_ms = int(timing["settle"] * 1000)
+        if method == "run":
+            self.keyboard.press(Keycode.WINDOWS, Keycode.R)
+            self.keyboard.release_all()
+        else:
+            # The Windows key is held for the whole "open" time.
+            self.keyboard.press(Keycode.WINDOWS)
+        self.step = _OPENING
+        self.due = ticks_add(ticks_ms(), int(timing["open"] * 1000))
+
+    def cancel(self):
+        if self.step == _IDLE:
+            return
+        print(f"[LAUNCH] Cancelled: {self.text}")
+        self.keyboard.release_all()
+        self.step = _IDLE
+
+    def handle_ready(self, payload):
+        """READY frame from the host agent: the dialog named in `payload` is open."""
+        if self.step == _WAIT_READY and payload.decode() == self.method:
+            self._type()
+
+    def tick(self):
+        if self.step == _IDLE or ticks_less(ticks_ms(), self.due):
+            return
+        if self.step == _OPENING:
+            if self.method != "run":
+                self.keyboard.release(Keycode.WINDOWS)
+            self.asked_host = self.host_link.send("WAIT", self.method)
+            self.step = _WAIT_READY
+            self.due = ticks_add(ticks_ms(), self.ready_ms)
+        elif self.step == _WAIT_READY:
+            if self.asked_host:
+                print(f"[LAUNCH] No host READY for {self.method} within {self.ready_ms} ms")
+            self._type()
+        elif self.step == _SETTLING:
+            self._enter()
+
+    def _type(self):
+        self.type_text(self.text)
+        if self.method == "run":
+            # The Run dialog needs no search results to settle.
+            self._enter()
+            return
+        self.step = _SETTLING
+        self.due = ticks_add(ticks_ms(), self.settle_ms)
+
+    def _enter(self):
+        self.keyboard.press(Keycode.ENTER)
+        self.keyboard.release(Keycode.ENTER)
+        self.step = _IDLE
@@ -0,0 +1,178 @@
+"""Host keyboard layout tables for text typing.
+
+Each layout lists, for every key position, the character it produces plain,
+with Shift and with AltGr. `get_layout()` compiles one of them on first use
+into two 128-byte arrays (ASCII char -> key usage, char -> modifier bits) plus
+a small dict for the non-ASCII characters the layout can type directly, so a
+lookup costs one index regardless of layout.
+
+Characters the layout cannot type are sent with the host's Unicode entry
+method when `unicode_input` is configured:
+
+    "linux"    Ctrl+Shift+U, hex digits, Space (GTK/IBus)
+    "macos"    hex digits while holding Option ("Unicode Hex Input" source)
+    "windows"  Alt held, keypad +, hex digits (needs EnableHexNumpad in the registry)
+"""
+from keytokens import LEFT_ALT, LEFT_CONTROL, LEFT_SHIFT, MOD_ALTGR, MOD_SHIFT, SPACE, modifier_bit
+
+# Set in a modifier byte for dead keys: tap the key, then Space, to get the
+# character itself. Right GUI is never part of a printable character.
+DEAD_KEY = 0x80
+
+# Key usages in table order: letters, digits, Enter/Esc/Backspace/Tab/Space,
+# - = [ ] \ #(non-US) ; ' ` , . / and the ISO key next to left Shift.
+_USAGES = bytes(range(0x04, 0x39)) + b"\x64"
+_CONTROLS = "\n\x1b\b\t "
+_NO_CONTROLS = "\0" * len(_CONTROLS)
+
+# name: (plain, shift, altgr, dead keys per layer). "\0" marks "nothing".
+_LAYOUT_SOURCES = {
+    "us": (
+        "abcdefghijklmnopqrstuvwxyz" "1234567890" + _CONTROLS + "-=[]\\\0;'`,./\0",
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZ" "!@#$%^&*()" + _NO_CONTROLS + "_+{}|\0:\"~<>?\0",
+        "",
+        ("", "", ""),
+    ),
+    "uk": (
+        "abcdefghijklmnopqrstuvwxyz" "1234567890" + _CONTROLS + "-=[]\0#;'`,./\\",
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZ" "!\"£$%^&*()" + _NO_CONTROLS + "_+{}\0~:@¬<>?|",
+        "\0\0\0\0é\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0" "\0\0\0€\0\0\0\0\0\0"
+        + _NO_CONTROLS + "\0\0\0\0\0\0\0\0¦\0\0\0\0",
+        ("", "", ""),
+    ),
+    "de": (
+        "abcdefghijklmnopqrstuvwxzy" "1234567890" + _CONTROLS + "ß´ü+\0#öä^,.-<",
+        "ABCDEFGHIJKLMNOPQRSTUVWXZY" "!\"§$%&/()=" + _NO_CONTROLS + "?`Ü*\0'ÖÄ°;:_>",
+        "\0\0\0\0€\0\0\0\0\0\0\0µ\0\0\0@\0\0\0\0\0\0\0\0\0" "\0²³\0\0\0{[]}"
+        + _NO_CONTROLS + "\\\0\0~\0\0\0\0\0\0\0\0|",
+        ("´^", "`", ""),
+    ),
+    "fr": (
+        "qbcdefghijkl,noparstuvzxyw" "&é\"'(-è_çà" + _CONTROLS + ")=^$\0*mù²;:!<",
+        "QBCDEFGHIJKL?NOPARSTUVZXYW" "1234567890" + _NO_CONTROLS + "°+¨£\0µM%\0./§>",
+        "\0\0\0\0€\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0" "\0~#{[|`\\^@"
+        + _NO_CONTROLS + "]}\0¤\0\0\0\0\0\0\0\0\0",
+        ("^", "¨", "~`"),
+    ),
+    "es": (
+        "abcdefghijklmnopqrstuvwxyz" "1234567890" + _CONTROLS + "'¡`+\0çñ´º,.-<",
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZ" "!\"·$%&/()=" + _NO_CONTROLS + "?¿^*\0ÇÑ¨ª;:_>",
+        "\0\0\0\0€\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0" "|@#~\0¬\0\0\0\0"
+        + _NO_CONTROLS + "\0\0[]\0}\0{\\\0\0\0\0",
+        ("`´", "^¨", "~"),
+    ),
+}
+
+LAYOUT_NAMES = tuple(_LAYOUT_SOURCES)
+
+UNICODE_INPUT_MODES = ("linux", "macos", "windows")
+
+_KEYPAD_PLUS = 0x57
+# Keypad 1-9 then keypad 0.
+_KEYPAD_DIGITS = b"\x62\x59\x5a\x5b\x5c\x5d\x5e\x5f\x60\x61"
+
+
+class Layout:
+    def __init__(self, name, plain, shifted, altgr, dead):
+        self.name = name
+        self.ascii_usage = bytearray(128)
+        self.ascii_mods = bytearray(128)
+        self.extra = {}
+        # Later layers only fill gaps, except that a live key beats a dead one.
+        for layer, mods, dead_keys in zip((plain, shifted, altgr), (0, MOD_SHIFT, MOD_ALTGR), dead):
+            for position, char in enumerate(layer):
+                if char != "\0":
+                    self._add(char, _USAGES[position], mods | (DEAD_KEY if char in dead_keys else 0))
+
+    def _add(self, char, usage, mods):
+        current = self.lookup(char)
+        if current is not None and not current[1] & DEAD_KEY:
+            return
+        code = ord(char)
+        if code < 128:
+            self.ascii_usage[code] = usage
+            self.ascii_mods[code] = mods
+        else:
+            self.extra[char] = (usage, mods)
+
+    def lookup(self, char):
+        """Return (usage, modifier bits) for `char`, or None.
+
+        The modifier bits include DEAD_KEY when Space must follow.
+        """
+        code = ord(char)
+        if code < 128:
+            usage = self.ascii_usage[code]
+            return (usage, self.ascii_mods[code]) if usage else None
+        return self.extra.get(char)
+
+    def keystrokes(self, char, unicode_mode=None):
+        """Return the (modifier bits, usage) strokes that type `char`, or None.
+
+        After each stroke the key is released while the next stroke's
+        modifiers are already held; after the last one everything is released.
+        """
+        key = self.lookup(char)
+        if key is not None:
+            usage, mods = key
+            if mods & DEAD_KEY:
+                return ((mods & ~DEAD_KEY, usage), (0, SPACE))
+            return ((mods, usage),)
+        return unicode_keystrokes(ord(char), unicode_mode, self)
+
+
+_layouts = {}
+
+
+def get_layout(name="us"):
+    """Return the compiled layout `name`; unknown names fall back to US."""
+    name = str(name).lower()
+    if name not in _LAYOUT_SOURCES:
+        print(f"[LAYOUT] Unknown layout {name}, using us")
+        name = "us"
+    layout = _layouts.get(name)
+    if layout is None:
+        layout = _layouts[name] = Layout(name, *_LAYOUT_SOURCES[name])
+    return layout
+
+
+def _hex_keystrokes(code, layout, held, keypad):
+    strokes = []
+    for digit in f"{code:04x}":
+        if keypad and digit <= "9":
+            strokes.append((held, _KEYPAD_DIGITS[ord(digit) - ord("0")]))
+        else:
+            usage, mods = layout.lookup(digit)
+            strokes.append((held | (mods & ~DEAD_KEY), usage))
+    return strokes
+
+
+def unicode_keystrokes(code, mode, layout):
+    """Keystrokes entering code point `code` with the host method `mode`.
+
+    Hex digits are typed through `layout`, so the sequence works on any of
+    the layout tables. Returns None when `mode` is not set.
+    """
+    if mode == "linux":
+        control_shift = modifier_bit(LEFT_CONTROL) | modifier_bit(LEFT_SHIFT)
+        strokes = [(control_shift, layout.lookup("u")[0])]
+        strokes.extend(_hex_keystrokes(code, layout, 0, False))
+        strokes.append((0, SPACE))
+        return tuple(strokes)
+    if mode == "macos":
+        # Option-hex takes UTF-16 code units; astral characters need a surrogate pair.
+        if code > 0xFFFF:
+            code -= 0x10000
+            units = (0xD800 | (code >> 10), 0xDC00 | (code & 0x3FF))
+        else:
+            units = (code,)
+        strokes = []
+        for unit in units:
+            strokes.extend(_hex_keystrokes(unit, layout, modifier_bit(LEFT_ALT), False))
+        return tuple(strokes)
+    if mode == "windows":
+        alt = modifier_bit(LEFT_ALT)
+        strokes = [(alt, _KEYPAD_PLUS)]
+        strokes.extend(_hex_keystrokes(code, layout, alt, True))
+        return tuple(strokes)
+    return None
@@ -176,6 +176,7 @@ MP_DEFINE_CONST_OBJ_TYPE(
 #include <stdint.h>
 
 #include "shared/runtime/context_manager_helpers.h"
+#include "py/binary.h"
 #include "py/objproperty.h"
 #include "py/runtime.h"
 #include "py/runtime0.h"
@@ -235,6 +236,7 @@ static mp_obj_t rotaryio2_incrementalencoder2_make_new(const mp_obj_type_t *type
     common_hal_rotaryio2_incrementalencoder2_construct(self, pin_a, pin_b);
     common_hal_rotaryio2_incrementalencoder2_set_divisor(self, args[ARG_divisor].u_int);
     common_hal_rotaryio2_incrementalencoder2_set_counts_per_revolution(self, args[ARG_counts_per_revolution].u_int);
+    shared_module_rotaryio2_incrementalencoder2_reset_motion(self);
 
     return MP_OBJ_FROM_PTR(self);
 }
@@ -288,6 +290,132 @@ MP_PROPERTY_GETSET(rotaryio2_incrementalencoder2_counts_per_revolution_obj,
     (mp_obj_t)&rotaryio2_incrementalencoder2_get_counts_per_revolution_obj,
     (mp_obj_t)&rotaryio2_incrementalencoder2_set_counts_per_revolution_obj);
 
+//|     velocity: int
+//|     """Smoothed rotation speed in detents per second, measured in the quadrature interrupt.
+//|     Drops back to 0 when the encoder has been still for longer than the reset window."""
+static mp_obj_t rotaryio2_incrementalencoder2_obj_get_velocity(mp_obj_t self_in) {
+    rotaryio_incrementalencoder_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    check_for_deinit(self);
+
+    return mp_obj_new_int(common_hal_rotaryio2_incrementalencoder2_get_velocity(self));
+}
+MP_DEFINE_CONST_FUN_OBJ_1(rotaryio2_incrementalencoder2_get_velocity_obj, rotaryio2_incrementalencoder2_obj_get_velocity);
+
+MP_PROPERTY_GETTER(rotaryio2_incrementalencoder2_velocity_obj,
+    (mp_obj_t)&rotaryio2_incrementalencoder2_get_velocity_obj);
+
+//|     acceleration: Tuple[Tuple[int, int], ...]
+//|     """Acceleration curve as ``(velocity, multiplier)`` pairs sorted by velocity. Each detent
+//|     turned at or above ``velocity`` detents per second counts as ``multiplier`` steps.
+//|     At most 4 points; an empty tuple means one step per detent."""
+static mp_obj_t rotaryio2_incrementalencoder2_obj_get_acceleration(mp_obj_t self_in) {
+    rotaryio_incrementalencoder_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    check_for_deinit(self);
+
+    uint16_t thresholds[ROTARYIO2_MAX_CURVE_POINTS];
+    uint8_t multipliers[ROTARYIO2_MAX_CURVE_POINTS];
+    size_t len = common_hal_rotaryio2_incrementalencoder2_get_acceleration(self, thresholds, multipliers);
+    mp_obj_t points[ROTARYIO2_MAX_CURVE_POINTS];
+    for (size_t i = 0; i < len; i++) {
+        mp_obj_t point[2] = {
+            MP_OBJ_NEW_SMALL_INT(thresholds[i]),
+            MP_OBJ_NEW_SMALL_INT(multipliers[i]),
+        };
+        points[i] = mp_obj_new_tuple(2, point);
+    }
+    return mp_obj_new_tuple(len, points);
+}
+MP_DEFINE_CONST_FUN_OBJ_1(rotaryio2_incrementalencoder2_get_acceleration_obj, rotaryio2_incrementalencoder2_obj_get_acceleration);
+
+static mp_obj_t rotaryio2_incrementalencoder2_obj_set_acceleration(mp_obj_t self_in, mp_obj_t curve_in) {
+    rotaryio_incrementalencoder_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    check_for_deinit(self);
+
+    size_t len;
+    mp_obj_t *points;
+    mp_obj_get_array(curve_in, &len, &points);
+    mp_arg_validate_length_max(len, ROTARYIO2_MAX_CURVE_POINTS, MP_QSTR_acceleration);
+
+    uint16_t thresholds[ROTARYIO2_MAX_CURVE_POINTS];
+    uint8_t multipliers[ROTARYIO2_MAX_CURVE_POINTS];
+    for (size_t i = 0; i < len; i++) {
+        mp_obj_t *point;
+        mp_obj_get_array_fixed_n(points[i], 2, &point);
+        thresholds[i] = mp_arg_validate_int_range(mp_obj_get_int(point[0]), 0, 0xFFFF, MP_QSTR_velocity);
+        multipliers[i] = mp_arg_validate_int_range(mp_obj_get_int(point[1]), 1, 0xFF, MP_QSTR_multiplier);
+        if (i > 0 && thresholds[i] <= thresholds[i - 1]) {
+            mp_raise_ValueError(MP_ERROR_TEXT("acceleration must be sorted by velocity"));
+        }
+    }
+    common_hal_rotaryio2_incrementalencoder2_set_acceleration(self, thresholds, multipliers, len);
+    return mp_const_none;
+}
+MP_DEFINE_CONST_FUN_OBJ_2(rotaryio2_incrementalencoder2_set_acceleration_obj, rotaryio2_incrementalencoder2_obj_set_acceleration);
+
+MP_PROPERTY_GETSET(rotaryio2_incrementalencoder2_acceleration_obj,
+    (mp_obj_t)&rotaryio2_incrementalencoder2_get_acceleration_obj,
+    (mp_obj_t)&rotaryio2_incrementalencoder2_set_acceleration_obj);
+
+//|     def take_delta(self) -> Tuple[int, int, int, int]:
+//|         """Return and clear the movement since the last call as ``(steps, detents, timestamp, position)``.
+//|         ``steps`` is the signed detent count scaled by the acceleration curve, ``detents`` the raw
+//|         signed detent count, ``timestamp`` the `supervisor.ticks_ms` value of the last detent and
+//|         ``position`` the position at the same instant, read together with the detents.
+//|         With no detent pending, ``steps``, ``detents`` and ``timestamp`` are 0."""
+//|         ...
+//|
+static mp_obj_t rotaryio2_incrementalencoder2_take_delta(mp_obj_t self_in) {
+    rotaryio_incrementalencoder_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    check_for_deinit(self);
+
+    mp_int_t steps = 0;
+    mp_int_t delta;
+    uint32_t timestamp = 0;
+    mp_int_t position;
+    common_hal_rotaryio2_incrementalencoder2_take_delta(self, &steps, &delta, &timestamp, &position);
+    mp_obj_t items[4] = {
+        mp_obj_new_int(steps),
+        mp_obj_new_int(delta),
+        mp_obj_new_int_from_uint(timestamp),
+        mp_obj_new_int(position),
+    };
+    return mp_obj_new_tuple(4, items);
+}
+static MP_DEFINE_CONST_FUN_OBJ_1(rotaryio2_incrementalencoder2_take_delta_obj, rotaryio2_incrementalencoder2_take_delta);
+
+//|     def take_delta_into(self, buffer: WriteableBuffer) -> int:
+//|         """Like `take_delta`, without allocating: return the signed detent count and write
+//|         ``position`` to ``buffer[3]``. When the count is not 0, ``buffer[0]``, ``buffer[1]`` and
+//|         ``buffer[2]`` also receive ``steps``, ``detents`` and ``timestamp``. ``buffer`` holds at
+//|         least four 32-bit integers, e.g. ``array.array("i", [0] * 4)``."""
+//|         ...
+//|
+static mp_obj_t rotaryio2_incrementalencoder2_take_delta_into(mp_obj_t self_in, mp_obj_t buffer_in) {
+    rotaryio_incrementalencoder_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    check_for_deinit(self);
+
+    mp_buffer_info_t bufinfo;
+    mp_get_buffer_raise(buffer_in, &bufinfo, MP_BUFFER_WRITE);
+    if (mp_binary_get_size('@', bufinfo.typecode, NULL) != sizeof(int32_t) || bufinfo.len < 4 * sizeof(int32_t)) {
+        mp_raise_ValueError(MP_ERROR_TEXT("buffer must hold 4 32-bit integers"));
+    }
+    int32_t *values = bufinfo.buf;
+
+    mp_int_t steps = 0;
+    mp_int_t delta;
+    uint32_t timestamp = 0;
+    mp_int_t position;
+    common_hal_rotaryio2_incrementalencoder2_take_delta(self, &steps, &delta, &timestamp, &position);
+    values[3] = position;
+    if (delta != 0) {
+        values[0] = steps;
+        values[1] = delta;
+        values[2] = timestamp;
+    }
+    return MP_OBJ_NEW_SMALL_INT(delta);
+}
+static MP_DEFINE_CONST_FUN_OBJ_2(rotaryio2_incrementalencoder2_take_delta_into_obj, rotaryio2_incrementalencoder2_take_delta_into);
+
 static const mp_rom_map_elem_t rotaryio2_incrementalencoder2_locals_dict_table[] = {
     // Methods
     { MP_ROM_QSTR(MP_QSTR_deinit), MP_ROM_PTR(&rotaryio_incrementalencoder_deinit_obj) },
@@ -300,6 +428,10 @@ static const mp_rom_map_elem_t rotaryio2_incrementalencoder2_locals_dict_table[]
     { MP_ROM_QSTR(MP_QSTR_direction), MP_ROM_PTR(&rotaryio2_incrementalencoder2_direction_obj) },
     { MP_ROM_QSTR(MP_QSTR_revolutions), MP_ROM_PTR(&rotaryio2_incrementalencoder2_revolutions_obj) },
     { MP_ROM_QSTR(MP_QSTR_counts_per_revolution), MP_ROM_PTR(&rotaryio2_incrementalencoder2_counts_per_revolution_obj) },
+    { MP_ROM_QSTR(MP_QSTR_velocity), MP_ROM_PTR(&rotaryio2_incrementalencoder2_velocity_obj) },
+    { MP_ROM_QSTR(MP_QSTR_acceleration), MP_ROM_PTR(&rotaryio2_incrementalencoder2_acceleration_obj) },
+    { MP_ROM_QSTR(MP_QSTR_take_delta), MP_ROM_PTR(&rotaryio2_incrementalencoder2_take_delta_obj) },
+    { MP_ROM_QSTR(MP_QSTR_take_delta_into), MP_ROM_PTR(&rotaryio2_incrementalencoder2_take_delta_into_obj) },
 };
 static MP_DEFINE_CONST_DICT(rotaryio2_incrementalencoder2_locals_dict, rotaryio2_incrementalencoder2_locals_dict_table);
 
@@ -27,3 +27,21 @@ extern mp_int_t common_hal_rotaryio2_incrementalencoder2_get_revolutions(rotaryi
 extern void common_hal_rotaryio2_incrementalencoder2_set_counts_per_revolution(rotaryio_incrementalencoder_obj_t *self,
     mp_int_t counts_per_rev);
 extern mp_int_t common_hal_rotaryio2_incrementalencoder2_get_counts_per_revolution(rotaryio_incrementalencoder_obj_t *self);
+// Velocity and acceleration
+extern mp_int_t common_hal_rotaryio2_incrementalencoder2_get_velocity(rotaryio_incrementalencoder_obj_t *self);
+extern void common_hal_rotaryio2_incrementalencoder2_take_delta(rotaryio_incrementalencoder_obj_t *self,
+    mp_int_t *steps, mp_int_t *delta, uint32_t *timestamp, mp_int_t *position);
+extern size_t common_hal_rotaryio2_incrementalencoder2_get_acceleration(rotaryio_incrementalencoder_obj_t *self,
+    uint16_t *thresholds, uint8_t *multipliers);
+extern void common_hal_rotaryio2_incrementalencoder2_set_acceleration(rotaryio_incrementalencoder_obj_t *self,
+    const uint16_t *thresholds, const uint8_t *multipliers, size_t len);
+extern void shared_module_rotaryio2_incrementalencoder2_reset_motion(rotaryio_incrementalencoder_obj_t *self);
+// Quadrature decoding shared by the ports: init with the pin state at rest,
+// then update from the port's interrupt with every new pin state.
+extern void shared_module_rotaryio2_incrementalencoder2_state_init(rotaryio_incrementalencoder_obj_t *self,
+    uint8_t quiescent_state);
+extern void shared_module_rotaryio2_incrementalencoder2_state_update(rotaryio_incrementalencoder_obj_t *self,
+    uint8_t new_state);
+// Called from state_update() in the quadrature interrupt whenever the position moves by whole detents.
+extern void common_hal_rotaryio2_incrementalencoder2_record_detents(rotaryio_incrementalencoder_obj_t *self,
+    mp_int_t detents);
@@ -19,8 +19,8 @@
 //| `Wikipedia's Rotary Encoder page <https://en.wikipedia.org/wiki/Rotary_encoder>`_ for more
 //| background.
 //|
-//| This module extends the standard rotaryio with additional features like direction detection
-//| and revolution counting.
+//| This module extends the standard rotaryio with additional features like direction detection,
+//| revolution counting and acceleration-aware velocity reporting.
 //|
 //| All classes change hardware state and should be deinitialized when they
 //| are no longer needed if the program continues after use. To do so, either
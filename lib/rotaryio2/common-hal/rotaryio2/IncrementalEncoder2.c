@@ -0,0 +1,157 @@
+// This file is part of the CircuitPython project: https://circuitpython.org
+//
+// SPDX-FileCopyrightText: Copyright (c) 2024 for CircuitPython Contributors
+//
+// SPDX-License-Identifier: MIT
+
+// RP2040 port of IncrementalEncoder2: a PIO program pushes every change of
+// the two pins, and the RX FIFO interrupt feeds it to the shared quadrature
+// decoder, which records detents for velocity and acceleration.
+
+#include <stdint.h>
+
+#include "bindings/rp2pio/StateMachine.h"
+#include "common-hal/microcontroller/__init__.h"
+#include "py/runtime.h"
+#include "shared-bindings/rotaryio2/IncrementalEncoder2.h"
+
+#include "hardware/pio.h"
+
+static const uint16_t encoder[] = {
+    // again:
+    //      in pins, 2
+    0x4002,
+    //      mov x, isr
+    0xa026,
+    //      jmp x!=y, push_data
+    0x00a5,
+    //      mov isr, null
+    0xa0c3,
+    //      jmp again
+    0x0000,
+    // push_data:
+    //      push
+    0x8000,
+    //      mov y, x
+    0xa041,
+};
+
+static const uint16_t encoder_init[] = {
+    //      set y, 31
+    0xe05f,
+};
+
+static void incrementalencoder2_interrupt_handler(void *self_in);
+
+void common_hal_rotaryio2_incrementalencoder2_construct(rotaryio_incrementalencoder_obj_t *self,
+    const mcu_pin_obj_t *pin_a, const mcu_pin_obj_t *pin_b) {
+    const mcu_pin_obj_t *pins[] = { pin_a, pin_b };
+    // Start out with swapped to match behavior with other ports.
+    self->swapped = true;
+    if (!common_hal_rp2pio_pins_are_sequential(2, pins)) {
+        pins[0] = pin_b;
+        pins[1] = pin_a;
+        self->swapped = false;
+        if (!common_hal_rp2pio_pins_are_sequential(2, pins)) {
+            mp_raise_RuntimeError(MP_ERROR_TEXT("Pins must be sequential GPIO pins"));
+        }
+    }
+    self->pin_a = pin_a;
+    self->pin_b = pin_b;
+
+    // Use the internal pull-up resistors on the input pins
+    common_hal_rp2pio_statemachine_construct(&self->state_machine,
+        encoder, MP_ARRAY_SIZE(encoder),
+        1000000,
+        encoder_init, MP_ARRAY_SIZE(encoder_init), // init
+        NULL, 0, // may_exec
+        NULL, 0, PIO_PINMASK32_NONE, PIO_PINMASK32_NONE, // out pin
+        pins[0], 2, // in pins
+        PIO_PINMASK32_FROM_VALUE(3), PIO_PINMASK32_FROM_VALUE(3), // in pulls
+        NULL, 0, PIO_PINMASK32_NONE, PIO_PINMASK32_NONE, // set pins
+        NULL, 0, PIO_PINMASK32_NONE, PIO_PINMASK32_NONE, // sideset pins
+        PIO_PINMASK32_NONE, // wait gpio pins
+        true, // exclusive pin use
+        false, 32, false, // out settings
+        false, // Wait for txstall
+        false, 32, false, // in settings
+        false, // Not user-interruptible.
+        0, -1, // wrap settings
+        PIO_ANY_OFFSET,
+        PIO_FIFO_TYPE_DEFAULT,
+        PIO_MOV_STATUS_DEFAULT, PIO_MOV_N_DEFAULT
+        );
+
+    // We're guaranteed by the init code that some output will be available promptly
+    uint8_t quiescent_state;
+    common_hal_rp2pio_statemachine_readinto(&self->state_machine, &quiescent_state, 1, 1, false);
+
+    shared_module_rotaryio2_incrementalencoder2_state_init(self, quiescent_state & 3);
+    common_hal_rp2pio_statemachine_set_interrupt_handler(&self->state_machine,
+        incrementalencoder2_interrupt_handler, self, PIO_IRQ0_INTE_SM0_RXNEMPTY_BITS);
+}
+
+bool common_hal_rotaryio2_incrementalencoder2_deinited(rotaryio_incrementalencoder_obj_t *self) {
+    return common_hal_rp2pio_statemachine_deinited(&self->state_machine);
+}
+
+void common_hal_rotaryio2_incrementalencoder2_deinit(rotaryio_incrementalencoder_obj_t *self) {
+    if (common_hal_rotaryio2_incrementalencoder2_deinited(self)) {
+        return;
+    }
+    common_hal_rp2pio_statemachine_set_interrupt_handler(&self->state_machine, NULL, NULL, 0);
+    common_hal_rp2pio_statemachine_deinit(&self->state_machine);
+}
+
+mp_int_t common_hal_rotaryio2_incrementalencoder2_get_position(rotaryio_incrementalencoder_obj_t *self) {
+    return self->position;
+}
+
+void common_hal_rotaryio2_incrementalencoder2_set_position(rotaryio_incrementalencoder_obj_t *self,
+    mp_int_t new_position) {
+    common_hal_mcu_disable_interrupts();
+    self->position = new_position;
+    self->sub_count = 0;
+    common_hal_mcu_enable_interrupts();
+}
+
+mp_int_t common_hal_rotaryio2_incrementalencoder2_get_divisor(rotaryio_incrementalencoder_obj_t *self) {
+    return self->divisor;
+}
+
+void common_hal_rotaryio2_incrementalencoder2_set_divisor(rotaryio_incrementalencoder_obj_t *self,
+    mp_int_t new_divisor) {
+    self->divisor = new_divisor;
+}
+
+mp_int_t common_hal_rotaryio2_incrementalencoder2_get_direction(rotaryio_incrementalencoder_obj_t *self) {
+    return self->direction;
+}
+
+mp_int_t common_hal_rotaryio2_incrementalencoder2_get_revolutions(rotaryio_incrementalencoder_obj_t *self) {
+    return self->revolutions;
+}
+
+void common_hal_rotaryio2_incrementalencoder2_set_counts_per_revolution(rotaryio_incrementalencoder_obj_t *self,
+    mp_int_t counts_per_rev) {
+    self->counts_per_revolution = counts_per_rev;
+}
+
+mp_int_t common_hal_rotaryio2_incrementalencoder2_get_counts_per_revolution(rotaryio_incrementalencoder_obj_t *self) {
+    return self->counts_per_revolution;
+}
+
+static void incrementalencoder2_interrupt_handler(void *self_in) {
+    rotaryio_incrementalencoder_obj_t *self = self_in;
+
+    while (common_hal_rp2pio_statemachine_get_in_waiting(&self->state_machine)) {
+        // Bypass all the logic of StateMachine.c:_transfer as we need this to
+        // be fast and every byte is only one bit
+        uint8_t new = (*(uint8_t *)&self->state_machine.pio->rxf[self->state_machine.state_machine]) & 3;
+        if (self->swapped) {
+            new = ((new & 1) << 1) | (new >> 1);
+        }
+        // Decodes the quadrature state and calls record_detents() on every whole detent.
+        shared_module_rotaryio2_incrementalencoder2_state_update(self, new);
+    }
+}
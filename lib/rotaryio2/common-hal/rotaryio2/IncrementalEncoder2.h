@@ -8,18 +8,38 @@
 
 #include "py/obj.h"
 #include "common-hal/microcontroller/Pin.h"
+#include "common-hal/rp2pio/StateMachine.h"
+
+// Maximum number of (velocity threshold, multiplier) points in the acceleration curve.
+#define ROTARYIO2_MAX_CURVE_POINTS (4)
 
 typedef struct {
     mp_obj_base_t base;
+    rp2pio_statemachine_obj_t state_machine;
     const mcu_pin_obj_t *pin_a;
     const mcu_pin_obj_t *pin_b;
     mp_int_t position;
     mp_int_t divisor;
     bool first_read;
-    
+    // Pins were swapped to make them sequential for the PIO program.
+    bool swapped;
+    // Last quadrature state (B << 1 | A) and quarter steps since the last detent.
+    uint8_t state;
+    int8_t sub_count;
+
     // New fields for enhanced functionality
     mp_int_t last_position;
     mp_int_t direction;
     mp_int_t counts_per_revolution;
     mp_int_t revolutions;
+
+    // Velocity tracking and acceleration, updated from the quadrature interrupt
+    uint32_t last_detent_ms;
+    mp_int_t velocity;
+    mp_int_t pending_delta;
+    mp_int_t pending_steps;
+    uint16_t velocity_reset_ms;
+    uint8_t curve_len;
+    uint16_t curve_threshold[ROTARYIO2_MAX_CURVE_POINTS];
+    uint8_t curve_multiplier[ROTARYIO2_MAX_CURVE_POINTS];
 } rotaryio_incrementalencoder_obj_t;
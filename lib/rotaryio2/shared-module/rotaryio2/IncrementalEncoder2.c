@@ -0,0 +1,170 @@
+// This file is part of the CircuitPython project: https://circuitpython.org
+//
+// SPDX-FileCopyrightText: Copyright (c) 2024 for CircuitPython Contributors
+//
+// SPDX-License-Identifier: MIT
+
+// Port-independent quadrature decoding, velocity tracking and acceleration for
+// IncrementalEncoder2. The port's quadrature interrupt passes every new pin
+// state to state_update(), which calls record_detents() for each whole detent;
+// Python only ever collects the already-scaled result through take_delta().
+
+#include <string.h>
+
+#include "shared-bindings/microcontroller/__init__.h"
+#include "shared-bindings/rotaryio2/IncrementalEncoder2.h"
+#include "supervisor/shared/tick.h"
+
+#define ROTARYIO2_VELOCITY_RESET_MS (250)
+// supervisor.ticks_ms() starts 0x1fff0000 ms ahead of the tick counter and
+// wraps at 2**29 (shared-bindings/supervisor/__init__.c).
+#define ROTARYIO2_TICKS_OFFSET (0x1fff0000)
+#define ROTARYIO2_TICKS_MASK ((1 << 29) - 1)
+
+// Velocity is measured on the raw 32-bit tick counter; timestamps handed to
+// Python use the supervisor.ticks_ms() domain, like keypad events.
+static uint32_t python_ticks_ms(uint32_t ticks_ms32) {
+    return (ticks_ms32 + ROTARYIO2_TICKS_OFFSET) & ROTARYIO2_TICKS_MASK;
+}
+
+void shared_module_rotaryio2_incrementalencoder2_reset_motion(rotaryio_incrementalencoder_obj_t *self) {
+    self->last_detent_ms = supervisor_ticks_ms32();
+    self->velocity = 0;
+    self->pending_delta = 0;
+    self->pending_steps = 0;
+    self->velocity_reset_ms = ROTARYIO2_VELOCITY_RESET_MS;
+    self->curve_len = 0;
+}
+
+static mp_int_t multiplier_for_velocity(const rotaryio_incrementalencoder_obj_t *self, mp_int_t velocity) {
+    mp_int_t multiplier = 1;
+    for (size_t i = 0; i < self->curve_len; i++) {
+        if (velocity < self->curve_threshold[i]) {
+            break;
+        }
+        multiplier = self->curve_multiplier[i];
+    }
+    return multiplier;
+}
+
+void common_hal_rotaryio2_incrementalencoder2_record_detents(rotaryio_incrementalencoder_obj_t *self,
+    mp_int_t detents) {
+    if (detents == 0) {
+        return;
+    }
+    uint32_t now = supervisor_ticks_ms32();
+    uint32_t elapsed = now - self->last_detent_ms;
+    mp_int_t count = detents < 0 ? -detents : detents;
+
+    if (elapsed >= self->velocity_reset_ms) {
+        // First detent after a pause: always precise.
+        self->velocity = 0;
+    } else {
+        mp_int_t instant = (count * 1000) / (elapsed ? elapsed : 1);
+        // Exponential moving average with alpha = 1/4.
+        self->velocity = self->velocity ? (self->velocity * 3 + instant) / 4 : instant;
+    }
+
+    self->pending_delta += detents;
+    self->pending_steps += detents * multiplier_for_velocity(self, self->velocity);
+    self->last_detent_ms = now;
+}
+
+void shared_module_rotaryio2_incrementalencoder2_state_init(rotaryio_incrementalencoder_obj_t *self,
+    uint8_t quiescent_state) {
+    self->state = quiescent_state & 0x3;
+    self->sub_count = 0;
+    self->position = 0;
+    self->direction = 0;
+    self->revolutions = 0;
+}
+
+#define BAD 7
+// Quarter steps for each (old state << 2 | new state) transition.
+static const int8_t transitions[16] = {
+    0,    // 00 -> 00 no movement
+    -1,   // 00 -> 01 3/4 ccw (11 detent) or 1/4 ccw (00 at detent)
+    +1,   // 00 -> 10 3/4 cw or 1/4 cw
+    BAD,  // 00 -> 11 non-Gray-code transition
+    +1,   // 01 -> 00 2/4 or 4/4 cw
+    0,    // 01 -> 01 no movement
+    BAD,  // 01 -> 10 non-Gray-code transition
+    -1,   // 01 -> 11 4/4 or 2/4 ccw
+    -1,   // 10 -> 00 2/4 or 4/4 ccw
+    BAD,  // 10 -> 01 non-Gray-code transition
+    0,    // 10 -> 10 no movement
+    +1,   // 10 -> 11 4/4 or 2/4 cw
+    BAD,  // 11 -> 00 non-Gray-code transition
+    +1,   // 11 -> 01 1/4 or 3/4 cw
+    -1,   // 11 -> 10 1/4 or 3/4 ccw
+    0,    // 11 -> 11 no movement
+};
+
+void shared_module_rotaryio2_incrementalencoder2_state_update(rotaryio_incrementalencoder_obj_t *self,
+    uint8_t new_state) {
+    new_state &= 0x3;
+    int8_t sub_incr = transitions[(self->state << 2) | new_state];
+    self->state = new_state;
+    if (sub_incr == BAD) {
+        // A skipped state: direction unknown, so count nothing.
+        return;
+    }
+
+    self->sub_count += sub_incr;
+    mp_int_t detents = 0;
+    if (self->sub_count >= self->divisor) {
+        detents = 1;
+    } else if (self->sub_count <= -self->divisor) {
+        detents = -1;
+    } else {
+        return;
+    }
+    self->sub_count = 0;
+    self->position += detents;
+    self->direction = detents;
+    if (self->counts_per_revolution > 0) {
+        self->revolutions = self->position / self->counts_per_revolution;
+    }
+    common_hal_rotaryio2_incrementalencoder2_record_detents(self, detents);
+}
+
+mp_int_t common_hal_rotaryio2_incrementalencoder2_get_velocity(rotaryio_incrementalencoder_obj_t *self) {
+    if (supervisor_ticks_ms32() - self->last_detent_ms >= self->velocity_reset_ms) {
+        return 0;
+    }
+    return self->velocity;
+}
+
+void common_hal_rotaryio2_incrementalencoder2_take_delta(rotaryio_incrementalencoder_obj_t *self,
+    mp_int_t *steps, mp_int_t *delta, uint32_t *timestamp, mp_int_t *position) {
+    common_hal_mcu_disable_interrupts();
+    // Read with the detents, so no interrupt can move one without the other.
+    *position = self->position;
+    *delta = self->pending_delta;
+    if (*delta == 0) {
+        // Nothing pending: *steps and *timestamp are left as they are.
+        common_hal_mcu_enable_interrupts();
+        return;
+    }
+    *steps = self->pending_steps;
+    *timestamp = python_ticks_ms(self->last_detent_ms);
+    self->pending_steps = 0;
+    self->pending_delta = 0;
+    common_hal_mcu_enable_interrupts();
+}
+
+size_t common_hal_rotaryio2_incrementalencoder2_get_acceleration(rotaryio_incrementalencoder_obj_t *self,
+    uint16_t *thresholds, uint8_t *multipliers) {
+    memcpy(thresholds, self->curve_threshold, self->curve_len * sizeof(uint16_t));
+    memcpy(multipliers, self->curve_multiplier, self->curve_len * sizeof(uint8_t));
+    return self->curve_len;
+}
+
+void common_hal_rotaryio2_incrementalencoder2_set_acceleration(rotaryio_incrementalencoder_obj_t *self,
+    const uint16_t *thresholds, const uint8_t *multipliers, size_t len) {
+    common_hal_mcu_disable_interrupts();
+    memcpy(self->curve_threshold, thresholds, len * sizeof(uint16_t));
+    memcpy(self->curve_multiplier, multipliers, len * sizeof(uint8_t));
+    self->curve_len = len;
+    common_hal_mcu_enable_interrupts();
+}
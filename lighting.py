@@ -0,0 +1,159 @@
+"""Frame-budgeted NeoPixel lighting engine for the KMK firmware.
+
+Profile colour themes, per-key reactive flashes and an idle breathing
+animation are composed into one reused GRB byte buffer, using lookup tables
+built once at startup instead of per-pixel HSV math. A frame is computed at
+most `fps` times per second and written to the strip only when it differs
+from the last one pushed, so lighting never takes scan time it does not need.
+"""
+import math
+
+import digitalio
+import neopixel_write
+from kmk.extensions import Extension
+
+from ticks import ticks_ms, ticks_diff
+
+BREATH_STEPS = 64
+
+
+def _build_hue_table():
+    """Full-saturation, full-value RGB for each of 256 hues, packed as RGB triplets."""
+    table = bytearray(256 * 3)
+    for hue in range(256):
+        region = hue * 6 // 256
+        rising = hue * 6 - region * 256
+        falling = 255 - rising
+        r, g, b = (
+            (255, rising, 0),
+            (falling, 255, 0),
+            (0, 255, rising),
+            (0, falling, 255),
+            (rising, 0, 255),
+            (255, 0, falling),
+        )[region]
+        table[hue * 3] = r
+        table[hue * 3 + 1] = g
+        table[hue * 3 + 2] = b
+    return table
+
+
+def _build_breath_table(floor):
+    """One breathing cycle of brightness values between `floor` and 255."""
+    table = bytearray(BREATH_STEPS)
+    for step in range(BREATH_STEPS):
+        wave = (1 - math.cos(2 * math.pi * step / BREATH_STEPS)) / 2
+        table[step] = floor + int((255 - floor) * wave)
+    return table
+
+
+class LightingEngine(Extension):
+    def __init__(
+        self,
+        pixel_pin,
+        num_pixels,
+        profile_hues,
+        key_pixels=None,
+        fps=30,
+        val_limit=64,
+        theme_value=96,
+        reactive_decay=24,
+        idle_after_ms=10000,
+        breath_period_ms=4000,
+    ):
+        self.pin = digitalio.DigitalInOut(pixel_pin)
+        self.pin.direction = digitalio.Direction.OUTPUT
+        self.num_pixels = num_pixels
+        self.profile_hues = profile_hues
+        # Matrix/button key number -> pixel index; default is one pixel per key.
+        self.key_pixels = key_pixels if key_pixels is not None else tuple(range(num_pixels))
+        self.frame_ms = 1000 // fps
+        self.val_limit = val_limit
+        self.theme_value = theme_value
+        self.reactive_decay = reactive_decay
+        self.idle_after_ms = idle_after_ms
+        self.breath_step_ms = max(1, breath_period_ms // BREATH_STEPS)
+
+        self.hue_table = _build_hue_table()
+        self.breath_table = _build_breath_table(16)
+        # Scales 0-255 channel values to the configured brightness limit.
+        self.value_table = bytes(v * val_limit // 255 for v in range(256))
+
+        self.frame = bytearray(num_pixels * 3)
+        self.shown = bytearray(num_pixels * 3)
+        self.heat = bytearray(num_pixels)
+        self.last_frame = ticks_ms()
+        self.last_input = self.last_frame
+        self.profile = 0
+        self._last_update = None
+
+    def on_key(self, key_number, pressed):
+        self.last_input = ticks_ms()
+        if pressed and key_number < len(self.key_pixels):
+            self.heat[self.key_pixels[key_number]] = 255
+
+    def during_bootup(self, keyboard):
+        self.profile = keyboard.active_layers[0]
+        neopixel_write.neopixel_write(self.pin, self.shown)
+
+    def before_matrix_scan(self, keyboard):
+        now = ticks_ms()
+        if ticks_diff(now, self.last_frame) < self.frame_ms:
+            return
+        self.last_frame = now
+        self.profile = keyboard.active_layers[0]
+        self._render(now)
+        if self.frame != self.shown:
+            self.shown[:] = self.frame
+            neopixel_write.neopixel_write(self.pin, self.shown)
+
+    def after_matrix_scan(self, keyboard):
+        update = getattr(keyboard, "matrix_update", None)
+        if update is not None and update is not self._last_update:
+            self._last_update = update
+            self.on_key(update.key_number, update.pressed)
+
+    def before_hid_send(self, keyboard):
+        return
+
+    def after_hid_send(self, keyboard):
+        return
+
+    def on_powersave_enable(self, keyboard):
+        self.frame[:] = bytes(len(self.frame))
+        self.shown[:] = self.frame
+        neopixel_write.neopixel_write(self.pin, self.shown)
+
+    def on_powersave_disable(self, keyboard):
+        self.last_input = ticks_ms()
+
+    def _render(self, now):
+        hues = self.profile_hues
+        hue = hues[self.profile % len(hues)] * 3
+        hue_table = self.hue_table
+        value_table = self.value_table
+        base_r = hue_table[hue]
+        base_g = hue_table[hue + 1]
+        base_b = hue_table[hue + 2]
+
+        idle = ticks_diff(now, self.last_input)
+        if self.idle_after_ms and idle >= self.idle_after_ms:
+            step = (idle // self.breath_step_ms) % BREATH_STEPS
+            theme_value = self.theme_value * self.breath_table[step] // 255
+        else:
+            theme_value = self.theme_value
+
+        frame = self.frame
+        heat = self.heat
+        decay = self.reactive_decay
+        for pixel in range(self.num_pixels):
+            level = heat[pixel]
+            if level:
+                heat[pixel] = level - decay if level > decay else 0
+            # Reactive flashes brighten towards white, then fade back to the theme.
+            value = theme_value if theme_value > level else level
+            offset = pixel * 3
+            # NeoPixels expect GRB order.
+            frame[offset] = value_table[base_g * value // 255 + level * (255 - base_g) // 510]
+            frame[offset + 1] = value_table[base_r * value // 255 + level * (255 - base_r) // 510]
+            frame[offset + 2] = value_table[base_b * value // 255 + level * (255 - base_b) // 510]
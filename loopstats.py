@@ -0,0 +1,174 @@
+"""Main loop benchmark counters printed over serial.
+
+Both firmwares feed the same counters so their numbers can be compared:
+loop rate, worst loop period (an upper bound for input polling latency),
+worst capture-to-dispatch latency of timestamped input events, and the
+latency of the first input handled after a low-power sleep. BootTimer
+reports how long startup took to reach each stage and the first key press.
+
+With `alloc_check` the heap is sampled every pass, and passes that handled
+no input yet allocated are counted: the steady-state loop should report
+`idle_alloc_passes=0`. Sampling walks the heap, so leave it off normally.
+"""
+import gc
+
+from ticks import ticks_ms, ticks_add, ticks_diff
+
+
+class LoopStats:
+    def __init__(self, report_interval_ms=0, alloc_check=False):
+        # 0 disables the periodic [BENCH] report.
+        self.report_interval_ms = report_interval_ms
+        self.alloc_check = alloc_check
+        self.window_start = ticks_ms()
+        self.last_tick = self.window_start
+        self.loops = 0
+        self.loop_hz = 0
+        # Never reset; sample() measures against it.
+        self.total_loops = 0
+        self.sample_tick = self.window_start
+        self.sample_loops = 0
+        self.sample_worst_latency_ms = 0
+        self.worst_loop_ms = 0
+        self.worst_input_latency_ms = 0
+        self.sleeps = 0
+        self.wake_tick = None
+        self.last_wake_latency_ms = None
+        self.worst_wake_latency_ms = 0
+        self.collections = 0
+        # Set by any pass that did real work; such passes may allocate.
+        self.busy = True
+        self.last_free = 0
+        self.idle_alloc_passes = 0
+        self.worst_idle_alloc = 0
+
+    def tick(self):
+        """Count one main loop pass; call once per iteration."""
+        now = ticks_ms()
+        period = ticks_diff(now, self.last_tick)
+        if period > self.worst_loop_ms:
+            self.worst_loop_ms = period
+        self.last_tick = now
+        self.loops += 1
+        self.total_loops += 1
+        elapsed = ticks_diff(now, self.window_start)
+        if self.report_interval_ms and elapsed >= self.report_interval_ms:
+            self.loop_hz = self.loops * 1000 // elapsed
+            self.report()
+            self.loops = 0
+            self.worst_loop_ms = 0
+            self.worst_input_latency_ms = 0
+            self.idle_alloc_passes = 0
+            self.worst_idle_alloc = 0
+            self.window_start = now
+        if self.alloc_check:
+            # Measured after the report so its own strings are not counted.
+            free = gc.mem_free()
+            allocated = self.last_free - free
+            if allocated > 0 and not self.busy:
+                self.idle_alloc_passes += 1
+                if allocated > self.worst_idle_alloc:
+                    self.worst_idle_alloc = allocated
+            self.last_free = free
+        self.busy = False
+
+    def mark_busy(self):
+        """Exclude this pass from the allocation check (it ran an action, a redraw ...)."""
+        self.busy = True
+
+    def mark_collect(self):
+        self.collections += 1
+        self.busy = True
+
+    def mark_wake(self):
+        """Record the moment the loop resumed from a low-power sleep."""
+        self.sleeps += 1
+        self.busy = True
+        self.wake_tick = ticks_ms()
+        # The sleep itself is not a slow loop pass.
+        self.last_tick = self.wake_tick
+
+    def input_handled(self, timestamp=None):
+        """Record that an input event captured at `timestamp` was dispatched.
+
+        Returns the capture-to-dispatch latency in ms, or None without a timestamp.
+        """
+        now = ticks_ms()
+        self.busy = True
+        input_latency = None
+        if timestamp is not None:
+            input_latency = ticks_diff(now, timestamp)
+            if input_latency > self.worst_input_latency_ms:
+                self.worst_input_latency_ms = input_latency
+            if input_latency > self.sample_worst_latency_ms:
+                self.sample_worst_latency_ms = input_latency
+        if self.wake_tick is None:
+            return input_latency
+        latency = ticks_diff(now, self.wake_tick)
+        self.last_wake_latency_ms = latency
+        if latency > self.worst_wake_latency_ms:
+            self.worst_wake_latency_ms = latency
+        self.wake_tick = None
+        return input_latency
+
+    def sample(self):
+        """(loop passes per second, worst input latency ms) since the previous call.
+
+        Independent of the [BENCH] report window, for live displays and telemetry.
+        """
+        now = ticks_ms()
+        elapsed = ticks_diff(now, self.sample_tick)
+        loops = self.total_loops - self.sample_loops
+        worst_latency = self.sample_worst_latency_ms
+        self.sample_tick = now
+        self.sample_loops = self.total_loops
+        self.sample_worst_latency_ms = 0
+        return (loops * 1000 // elapsed if elapsed > 0 else 0), worst_latency
+
+    def exclude(self, start):
+        """Leave the time since `start` (a ticks_ms value) out of the loop timings.
+
+        For work that exists only to show the numbers, such as a diagnostics
+        redraw, so that showing them does not change them.
+        """
+        spent = ticks_diff(ticks_ms(), start)
+        self.last_tick = ticks_add(self.last_tick, spent)
+        self.sample_tick = ticks_add(self.sample_tick, spent)
+        self.window_start = ticks_add(self.window_start, spent)
+
+    def summary(self):
+        return (
+            f"loop_hz={self.loop_hz} worst_loop_ms={self.worst_loop_ms} "
+            f"worst_input_latency_ms={self.worst_input_latency_ms} "
+            f"sleeps={self.sleeps} wake_latency_ms={self.last_wake_latency_ms} "
+            f"worst_wake_latency_ms={self.worst_wake_latency_ms} gc_runs={self.collections}"
+        )
+
+    def report(self):
+        print(f"[BENCH] {self.summary()}")
+        if self.alloc_check:
+            print(
+                f"[BENCH] idle_alloc_passes={self.idle_alloc_passes} "
+                f"worst_idle_alloc_bytes={self.worst_idle_alloc} free_bytes={self.last_free}"
+            )
+
+
+class BootTimer:
+    """Startup milestones since code start, printed once at the first key press."""
+
+    def __init__(self):
+        self.start = ticks_ms()
+        self.marks = []
+        self.reported = False
+
+    def mark(self, stage):
+        self.marks.append((stage, ticks_diff(ticks_ms(), self.start)))
+
+    def first_key(self):
+        if self.reported:
+            return
+        self.reported = True
+        self.mark("first_key")
+        # start_tick is ms since power-on unless the board soft-reloaded.
+        stages = " ".join(f"{stage}_ms={ms}" for stage, ms in self.marks)
+        print(f"[BOOT] {stages} start_tick={self.start}")
@@ -0,0 +1,255 @@
+"""Macro step lists compiled to flat HID report streams and played without blocking.
+
+A macro in keysfile.json is a list of steps:
+
+    {"press": ["ctrl", "shift"]}    hold keys down
+    {"release": ["shift"]}          let keys go ("all" releases everything)
+    {"tap": ["ctrl", "c"]}          press then release
+    {"type": "text"}                type a string
+    {"delay": 250}                  wait in milliseconds
+    {"repeat": 3, "steps": [...]}   repeat nested steps
+    {"media": "media_volume_up"}    send a media key
+
+`compile_macro()` resolves every token and expands every loop once, at load
+time, into a list of ready-to-send reports with the delay to wait after each.
+`MacroPlayer.tick()` then only sends the reports that are due, so a running
+macro never stalls the main loop and costs no interpretation per step.
+"""
+import array
+
+from keyreports import BOOT
+from keytokens import keycode_for, media_code_for, modifier_bit
+from layouts import get_layout
+from ticks import ticks_ms, ticks_add, ticks_less
+
+KEYBOARD = 0
+CONSUMER = 1
+
+# Upper bound on the expanded length, so a large repeat cannot exhaust RAM.
+MAX_REPORTS = 2048
+# Key hold time for taps and typed characters, and the gap after releasing.
+TAP_HOLD_MS = 5
+TAP_GAP_MS = 5
+# Delays are stored as unsigned 16-bit milliseconds.
+MAX_DELAY_MS = 0xFFFF
+
+
+class MacroError(ValueError):
+    pass
+
+
+class CompiledMacro:
+    def __init__(self, name, reports, devices, delays):
+        self.name = name
+        self.reports = reports
+        self.devices = devices
+        self.delays = delays
+
+    def __len__(self):
+        return len(self.reports)
+
+    def duration_ms(self):
+        return sum(self.delays)
+
+
+class _Compiler:
+    def __init__(self, layout, unicode_mode, report_format):
+        self.layout = layout
+        self.unicode_mode = unicode_mode
+        self.format = report_format
+        self.modifiers = 0
+        self.keys = []
+        self.reports = []
+        self.devices = bytearray()
+        self.delays = []
+
+    def _append(self, device, report, delay):
+        if len(self.reports) >= MAX_REPORTS:
+            raise MacroError(f"macro expands to more than {MAX_REPORTS} reports")
+        self.reports.append(report)
+        self.devices.append(device)
+        self.delays.append(delay)
+
+    def _emit_keyboard(self, delay=0):
+        self._append(KEYBOARD, self.format.build(self.modifiers, self.keys), delay)
+
+    def _usages(self, tokens):
+        if isinstance(tokens, str):
+            tokens = [tokens]
+        usages = []
+        for token in tokens:
+            usage = keycode_for(token)
+            if usage is None:
+                raise MacroError(f"unknown key token: {token}")
+            usages.append(usage)
+        return usages
+
+    def _press(self, usages):
+        for usage in usages:
+            bit = modifier_bit(usage)
+            if bit:
+                self.modifiers |= bit
+            elif usage not in self.keys:
+                if len(self.keys) >= self.format.max_keys:
+                    raise MacroError(f"more than {self.format.max_keys} keys held at once")
+                self.keys.append(usage)
+
+    def _release(self, usages):
+        for usage in usages:
+            bit = modifier_bit(usage)
+            if bit:
+                self.modifiers &= ~bit
+            elif usage in self.keys:
+                self.keys.remove(usage)
+
+    def delay(self, ms, step=0):
+        if ms < 0:
+            raise MacroError(f"step {step}: delay must not be negative")
+        if not self.reports:
+            # Leading delay: send the idle state first, then wait.
+            self._emit_keyboard()
+        # Consecutive delays add up in the same report.
+        total = self.delays[-1] + ms
+        if total > MAX_DELAY_MS:
+            raise MacroError(f"step {step}: delay of {total} ms is longer than {MAX_DELAY_MS} ms")
+        self.delays[-1] = total
+
+    def press(self, tokens):
+        self._press(self._usages(tokens))
+        self._emit_keyboard()
+
+    def release(self, tokens):
+        if tokens == "all":
+            self.modifiers = 0
+            self.keys = []
+        else:
+            self._release(self._usages(tokens))
+        self._emit_keyboard()
+
+    def tap(self, usages, modifiers=0, next_modifiers=0):
+        held_modifiers = self.modifiers
+        self.modifiers |= modifiers
+        self._press(usages)
+        self._emit_keyboard(TAP_HOLD_MS)
+        self._release(usages)
+        self.modifiers = held_modifiers | next_modifiers
+        self._emit_keyboard(TAP_GAP_MS)
+        self.modifiers = held_modifiers
+
+    def type(self, text):
+        for char in text:
+            strokes = self.layout.keystrokes(char, self.unicode_mode)
+            if strokes is None:
+                raise MacroError(f"character not on layout {self.layout.name}: {char!r}")
+            last = len(strokes) - 1
+            for index, (modifiers, usage) in enumerate(strokes):
+                next_modifiers = strokes[index + 1][0] if index < last else 0
+                self.tap((usage,), modifiers, next_modifiers)
+
+    def media(self, token):
+        code = media_code_for(token)
+        if code is None:
+            raise MacroError(f"unknown media token: {token}")
+        self._append(CONSUMER, bytes((code & 0xFF, code >> 8)), TAP_HOLD_MS)
+        self._append(CONSUMER, bytes(2), TAP_GAP_MS)
+
+    def steps(self, steps):
+        if not isinstance(steps, list):
+            raise MacroError("macro steps must be a list")
+        for index, step in enumerate(steps):
+            if not isinstance(step, dict):
+                raise MacroError(f"macro step must be an object: {step}")
+            if "press" in step:
+                self.press(step["press"])
+            elif "release" in step:
+                self.release(step["release"])
+            elif "tap" in step:
+                self.tap(self._usages(step["tap"]))
+            elif "type" in step:
+                self.type(str(step["type"]))
+            elif "delay" in step:
+                self.delay(int(step["delay"]), index)
+            elif "repeat" in step:
+                for _ in range(int(step["repeat"])):
+                    self.steps(step.get("steps", []))
+            elif "media" in step:
+                self.media(step["media"])
+            else:
+                raise MacroError(f"unknown macro step: {step}")
+
+
+def compile_macro(steps, name="macro", layout=None, unicode_mode=None, report_format=BOOT):
+    """Compile a keysfile.json step list into a CompiledMacro.
+
+    `type` steps use `layout` (US by default) and `unicode_mode` for
+    characters the layout cannot type. Keyboard reports are built in
+    `report_format` (keyreports.py). Raises MacroError for unknown tokens
+    or malformed steps.
+    """
+    compiler = _Compiler(layout or get_layout("us"), unicode_mode, report_format)
+    compiler.steps(steps)
+    if compiler.modifiers or compiler.keys:
+        # Never leave keys stuck down after the macro ends.
+        compiler.release("all")
+    return CompiledMacro(
+        name, compiler.reports, bytes(compiler.devices), array.array("H", compiler.delays)
+    )
+
+
+class MacroPlayer:
+    """Sends a CompiledMacro's reports as they fall due; call tick() every loop."""
+
+    def __init__(self, keyboard_device, consumer_device, report_format=BOOT):
+        self.devices = (keyboard_device, consumer_device)
+        self.idle_reports = (report_format.release_report, bytes(2))
+        self.macro = None
+        self.index = 0
+        self.due = 0
+
+    @property
+    def playing(self):
+        return self.macro is not None
+
+    def pending(self):
+        """Reports of the running macro not sent yet."""
+        macro = self.macro
+        return len(macro.reports) - self.index if macro is not None else 0
+
+    def start(self, macro):
+        if self.macro is not None:
+            self.stop()
+        self.macro = macro
+        self.index = 0
+        self.due = ticks_ms()
+        self.tick()
+
+    def stop(self):
+        """Abort the running macro and release everything it held."""
+        if self.macro is None:
+            return
+        self.macro = None
+        self.devices[KEYBOARD].send_report(self.idle_reports[KEYBOARD])
+        self.devices[CONSUMER].send_report(self.idle_reports[CONSUMER])
+
+    def tick(self):
+        macro = self.macro
+        if macro is None:
+            return
+        now = ticks_ms()
+        if ticks_less(now, self.due):
+            return
+        reports = macro.reports
+        devices = macro.devices
+        delays = macro.delays
+        count = len(reports)
+        index = self.index
+        while index < count:
+            self.devices[devices[index]].send_report(reports[index])
+            delay = delays[index]
+            index += 1
+            if delay:
+                self.due = ticks_add(now, delay)
+                break
+        self.index = index
+        if index >= count:
+            self.macro = None
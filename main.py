@@ -1,148 +1,329 @@
 import board
+import json
 
-from kmk.boards.OGDECK import KMKKeyboard
-from kmk.keys import KC
+from kmk.kmk_keyboard import KMKKeyboard
+from kmk.extensions import Extension
+from kmk.keys import KC, make_key
 from kmk.modules.encoder import EncoderHandler
-from kmk.handlers.sequences import send_string
 from kmk.handlers.sequences import simple_key_sequence
+from kmk.modules.holdtap import HoldTap
 from kmk.modules.layers import Layers
 from kmk.extensions.media_keys import MediaKeys
 from kmk.modules.mouse_keys import MouseKeys
-from kmk.extensions.RGB import RGB
+from kmk.scanners import DiodeOrientation
+from kmk.scanners.keypad import KeysScanner, MatrixScanner
+
+from loopstats import LoopStats
+from pinmap import load_pinmap
+from profilemeta import profile_metadata
+from profileui import ProfileScreen, setup_display
+from ticks import ticks_ms, ticks_add, ticks_diff
+
+# Same hardware map as code.py, from hardware.json.
+pins = load_pinmap()
+
+# Encoder click vs hold threshold, matching code.py.
+HOLD_TIME_MS = 1000
+# Delays for the Windows search based software launch.
+LAUNCH_SEARCH_DELAY_MS = 500
+LAUNCH_ENTER_DELAY_MS = 500
+
+# NeoPixel data pin, or None when no LEDs are fitted. GP6 is a matrix row.
+RGB_PIXEL_PIN = None
+RGB_NUM_PIXELS = 17
+RGB_VAL_LIMIT = 64
+# Lighting frames per second cap, and idle time before the breathing effect.
+LIGHTING_FPS = 30
+LIGHTING_IDLE_AFTER_MS = 10000
+# Theme hue (0-255) per profile.
+PROFILE_HUES = (4, 20, 69, 120, 160, 200)
+
+# Print [BENCH] loop counters every N ms over serial (0 = off).
+BENCH_REPORT_INTERVAL_MS = 0
 
 keyboard = KMKKeyboard()
-keyboard.debug_enabled = True
+keyboard.debug_enabled = False
+
+# keypad-backed (C) scanners: matrix keys are 0-8, buttons 9-11.
+keyboard.matrix = [
+    MatrixScanner(
+        column_pins=pins.columns,
+        row_pins=pins.rows,
+        columns_to_anodes=(
+            DiodeOrientation.COL2ROW if pins.columns_to_anodes else DiodeOrientation.ROW2COL
+        ),
+    ),
+    KeysScanner(pins.buttons, value_when_pressed=False, pull=True),
+]
+
+MODIFIERS = {
+    "ctrl": KC.LCTL,
+    "control": KC.LCTL,
+    "shift": KC.LSFT,
+    "alt": KC.LALT,
+    "windows": KC.LGUI,
+    "win": KC.LGUI,
+}
+
+TOKEN_NAMES = {
+    "esc": "ESC", "escape": "ESC", "enter": "ENTER", "space": "SPC", "spacebar": "SPC",
+    "backspace": "BSPC", "tab": "TAB", "up": "UP", "down": "DOWN", "left": "LEFT",
+    "right": "RIGHT", "home": "HOME", "end": "END", "pageup": "PGUP", "page_up": "PGUP",
+    "pagedown": "PGDN", "page_down": "PGDN", "insert": "INS", "delete": "DEL",
+    "print_screen": "PSCR", "backslash": "BSLS", "comma": "COMM", "period": "DOT",
+    "slash": "SLSH", "semicolon": "SCLN", "quote": "QUOT", "left_bracket": "LBRC",
+    "right_bracket": "RBRC", "minus": "MINS", "equal": "EQL",
+    "media_volume_up": "VOLU", "media_volume_down": "VOLD", "media_mute": "MUTE",
+    "media_play_pause": "MPLY",
+}
+
+
+def normalize_token(token):
+    return str(token).strip().lower().replace("-", "_").replace(" ", "_")
+
+
+def token_to_key(token):
+    token = normalize_token(token)
+    if token in MODIFIERS:
+        return MODIFIERS[token]
+    name = TOKEN_NAMES.get(token, token.upper())
+    try:
+        return KC[name]
+    except (KeyError, ValueError):
+        print(f"[KMK] Unsupported token: {token}")
+        return None
+
+
+def combo_key(tokens):
+    """Wrap the non-modifier keys of a combo in its modifiers."""
+    tokens = [normalize_token(token) for token in tokens]
+    mods = [MODIFIERS[token] for token in tokens if token in MODIFIERS]
+    keys = [token_to_key(token) for token in tokens if token not in MODIFIERS]
+    if None in keys:
+        return KC.NO
+    if not keys:
+        # A lone modifier, e.g. ["windows"].
+        return mods[0] if mods else KC.NO
+    wrapped = []
+    for key in keys:
+        for mod in reversed(mods):
+            key = mod(key)
+        wrapped.append(key)
+    if len(wrapped) == 1:
+        return wrapped[0]
+    return simple_key_sequence(wrapped)
+
+
+def text_keys(text):
+    keys = []
+    for char in text:
+        if char == "\n":
+            keys.append(KC.ENTER)
+        elif char == "\t":
+            keys.append(KC.TAB)
+        elif char == " ":
+            keys.append(KC.SPC)
+        else:
+            try:
+                key = KC[char]
+            except (KeyError, ValueError):
+                print(f"[KMK] Skipping unsupported: {char}")
+                continue
+            keys.append(KC.LSFT(key) if char.isupper() else key)
+    return keys
+
+
+def config_to_key(key_config):
+    """Build the KMK key for one keysfile.json action."""
+    if not isinstance(key_config, dict):
+        return KC.NO
+    if key_config.get("action") == "text_input" or "text_content" in key_config:
+        text = key_config.get("text_content", "")
+        if key_config.get("text_press_enter", True):
+            text += "\n"
+        return simple_key_sequence(text_keys(text)) if text else KC.NO
+    if key_config.get("software"):
+        return simple_key_sequence(
+            [KC.LGUI, KC.MACRO_SLEEP_MS(LAUNCH_SEARCH_DELAY_MS)]
+            + text_keys(key_config["software"])
+            + [KC.MACRO_SLEEP_MS(LAUNCH_ENTER_DELAY_MS), KC.ENTER]
+        )
+    key_value = key_config.get("key")
+    if isinstance(key_value, str):
+        key_value = [key_value]
+    if key_value:
+        return combo_key(key_value)
+    return KC.NO
+
+
+def load_json(path, section):
+    try:
+        with open(path, "r") as f:
+            return json.load(f).get(section, {})
+    except Exception as e:
+        print(f"[KMK] {path} load error: {e}")
+        return {}
+
+
+profiles_config = load_json("keysfile.json", "profiles")
+special_config = load_json("special-keyout.json", "special_keys")
+PROFILE_NAMES, image_files = profile_metadata(profiles_config)
+profile_count = len(PROFILE_NAMES)
+
+
+class ProfileDisplay(Extension):
+    """Draws the profile selector on the SH1106 and feeds the shared loop counters."""
+
+    def __init__(self, screen, stats, icon_time_ms=1000):
+        self.screen = screen
+        self.stats = stats
+        self.icon_time_ms = icon_time_ms
+        self.shown_profile = None
+        self.icon_requested = False
+        self.icon_until = None
+
+    def request_icon(self):
+        self.icon_requested = True
 
-rgb = RGB(pixel_pin=board.GP6, num_pixels=17, val_limit=64)
+    def during_bootup(self, keyboard):
+        self.shown_profile = keyboard.active_layers[0]
+        self.screen.draw_bubbles(self.shown_profile)
 
-class _Layers(Layers):
-    last_top_layer = 0
-    hues = (4, 20, 69)
+    def before_matrix_scan(self, keyboard):
+        self.stats.tick()
+        if self.icon_until is not None and ticks_diff(ticks_ms(), self.icon_until) >= 0:
+            self.icon_until = None
+            self.screen.draw_bubbles(self.shown_profile)
+
+    def after_matrix_scan(self, keyboard):
+        return
+
+    def before_hid_send(self, keyboard):
+        return
 
     def after_hid_send(self, keyboard):
-        if keyboard.active_layers[0] != self.last_top_layer:
-            self.last_top_layer = keyboard.active_layers[0]
-            rgb.set_hsv_fill(self.hues[self.last_top_layer], 255, 255)
+        profile = keyboard.active_layers[0]
+        if profile == self.shown_profile and not self.icon_requested:
+            return
+        self.shown_profile = profile
+        if self.icon_requested and self.screen.show_icon(profile):
+            self.icon_until = ticks_add(ticks_ms(), self.icon_time_ms)
+        else:
+            self.screen.draw_bubbles(profile)
+        self.icon_requested = False
 
+    def on_powersave_enable(self, keyboard):
+        return
+
+    def on_powersave_disable(self, keyboard):
+        return
 
-encoder_handler = EncoderHandler()
-keyboard.modules.append(_Layers())
-keyboard.modules.append(encoder_handler)
-keyboard.modules.append(MouseKeys())
-keyboard.extensions.append(MediaKeys())
-keyboard.extensions.append(rgb)
 
-encoder_handler.pins = (
-    (board.GP2, board.GP3, None),  # encoder #2
-    (board.GP0, board.GP1, None),  # encoder #1
+def change_profile(keyboard, step, show_icon=False):
+    keyboard.active_layers[0] = (keyboard.active_layers[0] + step) % profile_count
+    if show_icon:
+        profile_display.request_icon()
+
+
+make_key(names=("PROFILE_NEXT",), on_press=lambda key, keyboard, *args: change_profile(keyboard, 1))
+make_key(names=("PROFILE_PREV",), on_press=lambda key, keyboard, *args: change_profile(keyboard, -1))
+make_key(
+    names=("PROFILE_NEXT_ICON",),
+    on_press=lambda key, keyboard, *args: change_profile(keyboard, 1, True),
+)
+make_key(
+    names=("PROFILE_PREV_ICON",),
+    on_press=lambda key, keyboard, *args: change_profile(keyboard, -1, True),
 )
 
-KNOB00_ANTI_CLOCKWISE = KC.NO
-KNOB00_BUTTON = KC.NO
-KNOB00_CLOCKWISE = KC.NO
-KNOB01_ANTI_CLOCKWISE = KC.NO
-KNOB01_BUTTON = KC.NO
-KNOB01_CLOCKWISE = KC.NO
-KEY000 = KC.NO
-KEY001 = KC.NO
-KEY002 = KC.NO
-KEY003 = KC.NO
-KEY004 = KC.NO
-KEY010 = KC.NO
-KEY011 = KC.NO
-KEY012 = KC.NO
-KEY013 = KC.NO
-KEY014 = KC.NO
-KEY020 = KC.NO
-KEY021 = KC.NO
-KEY022 = KC.NO
-KEY023 = KC.NO
-KEY024 = KC.NO
-KEY030 = KC.NO
-KEY031 = KC.NO
-KEY032 = KC.NO
-KEY033 = KC.NO
-KEY034 = KC.NO
-KNOB10_ANTI_CLOCKWISE = KC.NO
-KNOB10_BUTTON = KC.NO
-KNOB10_CLOCKWISE = KC.NO
-KNOB11_ANTI_CLOCKWISE = KC.NO
-KNOB11_BUTTON = KC.NO
-KNOB11_CLOCKWISE = KC.NO
-KEY100 = KC.NO
-KEY101 = KC.NO
-KEY102 = KC.NO
-KEY103 = KC.NO
-KEY104 = KC.NO
-KEY110 = KC.NO
-KEY111 = KC.NO
-KEY112 = KC.NO
-KEY113 = KC.NO
-KEY114 = KC.NO
-KEY120 = KC.NO
-KEY121 = KC.NO
-KEY122 = KC.NO
-KEY123 = KC.NO
-KEY124 = KC.NO
-KEY130 = KC.NO
-KEY131 = KC.NO
-KEY132 = KC.NO
-KEY133 = KC.NO
-KEY134 = KC.NO
-KNOB20_ANTI_CLOCKWISE = KC.NO
-KNOB20_BUTTON = KC.NO
-KNOB20_CLOCKWISE = KC.NO
-KNOB21_ANTI_CLOCKWISE = KC.RSFT(KC.F13)
-KNOB21_BUTTON = KC.NO
-KNOB21_CLOCKWISE = KC.NO
-KEY200 = KC.NO
-KEY201 = KC.NO
-KEY202 = KC.NO
-KEY203 = KC.NO
-KEY204 = KC.NO
-KEY210 = KC.NO
-KEY211 = KC.NO
-KEY212 = KC.NO
-KEY213 = KC.NO
-KEY214 = KC.NO
-KEY220 = KC.NO
-KEY221 = KC.NO
-KEY222 = KC.NO
-KEY223 = KC.NO
-KEY224 = KC.NO
-KEY230 = KC.NO
-KEY231 = KC.NO
-KEY232 = KC.NO
-KEY233 = KC.NO
-KEY234 = KC.NO
-
-keyboard.keymap = [
-	[
-		KEY000, KEY001, KEY002, KEY003, KEY004, 
-		KEY010, KEY011, KEY012, KEY013, KEY014, 
-		KEY020, KEY021, KEY022, KEY023, KEY024, 
-		KEY030, KEY031, KEY032, KEY033, KEY034, 
-	],
-	[
-		KEY100, KEY101, KEY102, KEY103, KEY104, 
-		KEY110, KEY111, KEY112, KEY113, KEY114, 
-		KEY120, KEY121, KEY122, KEY123, KEY124, 
-		KEY130, KEY131, KEY132, KEY133, KEY134, 
-	],
-	[
-		KEY200, KEY201, KEY202, KEY203, KEY204, 
-		KEY210, KEY211, KEY212, KEY213, KEY214, 
-		KEY220, KEY221, KEY222, KEY223, KEY224, 
-		KEY230, KEY231, KEY232, KEY233, KEY234, 
-	]
-]
+SPECIAL_DEFAULTS = {
+    "volume_encoder_left": {"key": ["media_volume_down"]},
+    "volume_encoder_right": {"key": ["media_volume_up"]},
+    "volume_encoder_click": {"key": ["media_play_pause"]},
+    "volume_encoder_hold": {"key": ["media_mute"]},
+    "display_encoder_left": {"action": "profile_prev"},
+    "display_encoder_right": {"action": "profile_next"},
+    "display_encoder_click": {"action": "profile_next"},
+    "display_encoder_hold": {"action": "none"},
+    "mic_key": {"key": ["f13"]},
+}
+
+
+def special_key(action_id, show_icon=False):
+    entry = special_config.get(action_id)
+    if not isinstance(entry, dict):
+        entry = SPECIAL_DEFAULTS[action_id]
+    if "key" in entry:
+        return combo_key(entry["key"] if isinstance(entry["key"], list) else [entry["key"]])
+    action = entry.get("action", "none")
+    suffix = "_ICON" if show_icon else ""
+    if action == "profile_next":
+        return KC["PROFILE_NEXT" + suffix]
+    if action == "profile_prev":
+        return KC["PROFILE_PREV" + suffix]
+    return KC.NO
 
-encoder_handler.map = [
-	((KNOB00_ANTI_CLOCKWISE, KNOB00_CLOCKWISE, KC.NO),(KNOB01_ANTI_CLOCKWISE, KNOB01_CLOCKWISE, KC.NO)),
-	((KNOB10_ANTI_CLOCKWISE, KNOB10_CLOCKWISE, KC.NO),(KNOB11_ANTI_CLOCKWISE, KNOB11_CLOCKWISE, KC.NO)),
-	((KNOB20_ANTI_CLOCKWISE, KNOB20_CLOCKWISE, KC.NO),(KNOB21_ANTI_CLOCKWISE, KNOB21_CLOCKWISE, KC.NO))
+
+def click_hold_key(click_id, hold_id, show_icon=False):
+    return KC.HT(
+        special_key(click_id, show_icon),
+        special_key(hold_id),
+        tap_time=HOLD_TIME_MS,
+    )
+
+
+button_keys = [
+    click_hold_key("volume_encoder_click", "volume_encoder_hold"),
+    click_hold_key("display_encoder_click", "display_encoder_hold", show_icon=True),
+    special_key("mic_key"),
 ]
 
+keymap = []
+for profile_index in range(profile_count):
+    profile_cfg = profiles_config.get(str(profile_index), {})
+    layer = []
+    # keypad numbers keys row-major, pins.key_numbers gives the action number.
+    for action_number in pins.key_numbers:
+        layer.append(config_to_key(profile_cfg.get(str(action_number))))
+    keymap.append(layer + button_keys)
+keyboard.keymap = keymap
+
+encoder_handler = EncoderHandler()
+encoder_handler.pins = tuple((pin_a, pin_b, None) for pin_a, pin_b in pins.encoders)
+encoder_layer = (
+    (special_key("volume_encoder_left"), special_key("volume_encoder_right"), KC.NO),
+    (special_key("display_encoder_left"), special_key("display_encoder_right"), KC.NO),
+)
+encoder_handler.map = [encoder_layer for _ in range(profile_count)]
+
+profile_display = ProfileDisplay(
+    ProfileScreen(
+        setup_display(pins.display_scl, pins.display_sda, pins.display_address),
+        PROFILE_NAMES,
+        image_files,
+    ),
+    LoopStats(BENCH_REPORT_INTERVAL_MS),
+)
+
+keyboard.modules.append(Layers())
+keyboard.modules.append(HoldTap())
+keyboard.modules.append(encoder_handler)
+keyboard.modules.append(MouseKeys())
+keyboard.extensions.append(MediaKeys())
+keyboard.extensions.append(profile_display)
+if RGB_PIXEL_PIN is not None:
+    from lighting import LightingEngine
+
+    keyboard.extensions.append(
+        LightingEngine(
+            RGB_PIXEL_PIN,
+            RGB_NUM_PIXELS,
+            PROFILE_HUES,
+            fps=LIGHTING_FPS,
+            val_limit=RGB_VAL_LIMIT,
+            idle_after_ms=LIGHTING_IDLE_AFTER_MS,
+        )
+    )
 
 if __name__ == '__main__':
     keyboard.go()
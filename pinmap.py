@@ -0,0 +1,91 @@
+"""Board pin assignments from hardware.json, with the stock macropad as default.
+
+Pins are given by their `board` names ("GP14"), so the same firmware runs
+on another RP2040 board by editing hardware.json only:
+
+    "matrix":   rows, columns, diode direction, "keys" (action number per
+                row/column position) and "backend"
+    "buttons":  a pin per role ("volume", "display", "mic") and "backend"
+    "encoders": an [A, B] pin pair per role ("volume", "display") and "backend"
+    "display":  I2C "scl"/"sda" pins and "address"
+
+Backends are "auto" (the lowest-latency one the build has), "keypad" or
+"polled" for keys, and "rotaryio2", "rotaryio" or "polled" for encoders;
+see inputcapture.make_producer().
+"""
+import json
+
+try:
+    import board
+except ImportError:
+    board = None
+
+BUTTON_ROLES = ("volume", "display", "mic")
+ENCODER_ROLES = ("volume", "display")
+
+DEFAULT_HARDWARE = {
+    "matrix": {
+        "rows": ["GP4", "GP13", "GP6"],
+        "columns": ["GP1", "GP2", "GP3"],
+        "columns_to_anodes": False,
+        "keys": [[1, 4, 7], [3, 6, 9], [2, 5, 8]],
+        "backend": "auto",
+    },
+    "buttons": {"volume": "GP17", "display": "GP20", "mic": "GP0", "backend": "auto"},
+    "encoders": {"volume": ["GP14", "GP15"], "display": ["GP18", "GP19"], "backend": "auto"},
+    "display": {"scl": "GP9", "sda": "GP8", "address": 0x3C},
+}
+
+
+def board_pin(name):
+    """The `board` pin called `name`; the name itself off-device."""
+    if board is None:
+        return name
+    try:
+        return getattr(board, name)
+    except AttributeError:
+        raise ValueError(f"board has no pin {name}") from None
+
+
+class PinMap:
+    def __init__(self, hardware):
+        matrix = hardware["matrix"]
+        self.rows = tuple(board_pin(name) for name in matrix["rows"])
+        self.columns = tuple(board_pin(name) for name in matrix["columns"])
+        self.columns_to_anodes = bool(matrix.get("columns_to_anodes", False))
+        keys = matrix["keys"]
+        if len(keys) != len(self.rows) or any(len(row) != len(self.columns) for row in keys):
+            raise ValueError("matrix keys must have one entry per row and column")
+        # keypad numbers keys row-major: key_number = row * len(columns) + col.
+        self.key_numbers = tuple(number for row in keys for number in row)
+        self.key_backend = matrix.get("backend", "auto")
+
+        buttons = hardware["buttons"]
+        self.buttons = tuple(board_pin(buttons[role]) for role in BUTTON_ROLES)
+        self.button_backend = buttons.get("backend", "auto")
+
+        encoders = hardware["encoders"]
+        self.encoders = tuple(
+            (board_pin(encoders[role][0]), board_pin(encoders[role][1])) for role in ENCODER_ROLES
+        )
+        self.encoder_backend = encoders.get("backend", "auto")
+
+        display = hardware["display"]
+        self.display_scl = board_pin(display["scl"])
+        self.display_sda = board_pin(display["sda"])
+        self.display_address = display.get("address", 0x3C)
+
+
+def load_pinmap(path="hardware.json"):
+    """PinMap from `path`; sections missing from the file keep their defaults."""
+    hardware = {section: dict(values) for section, values in DEFAULT_HARDWARE.items()}
+    try:
+        with open(path, "r") as f:
+            for section, values in json.load(f).items():
+                if section in hardware and isinstance(values, dict):
+                    hardware[section].update(values)
+    except OSError:
+        print(f"[PINS] {path} not found, using the default pin map")
+    except ValueError as e:
+        print(f"[PINS] {path} load error: {e}")
+    return PinMap(hardware)
@@ -0,0 +1,15 @@
+"""Profile names and icons from keysfile.json, without display dependencies."""
+
+
+def profile_metadata(profiles_config):
+    """Names and icon paths of profiles "0", "1", ... in keysfile.json, in order."""
+    names = []
+    icons = []
+    while str(len(names)) in profiles_config:
+        profile_cfg = profiles_config[str(len(names))]
+        names.append(profile_cfg.get("name", f"Profile {len(names) + 1}"))
+        icons.append(profile_cfg.get("icon"))
+    if not names:
+        names.append("Default")
+        icons.append(None)
+    return names, icons
@@ -0,0 +1,239 @@
+"""SH1106 profile selector screen shared by code.py and the KMK firmware."""
+import bitmaptools
+import board
+import busio
+import displayio
+from adafruit_displayio_sh1106 import SH1106
+
+from glyphcache import GLYPH_HEIGHT, GlyphCache, text_palette
+
+
+def setup_display(scl=board.GP9, sda=board.GP8, address=0x3C):
+    displayio.release_displays()
+    i2c = busio.I2C(scl, sda)
+    display_bus = displayio.I2CDisplay(i2c, device_address=address)
+    return SH1106(display_bus, width=130, height=64)
+
+
+# Visible selector window; profiles beyond it scroll into view a row at a time.
+GRID_COLUMNS = 3
+GRID_ROWS = 2
+BUBBLE_WIDTH = 17
+BUBBLE_GAP = 8
+# Vertical centre of the profile name.
+TITLE_Y = 10
+# Typing progress bar along the top edge, above the profile name.
+PROGRESS_HEIGHT = 2
+
+
+def _bubble_bitmap(width, ring):
+    bitmap = displayio.Bitmap(width, width, 2)
+    center = (width - 1) / 2
+    radius = (width - 2) / 2
+    inner_radius = max(radius - 1, 0)
+    radius_sq = radius * radius
+    inner_radius_sq = inner_radius * inner_radius
+    for px in range(width):
+        for py in range(width):
+            dx = px - center
+            dy = py - center
+            dist_sq = (dx * dx) + (dy * dy)
+            if ring:
+                bitmap[px, py] = 1 if inner_radius_sq <= dist_sq <= radius_sq else 0
+            else:
+                bitmap[px, py] = 1 if dist_sq <= radius_sq else 0
+    return bitmap
+
+
+class ProfileScreen:
+    """Scrolling profile selector built from a fixed set of tiles.
+
+    Only GRID_COLUMNS x GRID_ROWS bubbles exist; moving the selection updates
+    the tiles in place, so memory and redraw cost do not depend on how many
+    profiles there are. The names and numbers of the visible rows and the
+    rows just above and below are rendered into glyph caches, and a redraw
+    swaps the cached bitmaps in, with no font work. Glyphs further away are
+    dropped when the window scrolls.
+    """
+
+    def __init__(self, display, names, icons):
+        self.display = display
+        self.names = names
+        self.icons = icons
+        self.total_rows = (len(names) + GRID_COLUMNS - 1) // GRID_COLUMNS
+        self.top_row = 0
+        self.selected = None
+
+        palette = displayio.Palette(2)
+        palette[0] = 0x000000
+        palette[1] = 0xFFFFFF
+        self.filled = _bubble_bitmap(BUBBLE_WIDTH, False)
+        self.ring = _bubble_bitmap(BUBBLE_WIDTH, True)
+
+        self.group = displayio.Group()
+        bg_bitmap = displayio.Bitmap(display.width, display.height, 1)
+        bg_palette = displayio.Palette(1)
+        bg_palette[0] = 0x000000
+        self.group.append(displayio.TileGrid(bg_bitmap, pixel_shader=bg_palette, x=0, y=0))
+
+        self.title_cache = GlyphCache(display.width)
+        self.number_cache = GlyphCache(BUBBLE_WIDTH)
+        # Top row the caches hold glyphs around; None rebuilds them on the next draw.
+        self.cached_row = None
+
+        self.title = displayio.TileGrid(
+            self.title_cache.get(self.profile_name(0)),
+            pixel_shader=text_palette(0xFFFFFF),
+            x=0,
+            y=TITLE_Y - GLYPH_HEIGHT // 2,
+        )
+        self.group.append(self.title)
+
+        total_width = (BUBBLE_WIDTH * GRID_COLUMNS) + (BUBBLE_GAP * (GRID_COLUMNS - 1))
+        start_x = (display.width - total_width) // 2
+        start_y = TITLE_Y + GLYPH_HEIGHT + 2
+        self.tiles = []
+        self.numbers = []
+        # Per-slot palettes: a number is white in the selected ring, black in a filled bubble.
+        self.number_palettes = []
+        # Profile index each slot currently shows, to skip unchanged labels.
+        self.slot_profiles = [None] * (GRID_COLUMNS * GRID_ROWS)
+        for slot in range(GRID_COLUMNS * GRID_ROWS):
+            x = start_x + (slot % GRID_COLUMNS) * (BUBBLE_WIDTH + BUBBLE_GAP)
+            y = start_y + (slot // GRID_COLUMNS) * (BUBBLE_WIDTH + BUBBLE_GAP)
+            tile = displayio.TileGrid(self.filled, pixel_shader=palette, x=x, y=y)
+            number_palette = text_palette(0x000000)
+            number = displayio.TileGrid(
+                self.number_cache.get(""),
+                pixel_shader=number_palette,
+                x=x,
+                y=y + (BUBBLE_WIDTH - GLYPH_HEIGHT) // 2,
+            )
+            self.tiles.append(tile)
+            self.numbers.append(number)
+            self.number_palettes.append(number_palette)
+            self.group.append(tile)
+            self.group.append(number)
+
+        self.thumb = None
+        if self.total_rows > GRID_ROWS:
+            self.track_top = start_y
+            self.track_height = GRID_ROWS * BUBBLE_WIDTH + (GRID_ROWS - 1) * BUBBLE_GAP
+            thumb_height = max(3, self.track_height * GRID_ROWS // self.total_rows)
+            self.thumb_travel = self.track_height - thumb_height
+            thumb_bitmap = displayio.Bitmap(2, thumb_height, 2)
+            thumb_bitmap.fill(1)
+            self.thumb = displayio.TileGrid(
+                thumb_bitmap, pixel_shader=palette, x=display.width - 4, y=start_y
+            )
+            self.group.append(self.thumb)
+
+        self.progress = displayio.Bitmap(display.width, PROGRESS_HEIGHT, 2)
+        self.progress_fill = 0
+        self.progress_bar = displayio.TileGrid(self.progress, pixel_shader=palette, x=0, y=0)
+        self.progress_bar.hidden = True
+        self.group.append(self.progress_bar)
+
+    def show_progress(self, done, total):
+        """Fill the progress bar to done/total; total 0 hides it.
+
+        Only the newly covered columns are drawn, so displayio refreshes just
+        that strip of the panel.
+        """
+        if not total:
+            self.progress_bar.hidden = True
+            self.progress.fill(0)
+            self.progress_fill = 0
+            return
+        fill = self.progress.width * min(done, total) // total
+        if fill < self.progress_fill:
+            self.progress.fill(0)
+            self.progress_fill = 0
+        if fill > self.progress_fill:
+            bitmaptools.fill_region(self.progress, self.progress_fill, 0, fill, PROGRESS_HEIGHT, 1)
+            self.progress_fill = fill
+        self.progress_bar.hidden = False
+
+    def draw_bubbles(self, selected_index):
+        row = selected_index // GRID_COLUMNS
+        if row < self.top_row:
+            self.top_row = row
+        elif row >= self.top_row + GRID_ROWS:
+            self.top_row = row - GRID_ROWS + 1
+
+        first = self.top_row * GRID_COLUMNS
+        count = len(self.names)
+        for slot, tile in enumerate(self.tiles):
+            profile = first + slot
+            number = self.numbers[slot]
+            visible = profile < count
+            tile.hidden = not visible
+            number.hidden = not visible
+            if not visible:
+                continue
+            if self.slot_profiles[slot] != profile:
+                self.slot_profiles[slot] = profile
+                number.bitmap = self.number_cache.get(str(profile + 1))
+            is_selected = profile == selected_index
+            bitmap = self.ring if is_selected else self.filled
+            if tile.bitmap is not bitmap:
+                tile.bitmap = bitmap
+                self.number_palettes[slot][1] = 0xFFFFFF if is_selected else 0x000000
+
+        if self.cached_row != self.top_row:
+            self._cache_window()
+
+        if self.selected != selected_index:
+            self.selected = selected_index
+            self.title.bitmap = self.title_cache.get(self.profile_name(selected_index))
+        if self.thumb is not None:
+            self.thumb.y = self.track_top + self.thumb_travel * self.top_row // (
+                self.total_rows - GRID_ROWS
+            )
+        if self.display.root_group is not self.group:
+            self.display.root_group = self.group
+
+    def _cache_window(self):
+        """Keep the glyphs of the visible rows and one row either side, and no others."""
+        first = max(self.top_row - 1, 0) * GRID_COLUMNS
+        last = min((self.top_row + GRID_ROWS + 1) * GRID_COLUMNS, len(self.names))
+        self.title_cache.retain([self.profile_name(index) for index in range(first, last)])
+        self.number_cache.retain([str(index + 1) for index in range(first, last)])
+        self.cached_row = self.top_row
+
+    def invalidate(self):
+        """Forget every cached glyph and shown label, e.g. after new profile names were loaded."""
+        self.title_cache.clear()
+        self.number_cache.clear()
+        self.cached_row = None
+        self.selected = None
+        for slot in range(len(self.slot_profiles)):
+            self.slot_profiles[slot] = None
+
+    def profile_name(self, profile_index):
+        names = self.names
+        return names[profile_index] if 0 <= profile_index < len(names) else "Profile"
+
+    def load_image(self, profile_index):
+        image_file = self.icons[profile_index]
+        if not image_file:
+            return None
+        try:
+            bitmap = displayio.OnDiskBitmap(open(image_file, "rb"))
+            return bitmap
+        except Exception as e:
+            print(f"Error loading image {image_file}: {e}")
+            return None
+
+    def show_icon(self, profile_index):
+        """Replace the selector with the profile icon; False if it cannot load."""
+        bitmap = self.load_image(profile_index)
+        if not bitmap:
+            return False
+        splash = displayio.Group()
+        image_sprite = displayio.TileGrid(bitmap, pixel_shader=bitmap.pixel_shader)
+        image_sprite.x = (self.display.width - bitmap.width) // 2
+        image_sprite.y = (self.display.height - bitmap.height) // 2
+        splash.append(image_sprite)
+        self.display.root_group = splash
+        return True
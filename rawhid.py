@@ -0,0 +1,53 @@
+"""Byte stream over the 64-byte raw HID endpoint, for a HostLink.
+
+Every report is [kind, length, data...]: kind DATA carries `length` stream
+bytes (at most 62), kind ACK tells the host the pad has taken its last
+report. The pad only keeps the newest OUT report, so the host sends one
+DATA report and waits for the ACK before the next. `RawHidPort` offers the
+`in_waiting`/`read()`/`write()` surface of a usb_cdc port, so hostlink.py
+frames (``TAG LENGTH\\n`` + payload) run over it unchanged:
+
+    raw_link = HostLink(RawHidPort(device))
+
+host/rawhid_push.py is the PC side; it needs no serial port or driver.
+"""
+from hiddescriptors import RAW_REPORT_SIZE
+
+DATA = 0x01
+ACK = 0x02
+CHUNK = RAW_REPORT_SIZE - 2
+
+
+class RawHidPort:
+    def __init__(self, device):
+        self.device = device
+        self.received = bytearray()
+        self.out_report = bytearray(RAW_REPORT_SIZE)
+        self.ack_report = bytes((ACK,)) + bytes(RAW_REPORT_SIZE - 1)
+
+    @property
+    def connected(self):
+        return True
+
+    @property
+    def in_waiting(self):
+        report = self.device.get_last_received_report()
+        if report is not None and report[0] == DATA:
+            self.received.extend(report[2 : 2 + min(report[1], CHUNK)])
+            self.device.send_report(self.ack_report)
+        return len(self.received)
+
+    def read(self, count=1):
+        data = bytes(self.received[:count])
+        self.received = self.received[count:]
+        return data
+
+    def write(self, data):
+        report = self.out_report
+        report[0] = DATA
+        for start in range(0, len(data), CHUNK):
+            chunk = data[start : start + CHUNK]
+            report[1] = len(chunk)
+            report[2 : 2 + len(chunk)] = chunk
+            self.device.send_report(report)
+        return len(data)
@@ -0,0 +1,191 @@
+"""Special actions (encoders, encoder buttons, mic key) compiled into handlers.
+
+Entries in special-keyout.json become handler objects once at load, held in
+a list indexed by the slot constants below, so a detent or a click costs one
+`run()` call with no token parsing or string compares:
+
+    {"key": ["ctrl", "shift", "m"]}           keyboard chord, one prebuilt report
+    {"key": ["media_volume_up"]}              consumer control code
+    {"action": "profile_next"}                profile step (also "profile_prev")
+    {"action": "layer_toggle", "value": 9}    internal command with an argument
+
+`run()` returns the profile step the action asks for (+1, -1 or 0), so an
+encoder burst can be summed and the selector redrawn once. Other internal
+commands ("brightness_up", "layer_toggle" ...) are functions supplied by the
+firmware.
+"""
+import json
+import time
+
+from keyreports import BOOT
+from keytokens import keycode_for, media_code_for
+
+# Handler table slots.
+VOLUME_ENCODER_LEFT = 0
+VOLUME_ENCODER_RIGHT = 1
+VOLUME_ENCODER_CLICK = 2
+VOLUME_ENCODER_HOLD = 3
+DISPLAY_ENCODER_LEFT = 4
+DISPLAY_ENCODER_RIGHT = 5
+DISPLAY_ENCODER_CLICK = 6
+DISPLAY_ENCODER_HOLD = 7
+MIC_KEY = 8
+
+SPECIAL_IDS = (
+    "volume_encoder_left",
+    "volume_encoder_right",
+    "volume_encoder_click",
+    "volume_encoder_hold",
+    "display_encoder_left",
+    "display_encoder_right",
+    "display_encoder_click",
+    "display_encoder_hold",
+    "mic_key",
+)
+
+SPECIAL_DEFAULTS = {
+    "volume_encoder_left": {"name": "Volume Down", "key": ["media_volume_down"]},
+    "volume_encoder_right": {"name": "Volume Up", "key": ["media_volume_up"]},
+    "volume_encoder_click": {"name": "Play/Pause", "key": ["media_play_pause"]},
+    "volume_encoder_hold": {"name": "Mute", "key": ["media_mute"]},
+    "display_encoder_left": {"name": "Prev Profile", "action": "profile_prev"},
+    "display_encoder_right": {"name": "Next Profile", "action": "profile_next"},
+    "display_encoder_click": {"name": "Switch Profile", "action": "profile_next"},
+    "display_encoder_hold": {"name": "No Action", "action": "none"},
+    "mic_key": {"name": "Mic Toggle", "key": ["f13"]},
+}
+
+PROFILE_STEPS = {"profile_next": 1, "profile_prev": -1}
+
+TAP_S = 0.05
+
+
+class KeyHandler:
+    """Taps a keyboard chord from one prebuilt report."""
+
+    def __init__(self, device, report, release_report):
+        self.device = device
+        self.report = report
+        self.release_report = release_report
+
+    def run(self):
+        self.device.send_report(self.report)
+        time.sleep(TAP_S)
+        self.device.send_report(self.release_report)
+        return 0
+
+
+class MediaHandler:
+    def __init__(self, consumer, code):
+        self.consumer = consumer
+        self.code = code
+
+    def run(self):
+        self.consumer.send(self.code)
+        return 0
+
+
+class ProfileStep:
+    def __init__(self, step):
+        self.step = step
+
+    def run(self):
+        return self.step
+
+
+class CommandHandler:
+    """Calls an internal command `function(argument)`."""
+
+    def __init__(self, function, argument):
+        self.function = function
+        self.argument = argument
+
+    def run(self):
+        self.function(self.argument)
+        return 0
+
+
+class NoAction:
+    def run(self):
+        return 0
+
+
+NO_ACTION = NoAction()
+
+
+def load_special_actions(path="special-keyout.json"):
+    """Load editable special actions with safe defaults."""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        actions = data.get("special_keys", {})
+    except Exception as e:
+        print(f"{path} load error: {e}")
+        actions = {}
+    return merge_special_actions(actions)
+
+
+def merge_special_actions(actions):
+    """The "special_keys" entries of special-keyout.json over SPECIAL_DEFAULTS."""
+    merged = {}
+    for action_id, default_entry in SPECIAL_DEFAULTS.items():
+        merged[action_id] = default_entry.copy()
+        if action_id in actions and isinstance(actions[action_id], dict):
+            merged[action_id].update(actions[action_id])
+    return merged
+
+
+def key_report(tokens, report_format=BOOT):
+    """Keyboard report pressing `tokens`, or None if one is invalid."""
+    usages = []
+    for token in tokens:
+        usage = keycode_for(token)
+        if usage is None:
+            print(f"Unsupported special token: {token}")
+            return None
+        usages.append(usage)
+    try:
+        return report_format.build(0, usages)
+    except ValueError as e:
+        print(f"Special action {tokens}: {e}")
+        return None
+
+
+def compile_special_action(entry, keyboard_device, consumer, commands, report_format=BOOT):
+    """Handler for one special-keyout.json entry."""
+    if "key" in entry:
+        tokens = entry["key"]
+        if isinstance(tokens, str):
+            tokens = [tokens]
+        if not tokens:
+            return NO_ACTION
+        if len(tokens) == 1:
+            media_code = media_code_for(tokens[0])
+            if media_code is not None:
+                return MediaHandler(consumer, media_code)
+        report = key_report(tokens, report_format)
+        if report is None:
+            return NO_ACTION
+        return KeyHandler(keyboard_device, report, report_format.release_report)
+
+    action = entry.get("action", "none")
+    if action in PROFILE_STEPS:
+        return ProfileStep(PROFILE_STEPS[action])
+    if action in commands:
+        return CommandHandler(commands[action], entry.get("value"))
+    if action != "none":
+        print(f"Unsupported special action: {action}")
+    return NO_ACTION
+
+
+def compile_special_actions(entries, keyboard_device, consumer, commands=None, report_format=BOOT):
+    """Handler table indexed by the slot constants.
+
+    `commands` maps internal command names to functions taking the entry's
+    "value" (None when absent). Key chords are built in `report_format`.
+    """
+    commands = commands or {}
+    return [
+        compile_special_action(entries[action_id], keyboard_device, consumer, commands, report_format)
+        for action_id in SPECIAL_IDS
+    ]
@@ -0,0 +1,220 @@
+"""Persistent pad state in microcontroller.nvm: last profile and usage counters.
+
+The store keeps the last selected profile, a press counter per profile and
+key, and a histogram of input latencies. Changes only update the in-RAM
+copy, and `maybe_flush()` writes it out only after the inputs have been idle
+for `idle_ms`, because a flash write stalls the CPU for a few milliseconds.
+On the RP2040 every NVM write erases and rewrites the whole 4 KB flash
+sector, so writes are rationed: a new profile is saved once it has been kept
+for `profile_interval_ms`, while key and latency counts, which change on
+every press, wait for `counter_interval_ms` or for `counter_flush_count`
+unsaved counts, whichever comes first.
+
+Each record carries a sequence number and a CRC, and loading takes the
+newest record whose CRC matches. Records take turns in up to SLOTS slots,
+but on the RP2040 all of them share the one erased sector: rotating neither
+spreads wear nor keeps the previous record safe. A reset during a write can
+lose every record, and the pad then starts from empty state. A record
+holds counters for every profile in the config; with many profiles a slot
+spans several SLOT_SIZE blocks and fewer slots fit. Records written for a
+different number of profiles or keys are loaded for the profiles and keys
+both have. Counters halve together when one saturates, which keeps their
+ratios.
+"""
+import array
+import binascii
+import struct
+
+try:
+    import microcontroller
+except ImportError:
+    microcontroller = None
+
+from ticks import ticks_ms, ticks_diff
+
+MAGIC = b"MPS2"
+# magic, sequence number, CRC32 of the payload, payload length
+HEADER = "<4sIIH"
+HEADER_SIZE = struct.calcsize(HEADER)
+# last profile, profile count, key count; the counters follow as u16
+PAYLOAD_HEADER = "<HHH"
+PAYLOAD_HEADER_SIZE = struct.calcsize(PAYLOAD_HEADER)
+SLOT_SIZE = 512
+SLOTS = 8
+# Latency buckets in ms: <1, <2, <4, <8, <16, <32, <64, >=64.
+LATENCY_BUCKETS = 8
+
+
+def _load_u16(array_out, data, offset):
+    for index in range(len(array_out)):
+        array_out[index] = data[offset] | (data[offset + 1] << 8)
+        offset += 2
+    return offset
+
+
+class StateStore:
+    def __init__(
+        self,
+        key_count,
+        profile_count=1,
+        nvm=None,
+        profile_interval_ms=10_000,
+        counter_interval_ms=1_800_000,
+        counter_flush_count=1000,
+        idle_ms=2000,
+    ):
+        if nvm is None:
+            nvm = getattr(microcontroller, "nvm", None)
+        if nvm is None:
+            # No NVM (host run): keep state in RAM only.
+            nvm = bytearray(SLOT_SIZE * SLOTS)
+        self.nvm = nvm
+        self.key_count = key_count
+        self.profile_interval_ms = profile_interval_ms
+        self.counter_interval_ms = counter_interval_ms
+        self.counter_flush_count = counter_flush_count
+        self.idle_ms = idle_ms
+
+        self.profile_count = self._fit_profiles(max(profile_count, 1))
+        if self.profile_count < profile_count:
+            print(f"[STATE] NVM holds counts for {self.profile_count} of {profile_count} profiles")
+        self.slot_size = self._slot_size()
+        self.slots = min(SLOTS, len(nvm) // self.slot_size)
+
+        self.last_profile = 0
+        self.saved_profile = 0
+        self.key_presses = array.array("H", [0] * (self.profile_count * key_count))
+        self.latency = array.array("H", [0] * LATENCY_BUCKETS)
+        self.unsaved_counts = 0
+        self.sequence = 0
+        self.slot = self.slots - 1
+        now = ticks_ms()
+        self.profile_changed = now
+        self.last_flush = now
+        self.writes = 0
+        self._load()
+
+    def _payload_size(self, profile_count=None):
+        if profile_count is None:
+            profile_count = self.profile_count
+        return PAYLOAD_HEADER_SIZE + 2 * (profile_count * self.key_count + LATENCY_BUCKETS)
+
+    def _slot_size(self, profile_count=None):
+        blocks = (HEADER_SIZE + self._payload_size(profile_count) + SLOT_SIZE - 1) // SLOT_SIZE
+        return blocks * SLOT_SIZE
+
+    def _fit_profiles(self, profile_count):
+        """The most profiles, up to `profile_count`, whose records fit two slots (one if need be)."""
+        for slots in (2, 1):
+            fitting = profile_count
+            while fitting and self._slot_size(fitting) * slots > len(self.nvm):
+                fitting -= 1
+            if fitting:
+                return fitting
+        raise ValueError("state record does not fit NVM")
+
+    def _load(self):
+        # Records start on a SLOT_SIZE boundary whatever their size, so records
+        # written for another profile count are found too.
+        best = None
+        for start in range(0, len(self.nvm) - HEADER_SIZE + 1, SLOT_SIZE):
+            header = bytes(self.nvm[start : start + HEADER_SIZE])
+            magic, sequence, crc, length = struct.unpack(HEADER, header)
+            if magic != MAGIC or length < PAYLOAD_HEADER_SIZE:
+                continue
+            payload_start = start + HEADER_SIZE
+            payload = bytes(self.nvm[payload_start : payload_start + length])
+            if len(payload) != length or binascii.crc32(payload) != crc:
+                continue
+            # Sequence numbers wrap; the newest is ahead of the others by less than half.
+            if best is None or (sequence - best[1]) & 0xFFFFFFFF < 0x80000000:
+                best = (start, sequence, payload)
+        if best is None:
+            print("[STATE] No stored state")
+            return
+        start, self.sequence, payload = best
+        self.slot = min(start // self.slot_size, self.slots - 1)
+        last_profile, profiles, keys = struct.unpack_from(PAYLOAD_HEADER, payload)
+        if len(payload) != PAYLOAD_HEADER_SIZE + 2 * (profiles * keys + LATENCY_BUCKETS):
+            print(f"[STATE] Record {self.sequence} is malformed")
+            return
+        self.last_profile = self.saved_profile = last_profile
+        counters = PAYLOAD_HEADER_SIZE
+        for profile in range(min(profiles, self.profile_count)):
+            for key in range(min(keys, self.key_count)):
+                offset = counters + 2 * (profile * keys + key)
+                self.key_presses[profile * self.key_count + key] = payload[offset] | (payload[offset + 1] << 8)
+        _load_u16(self.latency, payload, counters + 2 * profiles * keys)
+        print(f"[STATE] Loaded record {self.sequence} (profile {self.last_profile})")
+
+    def set_profile(self, profile_index):
+        # The record field is 16 bits; no config comes near that many profiles.
+        profile_index = min(profile_index, 0xFFFF)
+        if profile_index != self.last_profile:
+            self.last_profile = profile_index
+            self.profile_changed = ticks_ms()
+
+    def _bump(self, counters, index):
+        if counters[index] == 0xFFFF:
+            for i in range(len(counters)):
+                counters[i] >>= 1
+        counters[index] += 1
+        self.unsaved_counts += 1
+
+    def count_key(self, profile_index, key_index):
+        if profile_index < self.profile_count and key_index < self.key_count:
+            self._bump(self.key_presses, profile_index * self.key_count + key_index)
+
+    def record_latency(self, latency_ms):
+        bucket = 0
+        while latency_ms >= (1 << bucket) and bucket < LATENCY_BUCKETS - 1:
+            bucket += 1
+        self._bump(self.latency, bucket)
+
+    def profile_presses(self, profile_index):
+        start = profile_index * self.key_count
+        return sum(self.key_presses[start : start + self.key_count])
+
+    def profile_ranking(self, profile_count):
+        """Profile indices ordered from most to least pressed, e.g. for cache warm-up."""
+        return sorted(range(profile_count), key=lambda index: -self.profile_presses(index))
+
+    @property
+    def dirty(self):
+        return self.last_profile != self.saved_profile or self.unsaved_counts > 0
+
+    def maybe_flush(self, idle_ms):
+        """Write the state if the loop is idle and a profile change or enough counts are waiting."""
+        if idle_ms < self.idle_ms or not self.dirty:
+            return False
+        now = ticks_ms()
+        profile_due = (
+            self.last_profile != self.saved_profile
+            and ticks_diff(now, self.profile_changed) >= self.profile_interval_ms
+        )
+        counters_due = self.unsaved_counts >= self.counter_flush_count or (
+            self.unsaved_counts and ticks_diff(now, self.last_flush) >= self.counter_interval_ms
+        )
+        if not (profile_due or counters_due):
+            return False
+        self.flush()
+        return True
+
+    def flush(self):
+        payload = (
+            struct.pack(PAYLOAD_HEADER, self.last_profile, self.profile_count, self.key_count)
+            + bytes(self.key_presses)
+            + bytes(self.latency)
+        )
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        self.slot = (self.slot + 1) % self.slots
+        record = struct.pack(HEADER, MAGIC, self.sequence, binascii.crc32(payload), len(payload)) + payload
+        start = self.slot * self.slot_size
+        try:
+            self.nvm[start : start + len(record)] = record
+        except OSError as e:
+            print(f"[STATE] Write failed: {e}")
+        self.saved_profile = self.last_profile
+        self.unsaved_counts = 0
+        self.last_flush = ticks_ms()
+        self.writes += 1
@@ -0,0 +1,10 @@
+"""Host tests: the firmware modules import from the repo root, the tools from host/."""
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# Appended, not prepended: the firmware's code.py would shadow the standard library module.
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "host"))
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
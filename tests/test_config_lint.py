@@ -0,0 +1,19 @@
+"""config_lint reports bad configuration instead of failing on it."""
+import json
+
+from config_lint import KEYSFILE, lint
+
+
+def keys_errors(tmp_path, keys):
+    (tmp_path / KEYSFILE).write_text(json.dumps(keys))
+    reports = lint(str(tmp_path), nkro=False)
+    return [report for report in reports if report.filename == KEYSFILE][0].errors
+
+
+def test_macro_delay_out_of_range_is_reported(tmp_path):
+    macro = [{"tap": "a"}, {"delay": 70000}]
+    errors = keys_errors(tmp_path, {"profiles": {"0": {"name": "Main", "1": {"macro": macro}}}})
+    assert len(errors) == 1
+    path, message = errors[0]
+    assert path.endswith("/macro")
+    assert "step 1" in message
@@ -0,0 +1,127 @@
+"""encoderaccel.AccelerationCurve against the rotaryio2 C semantics, over rotation traces.
+
+Each fixture in fixtures/rotation holds the curve points and the
+`(timestamp, detents)` samples of one rotation, as `take_delta()` returns
+them: timestamps are `supervisor.ticks_ms()` values. `c_record_detents`
+transliterates record_detents() from
+lib/rotaryio2/shared-module/rotaryio2/IncrementalEncoder2.c, which runs on the
+raw uint32 tick counter: integer EMA with alpha 1/4, velocity reset after
+250 ms. `c_python_ticks` is its conversion back to the ticks_ms() domain.
+"""
+import glob
+import json
+import os
+
+import pytest
+from conftest import FIXTURES
+
+from encoderaccel import VELOCITY_RESET_MS, AccelerationCurve
+from ticks import TICKS_MAX, ticks_diff
+
+UINT32 = 0xFFFFFFFF
+# supervisor.ticks_ms() runs this far ahead of the raw tick counter.
+TICKS_OFFSET = 0x1FFF0000
+TRACES = sorted(glob.glob(os.path.join(FIXTURES, "rotation", "*.json")))
+
+
+def load(path):
+    with open(path) as f:
+        fixture = json.load(f)
+    return [tuple(point) for point in fixture["points"]], [tuple(sample) for sample in fixture["trace"]]
+
+
+def c_multiplier(points, velocity):
+    multiplier = 1
+    for threshold, point_multiplier in points:
+        if velocity < threshold:
+            break
+        multiplier = point_multiplier
+    return multiplier
+
+
+def c_python_ticks(ticks_ms32):
+    return (ticks_ms32 + TICKS_OFFSET) & TICKS_MAX
+
+
+def raw_ticks(trace):
+    """The raw uint32 tick counter at each sample of a ticks_ms() trace."""
+    raw = (trace[0][0] - TICKS_OFFSET) & TICKS_MAX
+    result = [raw]
+    for (earlier, _), (later, _) in zip(trace, trace[1:]):
+        raw = (raw + ticks_diff(later, earlier)) & UINT32
+        result.append(raw)
+    return result
+
+
+def c_record_detents(points, trace, reset_ms=VELOCITY_RESET_MS):
+    """Steps the C code adds to pending_steps for each sample.
+
+    reset_motion() stamps last_detent_ms at construction; the traces start
+    with the encoder at rest, so that is taken as long before the first sample.
+    """
+    raw = raw_ticks(trace)
+    last_detent_ms = (raw[0] - reset_ms) & UINT32
+    velocity = 0
+    result = []
+    for now, (_timestamp, detents) in zip(raw, trace):
+        elapsed = (now - last_detent_ms) & UINT32
+        count = abs(detents)
+        if elapsed >= reset_ms:
+            velocity = 0
+        else:
+            instant = int(count * 1000 / (elapsed if elapsed else 1))
+            velocity = int((velocity * 3 + instant) / 4) if velocity else instant
+        result.append(detents * c_multiplier(points, velocity))
+        last_detent_ms = now
+    return result
+
+
+@pytest.mark.parametrize("path", TRACES, ids=lambda path: os.path.basename(path)[:-5])
+def test_replay_matches_native(path):
+    points, trace = load(path)
+    assert AccelerationCurve(points).replay(trace) == c_record_detents(points, trace)
+
+
+@pytest.mark.parametrize("path", TRACES, ids=lambda path: os.path.basename(path)[:-5])
+def test_timestamps_are_in_ticks_ms_domain(path):
+    _points, trace = load(path)
+    assert all(0 <= timestamp <= TICKS_MAX for timestamp, _detents in trace)
+    assert [c_python_ticks(raw) for raw in raw_ticks(trace)] == [t for t, _d in trace]
+
+
+def test_tick_wrap_crosses_the_wrap():
+    _points, trace = load(os.path.join(FIXTURES, "rotation", "tick_wrap.json"))
+    assert any(later < earlier for (earlier, _), (later, _) in zip(trace, trace[1:]))
+
+
+def test_traces_present():
+    assert len(TRACES) >= 5
+
+
+def test_slow_clicks_stay_precise():
+    points, trace = load(os.path.join(FIXTURES, "rotation", "slow_clicks.json"))
+    assert AccelerationCurve(points).replay(trace) == [1] * len(trace)
+
+
+def test_pause_resets_velocity():
+    points, trace = load(os.path.join(FIXTURES, "rotation", "burst_pause.json"))
+    steps = AccelerationCurve(points).replay(trace)
+    gaps = [trace[0][0]] + [later[0] - earlier[0] for earlier, later in zip(trace, trace[1:])]
+    for gap, (_timestamp, detents), step in zip(gaps, trace, steps):
+        if gap >= VELOCITY_RESET_MS:
+            assert step == detents
+    # The burst itself is fast enough to double.
+    assert max(steps) == 2
+
+
+def test_fast_sweep_accelerates_and_keeps_direction():
+    points, trace = load(os.path.join(FIXTURES, "rotation", "fast_sweep.json"))
+    steps = AccelerationCurve(points).replay(trace)
+    assert max(steps) >= 8 * 2
+    assert all(step * detents > 0 for step, (_t, detents) in zip(steps, trace))
+
+
+def test_replay_resets_between_traces():
+    points, trace = load(os.path.join(FIXTURES, "rotation", "steady_spin.json"))
+    curve = AccelerationCurve(points)
+    assert curve.replay(trace) == curve.replay(trace)
@@ -0,0 +1,151 @@
+"""Idle loop passes allocate nothing, measured with tracemalloc.
+
+The passes run the real input producer, event ring, host link and action
+tick objects in code.py's loop order, on stand-ins for the keypad scanner,
+the encoders and the data port. CPython boxes ints above 256, which
+CircuitPython keeps in the object pointer, so a measurement stays below 256
+ring entries and encoder positions.
+"""
+import itertools
+import tracemalloc
+import types
+
+import pytest
+
+import inputcapture
+from inputcapture import EncoderSource, EventRing, InputEvent, InputProducer, KeypadSource
+from simulator import SimClock, load_firmware
+
+PASSES = 200
+
+
+class IdleQueue:
+    """keypad.EventQueue stand-in with no key transitions."""
+
+    overflowed = False
+
+    def get_into(self, event):
+        return False
+
+    def clear(self):
+        pass
+
+
+class Scanner:
+    def __init__(self):
+        self.events = IdleQueue()
+
+
+class NativeEncoder:
+    """rotaryio2.IncrementalEncoder2 stand-in turning `per_read` detents per read."""
+
+    def __init__(self, per_read=0):
+        self.per_read = per_read
+        self.position = 0
+
+    def take_delta_into(self, buffer):
+        delta = self.per_read
+        self.position += delta
+        buffer[3] = self.position
+        if delta:
+            buffer[0] = delta
+            buffer[1] = delta
+            buffer[2] = 100
+        return delta
+
+
+class PlainEncoder:
+    """rotaryio.IncrementalEncoder stand-in that is not turned."""
+
+    position = 0
+
+
+class PartialSerial:
+    """usb_cdc.data stand-in that received the first half of a frame."""
+
+    connected = True
+
+    def __init__(self, data):
+        self.inbox = bytearray(data)
+
+    @property
+    def in_waiting(self):
+        return len(self.inbox)
+
+    def read(self, count):
+        data = bytes(self.inbox[:count])
+        del self.inbox[:count]
+        return data
+
+    def write(self, data):
+        return len(data)
+
+
+@pytest.fixture
+def loop(monkeypatch):
+    monkeypatch.setattr(inputcapture, "keypad", types.SimpleNamespace(Event=InputEvent))
+    keyout = load_firmware(SimClock(), []).keyout
+    keyout.host_link.serial = PartialSerial(b"")
+    return keyout
+
+
+def allocations(keyout, producer, passes=PASSES):
+    """Peak bytes allocated over `passes` passes of code.py's loop without actions."""
+    ring = producer.ring
+    event = InputEvent()
+    host_link = keyout.host_link
+
+    def loop_pass():
+        producer.poll()
+        host_link.poll()
+        while ring.get_into(event):
+            pass
+        keyout.macro_player.tick()
+        keyout.text_stream.tick()
+        keyout.launcher.tick()
+        keyout.bulk_paste.tick()
+
+    remaining = itertools.repeat(None, passes)
+    tracemalloc.start()
+    try:
+        # The first traced pass may grow interpreter stacks; it does not count.
+        loop_pass()
+        start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        for _ in remaining:
+            loop_pass()
+        return tracemalloc.get_traced_memory()[1] - start
+    finally:
+        tracemalloc.stop()
+
+
+def make_producer(encoders):
+    sources = (
+        KeypadSource(Scanner(), inputcapture.KEY_PRESSED, inputcapture.KEY_RELEASED),
+        EncoderSource(encoders),
+    )
+    return InputProducer(EventRing(), sources)
+
+
+def test_idle_passes_allocate_nothing(loop):
+    producer = make_producer([NativeEncoder(), PlainEncoder()])
+    assert allocations(loop, producer) == 0
+
+
+def test_turning_native_encoder_allocates_nothing(loop):
+    producer = make_producer([NativeEncoder(per_read=1), PlainEncoder()])
+    assert allocations(loop, producer) == 0
+    assert producer.positions() == (PASSES + 1, 0)
+
+
+def test_partial_frame_is_not_reparsed(loop):
+    host_link = loop.host_link
+    received = []
+    host_link.on("RATE", received.append)
+    host_link.serial.inbox.extend(b"RATE 4\n12")
+    assert host_link.poll()
+    assert not host_link.poll()
+    assert allocations(loop, make_producer([NativeEncoder()])) == 0
+    host_link.serial.inbox.extend(b"34")
+    assert host_link.poll()
+    assert received == [b"1234"]
@@ -0,0 +1,179 @@
+"""EventRing fed from ThreadedProducer's thread while the test thread drains it."""
+import threading
+import time
+
+from inputcapture import (
+    ENCODER_MOVED,
+    KEY_PRESSED,
+    EncoderSource,
+    EventRing,
+    InputEvent,
+    InputProducer,
+    ThreadedProducer,
+)
+
+EVENTS = 5000
+
+
+class CountingSource:
+    """Puts numbered events, a few per poll, retrying any the full ring refused."""
+
+    def __init__(self, total, burst=5):
+        self.total = total
+        self.burst = burst
+        self.sent = 0
+        self.done = threading.Event()
+
+    def poll(self, ring):
+        for _ in range(self.burst):
+            if self.sent == self.total:
+                self.done.set()
+                return
+            if not ring.put(KEY_PRESSED, self.sent & 0xFF, self.sent & 0x7FFF, self.sent):
+                return
+            self.sent += 1
+
+    def deinit(self):
+        pass
+
+
+class MovingEncoder:
+    """rotaryio.IncrementalEncoder stand-in whose position the test thread moves."""
+
+    def __init__(self):
+        self.position = 0
+
+    def deinit(self):
+        pass
+
+
+class NativeEncoder:
+    """rotaryio2.IncrementalEncoder2 stand-in; `irq_after_read` detents land just after each read."""
+
+    def __init__(self, irq_after_read=0, records_detents=True):
+        self.position = 0
+        self.pending = 0
+        self.irq_after_read = irq_after_read
+        self.records_detents = records_detents
+
+    def interrupt(self, detents):
+        self.position += detents
+        if self.records_detents:
+            self.pending += detents
+
+    def take_delta_into(self, buffer):
+        delta = self.pending
+        buffer[3] = self.position
+        if delta:
+            buffer[0] = delta
+            buffer[1] = delta
+            buffer[2] = 100
+        self.pending = 0
+        self.interrupt(self.irq_after_read)
+        return delta
+
+    def deinit(self):
+        pass
+
+
+def drain(ring, until, stall_every=0, timeout=10):
+    """Consume events until `until()` holds and the ring is empty.
+
+    With `stall_every`, the consumer stops for a moment after that many
+    events, like a main loop busy with an action, so the ring fills up.
+    """
+    event = InputEvent()
+    received = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if ring.get_into(event):
+            received.append((event.kind, event.number, event.value, event.timestamp))
+            if stall_every and len(received) % stall_every == 0:
+                time.sleep(0.005)
+        elif until():
+            break
+        else:
+            # Let the producer thread run.
+            time.sleep(0)
+    while ring.get_into(event):
+        received.append((event.kind, event.number, event.value, event.timestamp))
+    return received
+
+
+def test_threaded_events_arrive_once_and_in_order():
+    # A small ring, so the producer runs into a full ring again and again.
+    ring = EventRing(16)
+    source = CountingSource(EVENTS)
+    threaded = ThreadedProducer(InputProducer(ring, (source,)), interval=0)
+    threaded.start()
+    try:
+        received = drain(ring, source.done.is_set, stall_every=500)
+    finally:
+        threaded.stop()
+    assert [timestamp for _kind, _number, _value, timestamp in received] == list(range(EVENTS))
+    assert all(
+        (kind, number, value) == (KEY_PRESSED, index & 0xFF, index & 0x7FFF)
+        for index, (kind, number, value, _timestamp) in enumerate(received)
+    )
+    assert ring.dropped > 0
+    assert len(ring) == 0
+
+
+def test_threaded_encoder_steps_add_up():
+    ring = EventRing(64)
+    encoder = MovingEncoder()
+    source = EncoderSource([encoder])
+    threaded = ThreadedProducer(InputProducer(ring, (source,)), interval=0.0001)
+    turned = threading.Event()
+
+    def turn():
+        for _ in range(500):
+            encoder.position += 1
+            time.sleep(0.0002)
+        for _ in range(200):
+            encoder.position -= 1
+            time.sleep(0.0002)
+        # Long enough for the producer to see the last position.
+        time.sleep(0.05)
+        turned.set()
+
+    threaded.start()
+    turner = threading.Thread(target=turn)
+    turner.start()
+    try:
+        received = drain(ring, turned.is_set)
+    finally:
+        turner.join()
+        threaded.stop()
+    received += drain(ring, lambda: True)
+    assert all(kind == ENCODER_MOVED and number == 0 for kind, number, _value, _timestamp in received)
+    assert source.dropped_steps == 0
+    # No curve points: every detent is one step.
+    assert sum(value for _kind, _number, value, _timestamp in received) == 300
+
+
+def test_native_encoder_interrupt_between_reads_keeps_native_path(capsys):
+    ring = EventRing(64)
+    encoder = NativeEncoder(irq_after_read=1)
+    source = EncoderSource([encoder])
+    for _ in range(5):
+        source.poll(ring)
+    assert source.native == [True]
+    assert "no native detents" not in capsys.readouterr().out
+    received = drain(ring, lambda: True)
+    # Each pass collects the detent that landed after the previous read.
+    assert [value for _kind, _number, value, _timestamp in received] == [1, 1, 1, 1]
+
+
+def test_native_encoder_without_detents_falls_back_to_positions():
+    ring = EventRing(64)
+    encoder = NativeEncoder(records_detents=False)
+    source = EncoderSource([encoder])
+    source.poll(ring)
+    encoder.interrupt(2)
+    source.poll(ring)
+    assert source.native == [False]
+    encoder.interrupt(1)
+    source.poll(ring)
+    received = drain(ring, lambda: True)
+    assert sum(value for _kind, _number, value, _timestamp in received) == 3
@@ -0,0 +1,10 @@
+"""keyout output streams, on the simulator's virtual HID devices."""
+from simulator import SimClock, load_firmware
+
+
+def test_combination_stops_running_text():
+    keyout = load_firmware(SimClock(), []).keyout
+    keyout.type_text_content("a long text still being typed")
+    assert keyout.text_stream.running
+    keyout.press_combination((0x04,))
+    assert not keyout.text_stream.running
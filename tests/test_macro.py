@@ -0,0 +1,19 @@
+"""Macro compilation limits."""
+import pytest
+
+from macro import MAX_DELAY_MS, MacroError, compile_macro
+
+
+def test_longest_delay_compiles():
+    macro = compile_macro([{"delay": MAX_DELAY_MS}])
+    assert macro.duration_ms() == MAX_DELAY_MS
+
+
+def test_delay_past_16_bits_names_the_step():
+    with pytest.raises(MacroError, match="step 1: delay of 70000 ms"):
+        compile_macro([{"press": "a"}, {"delay": 70000}])
+
+
+def test_consecutive_delays_are_limited_together():
+    with pytest.raises(MacroError, match="step 1"):
+        compile_macro([{"delay": 40000}, {"delay": 40000}])
@@ -0,0 +1,67 @@
+"""StateStore write rationing and record layout, on an in-RAM NVM."""
+import statestore
+from statestore import StateStore
+
+
+def make_store(nvm, profile_count=4, **kwargs):
+    return StateStore(9, profile_count, nvm=nvm, **kwargs)
+
+
+def advance(monkeypatch, ms):
+    now = statestore.ticks_ms() + ms
+    monkeypatch.setattr(statestore, "ticks_ms", lambda: now)
+
+
+def test_key_presses_do_not_flush_until_due(monkeypatch):
+    store = make_store(bytearray(4096), counter_flush_count=50)
+    for _ in range(49):
+        store.count_key(0, 1)
+    advance(monkeypatch, 120_000)
+    assert not store.maybe_flush(idle_ms=10_000)
+    store.count_key(0, 1)
+    assert not store.maybe_flush(idle_ms=0)
+    assert store.maybe_flush(idle_ms=10_000)
+    assert store.writes == 1
+
+
+def test_counts_flush_after_long_interval(monkeypatch):
+    store = make_store(bytearray(4096))
+    store.count_key(1, 2)
+    advance(monkeypatch, store.counter_interval_ms - 1)
+    assert not store.maybe_flush(idle_ms=10_000)
+    advance(monkeypatch, store.counter_interval_ms)
+    assert store.maybe_flush(idle_ms=10_000)
+
+
+def test_profile_flushes_only_when_changed(monkeypatch):
+    store = make_store(bytearray(4096))
+    store.set_profile(0)
+    advance(monkeypatch, 60_000)
+    assert not store.maybe_flush(idle_ms=10_000)
+    store.set_profile(2)
+    assert not store.maybe_flush(idle_ms=10_000)
+    advance(monkeypatch, 60_000 + store.profile_interval_ms)
+    assert store.maybe_flush(idle_ms=10_000)
+    assert not store.maybe_flush(idle_ms=10_000)
+
+
+def test_wide_profile_index_and_many_profiles_round_trip():
+    nvm = bytearray(4096)
+    store = make_store(nvm, profile_count=40)
+    store.set_profile(300)
+    store.count_key(39, 8)
+    store.flush()
+    loaded = make_store(nvm, profile_count=40)
+    assert loaded.last_profile == 300
+    assert loaded.profile_presses(39) == 1
+
+
+def test_record_for_other_profile_count_loads_common_profiles():
+    nvm = bytearray(4096)
+    store = make_store(nvm, profile_count=30)
+    store.count_key(2, 0)
+    store.count_key(29, 0)
+    store.flush()
+    loaded = make_store(nvm, profile_count=5)
+    assert loaded.profile_presses(2) == 1
+    assert sum(loaded.key_presses) == 1
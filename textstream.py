@@ -0,0 +1,156 @@
+"""Text typed from the main loop a chunk of characters at a time, and cancellable.
+
+`TextStream.start()` only stores the text. `tick()`, called every loop pass,
+turns the next CHUNK_CHARS characters into keystrokes in a reused buffer once
+the previous chunk has gone out, and sends each press and release when it
+falls due. A long paragraph therefore never blocks the matrix or the
+encoders, `cancel()` stops it between two reports, and `on_progress(done,
+total)` runs once per chunk, which is rare enough to redraw a progress bar.
+It runs once more with total 0 when the text is finished or cancelled.
+
+Text is given as parts with a pause between them (the lines of a
+"line-by-line" text, for instance).
+"""
+from ticks import ticks_add, ticks_less, ticks_ms
+
+CHUNK_CHARS = 16
+# Stroke buffer size: ample for CHUNK_CHARS characters, since even a Unicode
+# hex entry sequence takes no more than 10 strokes.
+MAX_STROKES = 64
+# Buffer entry per stroke: modifiers, usage, modifiers left held on release, end mark.
+_STROKE_SIZE = 4
+_CHAR_END = 1
+_PART_END = 2
+
+
+class TextStream:
+    def __init__(self, keyboard_device, report_format):
+        self.device = keyboard_device
+        self.format = report_format
+        self.report = bytearray(report_format.size)
+        self.strokes = bytearray(MAX_STROKES * _STROKE_SIZE)
+        self.on_progress = None
+        self.parts = None
+        self.total = 0
+        self.done = 0
+
+    @property
+    def running(self):
+        return self.parts is not None
+
+    def pending(self):
+        """Characters not typed yet."""
+        return self.total - self.done if self.parts is not None else 0
+
+    def start(self, parts, layout, unicode_mode=None, hold_ms=10, gap_ms=30, pause_ms=0):
+        """Type the strings in `parts`, waiting `pause_ms` after each but the last.
+
+        Every character holds its key for `hold_ms` and is followed by `gap_ms`.
+        """
+        self.cancel()
+        if not any(parts):
+            return
+        self.parts = parts
+        self.layout = layout
+        self.unicode_mode = unicode_mode
+        self.hold_ms = hold_ms
+        self.gap_ms = gap_ms
+        self.pause_ms = pause_ms
+        self.total = sum(len(part) for part in parts)
+        self.done = 0
+        self.part = 0
+        self.position = 0
+        self.stroke = 0
+        self.stroke_count = 0
+        self.pressed = False
+        self.due = ticks_ms()
+        self.tick()
+
+    def cancel(self):
+        """Stop typing now and release the key held, if any."""
+        if self.parts is None:
+            return
+        print(f"[TYPING] Cancelled after {self.done}/{self.total} characters")
+        self._end()
+
+    def tick(self):
+        if self.parts is None:
+            return
+        now = ticks_ms()
+        buffer = self.strokes
+        while not ticks_less(now, self.due):
+            if self.stroke >= self.stroke_count:
+                if not self._next_chunk():
+                    print("[TYPING] Complete")
+                    self._end()
+                    return
+                continue
+            base = self.stroke * _STROKE_SIZE
+            if not self.pressed:
+                self._send(buffer[base], buffer[base + 1])
+                self.pressed = True
+                self.due = ticks_add(now, self.hold_ms)
+                continue
+            # Release the key; modifiers of a multi-stroke sequence stay held.
+            self._send(buffer[base + 2], 0)
+            self.pressed = False
+            self.stroke += 1
+            end = buffer[base + 3]
+            if end:
+                # At most one character per pass, whatever the rate.
+                self.due = ticks_add(now, self.gap_ms + (self.pause_ms if end == _PART_END else 0))
+                return
+
+    def _send(self, modifiers, usage):
+        self.format.set_single(self.report, modifiers, usage)
+        self.device.send_report(self.report)
+
+    def _next_chunk(self):
+        """Compile the next characters into the stroke buffer; False at the end."""
+        parts = self.parts
+        while self.position >= len(parts[self.part]):
+            if self.part + 1 >= len(parts):
+                return False
+            self.part += 1
+            self.position = 0
+        part = parts[self.part]
+        buffer = self.strokes
+        count = 0
+        chars = 0
+        position = self.position
+        while position < len(part) and chars < CHUNK_CHARS:
+            char = part[position]
+            strokes = self.layout.keystrokes(char, self.unicode_mode)
+            if strokes is None:
+                print(f"[TYPING] Skipping unsupported: {char}")
+            elif count + len(strokes) > MAX_STROKES:
+                break
+            else:
+                last = len(strokes) - 1
+                for index, (modifiers, usage) in enumerate(strokes):
+                    base = count * _STROKE_SIZE
+                    buffer[base] = modifiers
+                    buffer[base + 1] = usage
+                    buffer[base + 2] = strokes[index + 1][0] if index < last else 0
+                    buffer[base + 3] = 0
+                    count += 1
+                buffer[count * _STROKE_SIZE - 1] = _CHAR_END
+            position += 1
+            chars += 1
+        if count and position >= len(part) and self.part + 1 < len(parts):
+            buffer[count * _STROKE_SIZE - 1] = _PART_END
+        self.position = position
+        self.stroke = 0
+        self.stroke_count = count
+        self.done += chars
+        if self.on_progress is not None:
+            self.on_progress(self.done, self.total)
+        return True
+
+    def _end(self):
+        if self.pressed:
+            self._send(0, 0)
+            self.pressed = False
+        self.parts = None
+        if self.on_progress is not None:
+            self.on_progress(0, 0)
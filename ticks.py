@@ -0,0 +1,34 @@
+"""Millisecond tick helpers that do not allocate on CircuitPython.
+
+`supervisor.ticks_ms()` returns a small int that wraps at 2**29, so it never
+needs a heap allocation (unlike `time.monotonic_ns()`), and its precision does
+not decay with uptime (unlike the float from `time.monotonic()`).
+On a desktop Python the same API is provided from `time.monotonic()`.
+"""
+import time
+
+try:
+    from supervisor import ticks_ms
+except ImportError:
+    def ticks_ms():
+        return int(time.monotonic() * 1000) & TICKS_MAX
+
+TICKS_PERIOD = 1 << 29
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+
+def ticks_add(ticks, delta):
+    """Add a millisecond delta to a tick value, wrapping like ticks_ms()."""
+    return (ticks + delta) % TICKS_PERIOD
+
+
+def ticks_diff(ticks1, ticks2):
+    """Return the signed difference ticks1 - ticks2, handling wraparound."""
+    diff = (ticks1 - ticks2) & TICKS_MAX
+    return ((diff + TICKS_HALFPERIOD) & TICKS_MAX) - TICKS_HALFPERIOD
+
+
+def ticks_less(ticks1, ticks2):
+    """Return True when ticks1 is before ticks2."""
+    return ticks_diff(ticks2, ticks1) > 0